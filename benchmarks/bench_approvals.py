@@ -0,0 +1,113 @@
+"""
+Benchmark: approval lookups and transitions at 1M tracked approvals.
+
+Compares ``ApprovalStore`` with the baseline of a plain list of approval
+dicts scanned linearly, on the queries a reviewer dashboard makes: the
+oldest pending approvals, one thread's approvals, counts by status, and
+bulk approving or expiring. Run with ``python -m benchmarks.bench_approvals``.
+"""
+
+import random
+import time
+from collections.abc import Callable
+
+from src.utils.approval_store import ApprovalStore
+
+APPROVALS = 1_000_000
+THREADS = 100_000
+ACTIONS = [f"action_{i}" for i in range(50)]
+STATUSES = ["pending", "approved", "rejected"]
+
+
+def timed(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Best of ``repeat`` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - began)
+    return best * 1000
+
+
+def main() -> None:
+    rng = random.Random(0)
+    records = [
+        {
+            "id": f"approval_{i}",
+            "action": rng.choice(ACTIONS),
+            "thread_id": f"thread_{rng.randrange(THREADS)}",
+            "status": rng.choices(STATUSES, (1, 8, 1))[0],
+            "created_at": float(i),
+        }
+        for i in range(APPROVALS)
+    ]
+    began = time.perf_counter()
+    store = ApprovalStore()
+    for r in records:
+        store.add(r["id"], r["action"], r["thread_id"], r["status"], r["created_at"])
+    print(f"{APPROVALS:,} approvals indexed in {time.perf_counter() - began:.2f}s")
+
+    thread = records[APPROVALS // 2]["thread_id"]
+    cutoff = APPROVALS / 5
+    queries = [
+        (
+            "oldest 100 pending",
+            lambda: [r for r in records if r["status"] == "pending"][:100],
+            lambda: store.find(status="pending", limit=100),
+        ),
+        (
+            "one thread",
+            lambda: [r for r in records if r["thread_id"] == thread],
+            lambda: store.find(thread_id=thread),
+        ),
+        (
+            "pending of one action",
+            lambda: [
+                r
+                for r in records
+                if r["status"] == "pending" and r["action"] == "action_7"
+            ],
+            lambda: store.find(status="pending", action="action_7"),
+        ),
+        (
+            "pending of one thread",
+            lambda: [
+                r
+                for r in records
+                if r["status"] == "pending" and r["thread_id"] == thread
+            ],
+            lambda: store.find(status="pending", thread_id=thread),
+        ),
+        (
+            "count pending of action",
+            lambda: sum(
+                r["status"] == "pending" and r["action"] == "action_7" for r in records
+            ),
+            lambda: store.count(status="pending", action="action_7"),
+        ),
+        (
+            "count pending",
+            lambda: sum(r["status"] == "pending" for r in records),
+            lambda: store.count(status="pending"),
+        ),
+    ]
+    print(f"{'':>22s} {'list scan':>12s} {'store':>12s}")
+    for name, scan, indexed in queries:
+        print(f"{name:>22s} {timed(scan):9.2f} ms {timed(indexed):9.3f} ms")
+
+    ids = [a.id for a in store.find(status="pending", limit=10_000)]
+    began = time.perf_counter()
+    moved = store.transition(ids, "approved", from_status="pending")
+    elapsed = (time.perf_counter() - began) * 1000
+    print(f"{'approve 10k':>22s} {'':>12s} {elapsed:9.2f} ms")
+    began = time.perf_counter()
+    expired = store.transition_where(
+        "expired", from_status="pending", older_than=cutoff
+    )
+    elapsed = (time.perf_counter() - began) * 1000
+    print(f"{'expire old pending':>22s} {'':>12s} {elapsed:9.2f} ms")
+    print(f"moved {moved:,}, expired {expired:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: per-call ``numexpr.evaluate`` vs. the compiled calculator engine.
+
+Run with ``python -m benchmarks.bench_calculator``.
+"""
+
+import math
+import time
+
+import numexpr
+import numpy as np
+
+from src.utils.calculator import CalculatorEngine
+
+EXPRESSIONS = ["2 + 2", "25 * 4", "sqrt(x) * pi + y", "x ** 2 - 3 * y / 7"]
+ROWS = 10_000
+
+
+def bench_per_call(xs: np.ndarray, ys: np.ndarray) -> float:
+    start = time.perf_counter()
+    for x, y in zip(xs, ys, strict=True):
+        local_dict = {"pi": math.pi, "e": math.e, "x": x, "y": y}
+        for expression in EXPRESSIONS:
+            numexpr.evaluate(expression, global_dict={}, local_dict=local_dict)
+    return time.perf_counter() - start
+
+
+def bench_engine_per_call(xs: np.ndarray, ys: np.ndarray) -> float:
+    engine = CalculatorEngine()
+    start = time.perf_counter()
+    for x, y in zip(xs, ys, strict=True):
+        for expression in EXPRESSIONS:
+            engine.calculate(expression, x=x, y=y)
+    return time.perf_counter() - start
+
+
+def bench_engine_batch(xs: np.ndarray, ys: np.ndarray) -> float:
+    engine = CalculatorEngine()
+    start = time.perf_counter()
+    engine.calculate_many(EXPRESSIONS, {"x": xs, "y": ys})
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(1, 100, ROWS)
+    ys = rng.uniform(1, 100, ROWS)
+    evaluations = ROWS * len(EXPRESSIONS)
+
+    for name, bench in [
+        ("numexpr.evaluate per call", bench_per_call),
+        ("engine.calculate per call", bench_engine_per_call),
+        ("engine.calculate_many", bench_engine_batch),
+    ]:
+        elapsed = bench(xs, ys)
+        rate = evaluations / elapsed
+        print(f"{name:28s} {elapsed * 1e3:9.2f} ms  {rate:14,.0f} evals/s")
+
+
+if __name__ == "__main__":
+    main()
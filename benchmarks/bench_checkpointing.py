@@ -0,0 +1,83 @@
+"""
+Benchmark: checkpoint write latency and throughput, MemorySaver vs. SQLite.
+
+Each turn appends a user message and an AI reply to a growing conversation,
+so every turn writes several checkpoints. The SQLite saver is measured with
+write-behind batching, with a commit per write (``max_batch=1``) and without
+delta encoding (``keyframe_interval=0``), reporting the bytes of channel
+values stored. Run with ``python -m benchmarks.bench_checkpointing``.
+"""
+
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Annotated, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from src.utils.checkpointing import SQLiteSaver
+
+TURNS = 300
+
+
+class State(TypedDict):
+    messages: Annotated[list[BaseMessage], add_messages]
+
+
+def reply(state: State) -> dict:
+    return {"messages": [AIMessage(content="Sure, here is some more detail.")]}
+
+
+def build_graph(checkpointer):
+    builder = StateGraph(State)
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def bench(name: str, checkpointer) -> None:
+    graph = build_graph(checkpointer)
+    config = {"configurable": {"thread_id": "bench"}}
+    latencies = []
+    start = time.perf_counter()
+    for i in range(TURNS):
+        turn = time.perf_counter()
+        graph.invoke({"messages": [HumanMessage(content=f"Question {i}")]}, config)
+        latencies.append(time.perf_counter() - turn)
+    if isinstance(checkpointer, SQLiteSaver):
+        checkpointer.flush()
+    elapsed = time.perf_counter() - start
+    checkpoints = sum(1 for _ in checkpointer.list(config))
+    p50 = statistics.median(latencies) * 1e3
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1e3
+    print(
+        f"{name:26s} p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  "
+        f"{checkpoints / elapsed:9,.0f} checkpoints/s"
+    )
+
+
+def main() -> None:
+    bench("MemorySaver", MemorySaver())
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, options in [
+            ("SQLiteSaver (write-behind)", {}),
+            ("SQLiteSaver (max_batch=1)", {"max_batch": 1}),
+            ("SQLiteSaver (no deltas)", {"keyframe_interval": 0}),
+        ]:
+            path = os.path.join(tmp, f"{len(os.listdir(tmp))}.sqlite3")
+            with SQLiteSaver(path, **options) as saver:
+                bench(name, saver)
+                commits = saver.commits
+            with sqlite3.connect(path) as db:
+                (size,) = db.execute("SELECT SUM(LENGTH(blob)) FROM blobs").fetchone()
+            print(f"{'':26s} {commits} commits, {size / 1e6:.1f} MB of channel values")
+
+
+if __name__ == "__main__":
+    main()
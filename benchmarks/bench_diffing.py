@@ -0,0 +1,73 @@
+"""
+Benchmark: diffing 10k-message states.
+
+Compares the structural diff engine with a naive diff that serializes and
+compares every message, on three cases: two states sharing their message
+objects (consecutive checkpoints in memory), two states holding equal copies
+(checkpoints decoded separately), and two branches of a ``BranchStore``.
+Run with ``python -m benchmarks.bench_diffing``.
+"""
+
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.utils.branching import MAIN, BranchStore
+from src.utils.diffing import diff_branches, diff_values
+from src.utils.serde import CompactSerializer
+
+MESSAGES = 10_000
+EDITS = 10
+REPEAT = 20
+
+
+def naive_diff(old: dict, new: dict) -> list[dict]:
+    old_dumps = {m.id: m.model_dump_json() for m in old["messages"]}
+    new_dumps = {m.id: m.model_dump_json() for m in new["messages"]}
+    return [
+        {"id": key, "value": value}
+        for key, value in new_dumps.items()
+        if old_dumps.get(key) != value
+    ]
+
+
+def timed(func, *args) -> tuple[float, list]:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func(*args)
+    return (time.perf_counter() - start) / REPEAT * 1e3, result
+
+
+def main() -> None:
+    history = [
+        (HumanMessage if i % 2 else AIMessage)(content=f"message {i}", id=f"m{i}")
+        for i in range(MESSAGES)
+    ]
+    edited = list(history)
+    for i in range(EDITS):
+        index = (i + 1) * MESSAGES // (EDITS + 1)
+        edited[index] = AIMessage(content="edited", id=history[index].id)
+    edited.append(HumanMessage(content="one more", id="last"))
+    old, new = {"messages": history}, {"messages": edited}
+
+    serde = CompactSerializer()
+    copies = serde.loads_typed(serde.dumps_typed(old))
+
+    print(f"{MESSAGES} messages, {EDITS} edits + 1 append")
+    for name, a in [("shared objects", old), ("decoded copies", copies)]:
+        naive, expected = timed(naive_diff, a, new)
+        fast, changes = timed(diff_values, a, new)
+        assert len(changes) == len(expected) == EDITS + 1
+        print(f"{name:16s} naive {naive:8.2f} ms  structural {fast:7.3f} ms")
+
+    store = BranchStore(history)
+    store.fork(MAIN, "what-if")
+    store.append("what-if", [HumanMessage(content="what if", id="w")])
+    store.append(MAIN, [HumanMessage(content="meanwhile", id="x")])
+    fast, changes = timed(diff_branches, store, MAIN, "what-if")
+    assert len(changes) == 2
+    print(f"{'branches':16s} {'':20s} structural {fast:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
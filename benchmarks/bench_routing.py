@@ -0,0 +1,69 @@
+"""
+Benchmark: if/elif keyword chains vs. the precompiled intent router.
+
+Run with ``python -m benchmarks.bench_routing``.
+"""
+
+import random
+import time
+
+from src.utils.routing import Intent, IntentRouter
+
+MESSAGES = 20_000
+WORDS = ["the", "weather", "please", "compute", "hello", "foo", "bar", "help"]
+
+
+def make_messages(keywords: list[str], rng: random.Random) -> list[str]:
+    messages = []
+    for _ in range(MESSAGES):
+        words = rng.choices(WORDS, k=12)
+        if rng.random() < 0.5:
+            words[rng.randrange(len(words))] = rng.choice(keywords)
+        messages.append(" ".join(words))
+    return messages
+
+
+def route_chain(intents: list[Intent], text: str) -> str:
+    """Equivalent of an if/elif chain with ``any(kw in text ...)`` per branch."""
+    text = text.lower()
+    for intent in intents:
+        if any(keyword in text for keyword in intent.keywords):
+            return intent.name
+    return "unknown"
+
+
+def bench(intent_count: int) -> None:
+    rng = random.Random(intent_count)
+    intents = [
+        Intent(f"intent{i}", (f"kw{i}a", f"kw{i}b", f"kw{i}c"))
+        for i in range(intent_count)
+    ]
+    keywords = [kw for intent in intents for kw in intent.keywords]
+    messages = make_messages(keywords, rng)
+
+    start = time.perf_counter()
+    expected = [route_chain(intents, text) for text in messages]
+    chain = time.perf_counter() - start
+
+    start = time.perf_counter()
+    router = IntentRouter(intents)
+    compiled = time.perf_counter() - start
+    start = time.perf_counter()
+    routes = router.route_many(messages)
+    routed = time.perf_counter() - start
+
+    assert [route.intent for route in routes] == expected
+    print(
+        f"{intent_count:5d} intents  if/elif {MESSAGES / chain:12,.0f} msg/s  "
+        f"router {MESSAGES / routed:12,.0f} msg/s  "
+        f"(compile {compiled * 1e3:.1f} ms)"
+    )
+
+
+def main() -> None:
+    for intent_count in (3, 30, 300, 3000):
+        bench(intent_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: checkpoint serialization, default serde vs. compact encoding.
+
+Serializes a message-heavy state (a tool-calling conversation with repeated
+user questions) with LangGraph's ``JsonPlusSerializer`` and with
+``CompactSerializer`` uncompressed, zlib- and zstd-compressed, reporting
+payload size and dumps/loads throughput. Every payload is checked to
+round-trip. Run with ``python -m benchmarks.bench_serde``.
+"""
+
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.utils import serde as compact
+
+TURNS = 200
+REPEAT = 50
+
+
+def build_state() -> dict:
+    messages = []
+    for i in range(TURNS):
+        messages.append(HumanMessage(content="What's the weather like?", id=f"h{i}"))
+        messages.append(
+            AIMessage(
+                content="",
+                id=f"a{i}",
+                tool_calls=[
+                    {"name": "check_weather", "args": {"day": i}, "id": f"t{i}"}
+                ],
+                usage_metadata={
+                    "input_tokens": 40 + i,
+                    "output_tokens": 12,
+                    "total_tokens": 52 + i,
+                },
+            )
+        )
+        messages.append(ToolMessage(content=f"Sunny, {i % 30} C", tool_call_id=f"t{i}"))
+        messages.append(AIMessage(content="It's sunny today.", id=f"r{i}"))
+    return {"messages": messages, "version": "1.0", "metadata": {"turn": TURNS}}
+
+
+def bench(name: str, serde, state: dict) -> None:
+    dumped = serde.dumps_typed(state)
+    assert serde.loads_typed(dumped) == state
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        serde.dumps_typed(state)
+    dumps = (time.perf_counter() - start) / REPEAT
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        serde.loads_typed(dumped)
+    loads = (time.perf_counter() - start) / REPEAT
+    print(
+        f"{name:20s} {len(dumped[1]) / 1e3:8.1f} kB  "
+        f"dumps {dumps * 1e3:6.2f} ms  loads {loads * 1e3:6.2f} ms"
+    )
+
+
+def main() -> None:
+    state = build_state()
+    print(f"{len(state['messages'])} messages")
+    bench("JsonPlusSerializer", JsonPlusSerializer(), state)
+    bench("Compact", compact.CompactSerializer(), state)
+    bench("Compact + zlib", compact.CompactSerializer(compression="zlib"), state)
+    if compact.zstandard is not None:
+        bench("Compact + zstd", compact.CompactSerializer(compression="zstd"), state)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: shared-data throughput from 1 to N worker threads.
+
+Each worker increments shared counters in a loop. Compared: one global lock
+around a dict (the baseline), ``SharedData.update`` with every worker on its
+own key and with all workers on one key, and a single ``PNCounter``.
+Reports total increments per second; with the GIL enabled, the gains come
+from less lock contention rather than parallelism. Run with
+``python -m benchmarks.bench_shared_data``.
+"""
+
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+from src.utils.shared_data import SharedData
+
+OPS = 50_000
+WORKERS = (1, 2, 4, 8)
+
+
+def run(workers: int, work: Callable[[int], None]) -> float:
+    start = threading.Barrier(workers + 1)
+
+    def worker(i: int) -> None:
+        start.wait()
+        work(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return workers * OPS / (time.perf_counter() - began)
+
+
+def global_lock(workers: int) -> float:
+    lock, data = threading.Lock(), {}
+
+    def work(i: int) -> None:
+        key = f"counter_{i}"
+        for _ in range(OPS):
+            with lock:
+                data[key] = data.get(key, 0) + 1
+
+    return run(workers, work)
+
+
+def striped(workers: int, same_key: bool) -> float:
+    shared = SharedData()
+
+    def increment(value: int) -> int:
+        return value + 1
+
+    def work(i: int) -> None:
+        key = "counter" if same_key else f"counter_{i}"
+        for _ in range(OPS):
+            shared.update(key, increment, 0)
+
+    rate = run(workers, work)
+    assert sum(shared.snapshot().values()) == workers * OPS
+    return rate
+
+
+def crdt(workers: int) -> float:
+    counter = SharedData().counter("counter")
+
+    def work(i: int) -> None:
+        for _ in range(OPS):
+            counter.add(1)
+
+    rate = run(workers, work)
+    assert counter.value == workers * OPS
+    return rate
+
+
+def main() -> None:
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{OPS:,} increments per worker, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'workers':>16s}" + "".join(f"{n:>13d}" for n in WORKERS))
+    for name, bench in [
+        ("global lock", global_lock),
+        ("striped, own key", lambda n: striped(n, same_key=False)),
+        ("striped, one key", lambda n: striped(n, same_key=True)),
+        ("PNCounter", crdt),
+    ]:
+        rates = "".join(f"{bench(n) / 1e6:9.2f} M/s" for n in WORKERS)
+        print(f"{name:>16s} {rates}")
+
+
+if __name__ == "__main__":
+    main()
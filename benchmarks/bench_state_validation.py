@@ -0,0 +1,94 @@
+"""
+Benchmark: per-node state re-validation vs. validating once at graph entry.
+
+The legacy pattern called ``ensure_valid_state`` in every node and router,
+rebuilding the default state (fresh messages and tool dicts) and formatting
+the whole state into debug log lines each time. Run with
+``python -m benchmarks.bench_state_validation``.
+"""
+
+import logging
+import time
+from typing import Annotated, Any, TypedDict
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langgraph.graph.message import add_messages
+
+from src.utils.validation import StateValidator
+
+logger = logging.getLogger(__name__)
+
+STEPS_PER_RUN = 4  # init, parallel_executor, route_results, result_aggregator
+RUNS = 500
+
+
+class State(TypedDict):
+    messages: Annotated[list[BaseMessage], add_messages]
+    pending_tools: list[dict]
+    results: dict[str, Any]
+    errors: dict[str, str]
+
+
+def create_default_state() -> dict[str, Any]:
+    return {
+        "messages": [HumanMessage(content="Starting parallel tool execution...")],
+        "pending_tools": [
+            {"id": "search_1", "tool_name": "T", "args": {"query": "a"}},
+            {"id": "search_2", "tool_name": "T", "args": {"query": "b"}},
+        ],
+        "results": {},
+        "errors": {},
+    }
+
+
+def legacy_ensure_valid_state(state: dict) -> dict[str, Any]:
+    logger.debug(f"Ensuring valid state for input: {state}")
+    default_state = create_default_state()
+    if not state:
+        return default_state
+    valid_state = {
+        "messages": state.get("messages", default_state["messages"]),
+        "pending_tools": state.get("pending_tools", default_state["pending_tools"]),
+        "results": state.get("results", default_state["results"]),
+        "errors": state.get("errors", default_state["errors"]),
+    }
+    if not valid_state["messages"]:
+        valid_state["messages"] = default_state["messages"]
+    logger.debug(f"Validated state: {valid_state}")
+    return valid_state
+
+
+def bench_legacy(state: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        for _ in range(STEPS_PER_RUN):
+            legacy_ensure_valid_state(state)
+    return time.perf_counter() - start
+
+
+def bench_validate_once(state: dict) -> float:
+    validate = StateValidator(State, create_default_state(), non_empty=["messages"])
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        valid = validate(state)
+        for _ in range(STEPS_PER_RUN - 1):
+            valid["pending_tools"]  # downstream nodes read state directly
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    state = create_default_state()
+    state["messages"] = [HumanMessage(content=f"message {i}") for i in range(20)]
+    steps = RUNS * STEPS_PER_RUN
+
+    for name, bench in [
+        ("ensure_valid_state per node", bench_legacy),
+        ("validate once at entry", bench_validate_once),
+    ]:
+        elapsed = bench(state)
+        per_step = elapsed / steps * 1e6
+        print(f"{name:28s} {elapsed * 1e3:9.2f} ms  {per_step:9.2f} us/step")
+
+
+if __name__ == "__main__":
+    main()
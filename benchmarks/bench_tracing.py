@@ -0,0 +1,63 @@
+"""
+Benchmark: eager f-string debug logging vs. the lazy tracer.
+
+With DEBUG disabled, an f-string log call still renders the whole state;
+the tracer returns after a single level check. Run with
+``python -m benchmarks.bench_tracing``.
+"""
+
+import logging
+import time
+
+from langchain_core.messages import HumanMessage
+
+from src.utils.tracing import Tracer
+
+CALLS = 2_000
+
+logger = logging.getLogger("benchmarks.tracing")
+tracer = Tracer("benchmarks.tracing")
+
+
+def bench_fstring(state: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        logger.debug(f"Validated state: {state}")
+    return time.perf_counter() - start
+
+
+def bench_tracer(state: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        tracer.debug("Validated state", state=state)
+    return time.perf_counter() - start
+
+
+def bench_noop(state: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        pass
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    state = {
+        "messages": [HumanMessage(content=f"message {i}") for i in range(50)],
+        "pending_tools": [{"id": f"search_{i}", "args": {}} for i in range(10)],
+        "results": {},
+        "errors": {},
+    }
+
+    print("DEBUG disabled:")
+    for name, bench in [
+        ("f-string logger.debug", bench_fstring),
+        ("tracer.debug", bench_tracer),
+        ("empty loop", bench_noop),
+    ]:
+        elapsed = bench(state)
+        print(f"  {name:24s} {elapsed / CALLS * 1e9:12.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,32 @@ Extension of Exercise 1.1 with message history management
 """
 
 from datetime import datetime
-from typing import Annotated, TypedDict
+from typing import Annotated, NotRequired, TypedDict
 
 from langchain_core.messages import BaseMessage, HumanMessage
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
 
+from src.utils.windowing import (
+    SUMMARY_SEPARATOR,
+    TokenCounter,
+    evict,
+    fold_summary,
+    split_window,
+)
+
+# Token counts are computed once per message id
+token_counter = TokenCounter()
+
 
 class State(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
     summary: str
     window_size: int
+    # Optional token budget for the window, on top of window_size
+    token_budget: NotRequired[int]
+    # Summary of the messages already evicted from the window
+    evicted_summary: NotRequired[str]
 
 
 def llm_response(state: State) -> State:
@@ -54,19 +69,32 @@ def llm_response(state: State) -> State:
     return state
 
 
-def message_windowing(state: State) -> State:
-    """Maintain a sliding window of recent messages."""
-    if len(state["messages"]) > state["window_size"]:
-        state["messages"] = state["messages"][-state["window_size"] :]
-    return state
+def message_windowing(state: State) -> dict:
+    """Evict the oldest messages that no longer fit in the window."""
+    evicted, _ = split_window(
+        state["messages"],
+        max_tokens=state.get("token_budget"),
+        max_messages=state["window_size"],
+        counter=token_counter,
+    )
+    if not evicted:
+        return {}
+    return {
+        "messages": evict(evicted),
+        "evicted_summary": fold_summary(state.get("evicted_summary", ""), evicted),
+    }
 
 
-def summary_generation(state: State) -> State:
+def summary_generation(state: State) -> dict:
     """Generate a summary when conversation gets long enough."""
-    if len(state["messages"]) > 2:
-        messages_text = " -> ".join([m.content for m in state["messages"]])
-        state["summary"] = f"Conversation summary: {messages_text}"
-    return state
+    evicted_summary = state.get("evicted_summary", "")
+    if not evicted_summary and len(state["messages"]) <= 2:
+        return {}
+    # Only the bounded window is joined; older messages are already folded
+    # into evicted_summary.
+    parts = [evicted_summary] if evicted_summary else []
+    parts.extend(str(m.content) for m in state["messages"])
+    return {"summary": f"Conversation summary: {SUMMARY_SEPARATOR.join(parts)}"}
 
 
 def should_end(state: State) -> bool:
@@ -101,4 +129,10 @@ graph = graph_builder.compile()
 default_input = {"messages": [], "summary": "", "window_size": 3}
 
 # Make variables available for testing
-__all__ = ["default_input", "graph"]
+__all__ = [
+    "default_input",
+    "graph",
+    "message_windowing",
+    "summary_generation",
+    "token_counter",
+]
@@ -7,42 +7,70 @@
 # - Add at least 3 different response paths
 # - Implement proper handling for ambiguous cases
 
-from typing import Annotated, TypedDict
+from typing import Annotated, Any, NotRequired, TypedDict
 
 from langchain_core.messages import AIMessage, BaseMessage
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
 
+from src.utils.batch_classifier import KeywordClassifier
+from src.utils.routing import Intent, IntentRouter
+
+# All keywords are compiled into one pattern; earlier intents take precedence
+intent_router = IntentRouter(
+    [
+        Intent("greeting", ("hello",), confidence=0.9),
+        Intent("help", ("help",), confidence=0.8),
+    ],
+    default="unknown",
+    default_confidence=0.1,
+)
+
+# Same intents and matching rules, for classifying many messages at once
+batch_classifier = KeywordClassifier.from_intents(
+    intent_router.intents, default="unknown", default_confidence=0.1
+)
+
 
 class State(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
     classification: str
     confidence: float
+    # Set by invoke_batch: classification already holds this turn's label
+    preclassified: NotRequired[bool]
 
 
 def classifier_node(state: State) -> State:
     """Classify incoming messages to determine response path."""
-    message = state["messages"][-1].content
+    # Inputs pre-classified by classify_batch skip the per-message router
+    if state.get("preclassified"):
+        return {"preclassified": False}
+
+    route = intent_router.route(state["messages"][-1].content)
 
     # Return classification without modifying messages
-    if "hello" in message.lower():
-        return {
-            "messages": state["messages"],  # Keep existing messages
-            "classification": "greeting",
-            "confidence": 0.9,
-        }
-    elif "help" in message.lower():
-        return {
-            "messages": state["messages"],  # Keep existing messages
-            "classification": "help",
-            "confidence": 0.8,
-        }
-    else:
-        return {
-            "messages": state["messages"],  # Keep existing messages
-            "classification": "unknown",
-            "confidence": 0.1,
-        }
+    return {
+        "messages": state["messages"],  # Keep existing messages
+        "classification": route.intent,
+        "confidence": route.confidence,
+    }
+
+
+def classify_batch(messages: list[BaseMessage]) -> list[dict[str, Any]]:
+    """Classify many messages in one vectorized call."""
+    return batch_classifier.classify([str(m.content) for m in messages])
+
+
+def invoke_batch(inputs: list[State], **kwargs: Any) -> list[dict[str, Any]]:
+    """Classify all inputs at once, then route them with ``graph.batch``."""
+    labels = classify_batch([state["messages"][-1] for state in inputs])
+    return graph.batch(
+        [
+            {**state, **label, "preclassified": True}
+            for state, label in zip(inputs, labels, strict=True)
+        ],
+        **kwargs,
+    )
 
 
 def response_node_1(state: State) -> State:
@@ -119,4 +147,11 @@ graph = graph_builder.compile()
 default_input = {"messages": [], "classification": "", "confidence": 0.0}
 
 # Make variables available for testing
-__all__ = ["default_input", "graph"]
+__all__ = [
+    "batch_classifier",
+    "classify_batch",
+    "default_input",
+    "graph",
+    "intent_router",
+    "invoke_batch",
+]
@@ -3,28 +3,27 @@ UNIT 2: Building Agents with LangGraph
 Exercise 2.2 - "Multi-Tool Agent" - Updated with all required exports
 """
 
-import logging
-import math
 import os
 from datetime import datetime
 from typing import Annotated, Any, Literal, NotRequired, TypedDict
 
-import numexpr
 from langchain_community.tools import TavilySearchResults
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
 from langgraph.graph.state import CompiledStateGraph
 
 from src.config import settings
+from src.utils.calculator import CalculatorEngine
+from src.utils.extraction import ExtractionCache, ExtractionService
+from src.utils.routing import Intent, IntentRouter
+from src.utils.tool_registry import ToolRegistry
+from src.utils.tracing import get_tracer
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
+# Lazy tracing: nothing is formatted unless DEBUG is enabled by the application
+tracer = get_tracer(__name__)
 
 # Set API keys in environment
 os.environ["TAVILY_API_KEY"] = settings.tavily_api_key
@@ -34,6 +33,27 @@ os.environ["OPENAI_API_KEY"] = settings.openai_api_key
 llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
 tavily_tool = TavilySearchResults(tavily_api_key=settings.tavily_api_key)
 
+# Calculator expressions are compiled once and reused
+calculator_engine = CalculatorEngine()
+
+# ToolNodes are built once per tool set and reused across invocations
+tool_registry = ToolRegistry()
+
+# Extraction prompts/chains are cached per instruction string, and results are
+# memoized so the selector and executor don't extract the same thing twice
+extraction_cache = ExtractionCache(path=settings.extraction_cache_path)
+extraction_service = ExtractionService(llm, cache=extraction_cache)
+
+# Tool selection keywords, compiled once; weather wins over calculator keywords
+tool_router = IntentRouter(
+    [
+        Intent("check_weather", ("weather",)),
+        Intent("calculator", ("calculate", "compute", "solve", "+", "-", "*", "/")),
+    ],
+    default="TavilySearchResults",
+)
+
+
 class State(TypedDict, total=False):
     """State for the multi-tool agent with optional fields."""
     messages: Annotated[list[BaseMessage], add_messages]
@@ -46,40 +66,33 @@ class State(TypedDict, total=False):
 
 
 def extract_information_with_llm(message: str, instructions: str) -> str:
-    """Extract information from a message using LLM."""
-    logger.debug(f"Extracting information from: {message}")
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", instructions),
-        ("user", "{query}"),
-    ])
-    chain = prompt | llm
-    response = chain.invoke({"query": message})
-    extracted_info = response.content.strip()
-    logger.debug(f"Extracted information: {extracted_info}")
+    """Extract information from a message using LLM.
+
+    Graphs running on other threads (``graph.batch``, a thread pool) share
+    one model call for extractions made within the same batch window.
+    """
+    tracer.debug("Extracting information", message=message)
+    extracted_info = extraction_service.extract_batched(message, instructions)
+    tracer.debug("Extracted information", extracted=extracted_info)
     return extracted_info
 
 
 @tool
 def calculator(expression: str) -> str:
     """Calculate expression using Python's numexpr library."""
-    logger.debug(f"Calculator received: {expression}")
-    local_dict = {"pi": math.pi, "e": math.e}
+    tracer.debug("Calculator received", expression=expression)
     try:
-        result = numexpr.evaluate(
-            expression.strip(),
-            global_dict={},
-            local_dict=local_dict,
-        )
+        result = calculator_engine.calculate(expression)
         return str(float(result))
     except Exception as e:
-        logger.error(f"Calculator error: {e}")
+        tracer.error("Calculator error", error=e)
         return f"Error evaluating expression: {e}"
 
 
 @tool
 def check_weather(location: str, at_time: datetime | None = None) -> str:
     """Return the weather forecast for the specified location."""
-    logger.debug(f"Weather check for: {location}")
+    tracer.debug("Weather check", location=location)
     loc = location.strip()
     time_str = f" at {at_time}" if at_time else ""
     return f"It's always sunny in {loc}{time_str}"
@@ -87,7 +100,7 @@ def check_weather(location: str, at_time: datetime | None = None) -> str:
 
 def tool_selector(state: State) -> State:
     """Select appropriate tool based on message content and usage limits."""
-    logger.debug("Entering tool_selector")
+    tracer.debug("Entering tool_selector", state=state)
 
     # Initialize state on first call
     if not state.get("available_tools"):
@@ -114,6 +127,7 @@ def tool_selector(state: State) -> State:
         return state
 
     message = state["messages"][-1].content.lower()
+    route = tool_router.route(message)
     result_state = dict(state)
 
     def check_rate_limit(tool_name: str) -> bool:
@@ -121,7 +135,7 @@ def tool_selector(state: State) -> State:
         limit = state["rate_limits"].get(tool_name, float("inf"))
         return usage < limit
 
-    if "weather" in message:
+    if route.intent == "check_weather":
         if not check_rate_limit("check_weather"):
             return {
                 **state,
@@ -142,7 +156,7 @@ def tool_selector(state: State) -> State:
                 "check_weather": state["tool_usage"].get("check_weather", 0) + 1,
             },
         })
-    elif any(word in message for word in ["calculate", "compute", "solve", "+", "-", "*", "/"]):
+    elif route.intent == "calculator":
         if not check_rate_limit("calculator"):
             return {
                 **state,
@@ -180,7 +194,7 @@ def tool_selector(state: State) -> State:
 
 def _execute_direct_tool(state: State, tool_name: str, message: str, tool: Any) -> str:
     """Execute a tool directly (used mainly in testing contexts)."""
-    logger.debug(f"Executing direct tool: {tool_name}")
+    tracer.debug("Executing direct tool", tool_name=tool_name)
 
     if tool_name == "calculator":
         expr = extract_information_with_llm(
@@ -197,14 +211,14 @@ def _execute_direct_tool(state: State, tool_name: str, message: str, tool: Any)
             )
         output = tool(location)
 
-    logger.debug(f"Direct tool output: {output}")
+    tracer.debug("Direct tool output", output=output)
     return output
 
 
 def _execute_with_tool_node(state: State, tool_name: str, message: str, tools: list[Any]) -> dict:
     """Execute a tool using ToolNode."""
-    logger.debug(f"Executing with ToolNode: {tool_name}")
-    tool_node = ToolNode(tools)
+    tracer.debug("Executing with ToolNode", tool_name=tool_name)
+    tool_node = tool_registry.get_tool_node(tools)
 
     if tool_name == "calculator":
         expr = extract_information_with_llm(
@@ -248,7 +262,7 @@ def _process_tool_output(result: Any) -> str:
 
 def tool_executor(state: State) -> State:
     """Execute the selected tool with appropriate parameters."""
-    logger.debug(f"Executing tool: {state.get('tool_name')}")
+    tracer.debug("Executing tool", tool_name=state.get("tool_name"))
 
     if not state.get("tool_name"):
         return {**state, "tool_outputs": []}
@@ -266,17 +280,17 @@ def tool_executor(state: State) -> State:
             result = _execute_with_tool_node(state, tool_name, message, tools)
             output = _process_tool_output(result)
 
-        logger.debug(f"Final tool output: {output}")
+        tracer.debug("Final tool output", output=output)
         return {**state, "tool_outputs": [output]}
 
     except Exception as e:
-        logger.exception("Tool execution error")
+        tracer.exception("Tool execution error")
         return {**state, "tool_outputs": [f"Error: {str(e)}"]}
 
 
 def result_processor(state: State) -> State:
     """Process tool execution results."""
-    logger.debug("Processing results")
+    tracer.debug("Processing results")
     if not state.get("tool_outputs"):
         return state
 
@@ -289,10 +303,10 @@ def result_processor(state: State) -> State:
 
 def get_next_step(state: State) -> Literal["tool_selector", "end"]:
     """Determine the next step in the conversation."""
-    logger.debug("Checking next step")
+    tracer.debug("Checking next step")
 
     if not state.get("messages"):
-        logger.debug("No messages, returning end")
+        tracer.debug("No messages, returning end")
         return "end"
 
     last_message = state["messages"][-1]
@@ -300,18 +314,18 @@ def get_next_step(state: State) -> Literal["tool_selector", "end"]:
     # End conditions
     if isinstance(last_message, HumanMessage):
         if "thanks" in last_message.content.lower():
-            logger.debug("Thanks detected, ending conversation")
+            tracer.debug("Thanks detected, ending conversation")
             return "end"
         if "bye" in last_message.content.lower():
-            logger.debug("Goodbye detected, ending conversation")
+            tracer.debug("Goodbye detected, ending conversation")
             return "end"
 
     # Also end if we've completed a tool execution
     if isinstance(last_message, AIMessage) and state.get("tool_outputs"):
-        logger.debug("Tool execution complete, ending cycle")
+        tracer.debug("Tool execution complete, ending cycle")
         return "end"
 
-    logger.debug("Continuing to tool selection")
+    tracer.debug("Continuing to tool selection")
     return "tool_selector"
 
 
@@ -361,12 +375,17 @@ graph = create_agent()
 # Update exports
 __all__ = [
     "calculator",
+    "calculator_engine",
     "check_weather",
     "extract_information_with_llm",
+    "extraction_cache",
+    "extraction_service",
     "tool_executor",
     "tool_selector",
     "result_processor",
     "get_next_step",
     "graph",
+    "tool_registry",
+    "tool_router",
     "default_input",  # Added default_input to exports
 ]
\ No newline at end of file
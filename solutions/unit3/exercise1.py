@@ -7,11 +7,60 @@
 # - Implement reload from checkpoint
 # - Add checkpoint cleanup logic
 
+import threading
 from typing import Annotated, Any, TypedDict
 
 from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, StateGraph
 from langgraph.graph.message import add_messages
+from langgraph.graph.state import CompiledStateGraph
+
+from src.config import settings
+from src.utils.checkpointing import SQLiteSaver
+from src.utils.retention import CheckpointCompactor, RetentionPolicy
+from src.utils.serde import CompactSerializer
+
+# Durable checkpoints and their retention are started on first use, not on
+# import: until then there is no database, writer thread or compactor thread
+_persistence: tuple[SQLiteSaver, CheckpointCompactor] | None = None
+_persistence_lock = threading.Lock()
+
+
+def start_persistence() -> tuple[SQLiteSaver, CheckpointCompactor]:
+    """Open the checkpoint database and start background retention, once.
+
+    Writes are batched by the saver's writer thread and channel values use
+    the compact message encoding, zlib-compressed when large. Old
+    checkpoints are pruned by the compactor's thread.
+    """
+    global _persistence
+    with _persistence_lock:
+        if _persistence is None:
+            checkpointer = SQLiteSaver(
+                settings.checkpoint_path or ":memory:",
+                serde=CompactSerializer(compression="zlib"),
+            )
+            retention = CheckpointCompactor(
+                checkpointer,
+                RetentionPolicy(
+                    keep_last=20, keep_hourly=24, keep_daily=7, max_bytes=64 << 20
+                ),
+            )
+            retention.start()
+            _persistence = checkpointer, retention
+        return _persistence
+
+
+def stop_persistence() -> None:
+    """Stop retention and close the checkpoint database, if started."""
+    global _persistence
+    with _persistence_lock:
+        if _persistence is None:
+            return
+        (checkpointer, retention), _persistence = _persistence, None
+    retention.stop()
+    checkpointer.close()
 
 
 class State(TypedDict):
@@ -28,9 +77,11 @@ def chat_completion_checkpointed(state: State) -> State:
     return {"messages": [], "version": "v1", "metadata": {"last_restored": True}}
 
 
-def cleanup_checkpointed(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for cleaning up old states
+def cleanup_checkpointed(state: State, config: RunnableConfig) -> State:
+    """Schedule retention for this thread's checkpoints."""
+    thread_id = config.get("configurable", {}).get("thread_id")
+    if thread_id is not None and _persistence is not None:
+        _persistence[1].schedule(thread_id)
     if state["metadata"].get("last_restored"):
         return {"metadata": {"last_restored": False, "old_states_cleaned_up": False}}
     return {"metadata": {"old_states_cleaned_up": True}}
@@ -51,3 +102,12 @@ graph_builder.add_edge("chat_completion", "cleanup")
 graph_builder.add_edge("cleanup", "chat_completion")
 
 graph = graph_builder.compile()
+
+
+def compile_checkpointed() -> CompiledStateGraph:
+    """Compile the graph with the durable checkpointer, starting it if needed.
+
+    Runs of the returned graph need a ``thread_id`` in their config.
+    """
+    checkpointer, _ = start_persistence()
+    return graph_builder.compile(checkpointer=checkpointer)
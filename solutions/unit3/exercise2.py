@@ -7,61 +7,101 @@
 # - Implement branch merging
 # - Add branch cleanup logic
 
-from typing import Annotated, TypedDict
+from typing import Annotated, NotRequired, TypedDict
+from uuid import uuid4
 
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, StateGraph
 from langgraph.graph.message import add_messages
 
+from src.utils.branching import MAIN, BranchStores
+from src.utils.diffing import diff_branches
+from src.utils.merging import merge_branches as merge_branch
+from src.utils.merging import reducers_from_schema
+
+# Branches share the main conversation's history instead of copying it; each
+# conversation has its own store
+branch_stores = BranchStores()
+
 
 class State(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
     branch_id: str
     parent_checkpoint: str
     changes: list[dict]
+    # Names the conversation's branch store when the run has no thread_id
+    conversation_id: NotRequired[str]
+
+
+def conversation_id(state: State, config: RunnableConfig) -> str:
+    """Return the id of the conversation a node runs in.
+
+    That is the run's ``thread_id``; a run without one gets a fresh id when
+    it creates its first branch, carried along in the state.
+    """
+    thread_id = config.get("configurable", {}).get("thread_id")
+    if thread_id is not None:
+        return str(thread_id)
+    return state.get("conversation_id") or f"run:{uuid4().hex}"
+
+
+# How each channel merges, from the reducers in the schema
+channel_merges = reducers_from_schema(State)
 
 
-def create_branch(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for creating a new branch
+def create_branch(state: State, config: RunnableConfig) -> State:
+    """Fork a what-if branch off the main conversation and write to it."""
+    conversation = conversation_id(state, config)
+    store = branch_stores.get_or_create(conversation)
+    # Bring main up to date with the conversation, sharing the messages
+    main = store.get(MAIN)
+    store.append(MAIN, state.get("messages", [])[len(main) :])
     if not state.get("branch_id"):
-        return {
-            "messages": [],
-            "branch_id": "branch_1",
-            "parent_checkpoint": "main",
-            "changes": [],
-        }
+        branch_id = "branch_1"
     elif state["branch_id"] == "branch_1":
-        return {
-            "messages": [],
-            "branch_id": "branch_2",
-            "parent_checkpoint": "main",
-            "changes": [],
-        }
-    return state
-
-
-def diff_states(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for diffing two states
-    if state["branch_id"] == "branch_1":
-        return {"changes": [{"message": "This is a change from branch 1"}]}
-    elif state["branch_id"] == "branch_2":
-        return {"changes": [{"message": "This is a change from branch 2"}]}
-    return state
-
-
-def merge_branches(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for merging two branches
+        branch_id = "branch_2"
+    else:
+        return state
+    store.fork(MAIN, branch_id, replace=True)
+    # The branch's own write: stored once, on the branch alone
+    what_if = f"This is a change from {branch_id.replace('_', ' ')}"
+    store.append(branch_id, [AIMessage(content=what_if, id=uuid4().hex)])
     return {
         "messages": [],
-        "branch_id": "main",
+        "branch_id": branch_id,
+        "parent_checkpoint": MAIN,
+        "changes": [],
+        "conversation_id": conversation,
+    }
+
+
+def diff_states(state: State, config: RunnableConfig) -> State:
+    """Record how the current branch differs from the branch it forked."""
+    store = branch_stores.get(conversation_id(state, config))
+    branch_id = state.get("branch_id")
+    if store is None or branch_id not in store or branch_id == MAIN:
+        return state
+    branch = store.get(branch_id)
+    return {"changes": diff_branches(store, branch.parent_id, branch_id)}
+
+
+def merge_branches(state: State, config: RunnableConfig) -> State:
+    """Merge the current branch back into the branch it forked.
+
+    The merged messages are added to the conversation and merge conflicts
+    are reported as the changes.
+    """
+    store = branch_stores.get(conversation_id(state, config))
+    branch_id = state.get("branch_id")
+    if store is None or branch_id not in store or branch_id == MAIN:
+        return state
+    result = merge_branch(store, branch_id, merges=channel_merges)
+    return {
+        "messages": result.values["messages"],
+        "branch_id": MAIN,
         "parent_checkpoint": None,
-        "changes": [
-            {"message": "This is a change from branch 1"},
-            {"message": "This is a change from branch 2"},
-        ],
+        "changes": result.conflicts,
     }
 
 
@@ -7,12 +7,74 @@
 # - Implement thread cleanup
 # - Add thread monitoring
 
+import threading
 from typing import Annotated, Any, TypedDict
 
 from langchain_core.messages import BaseMessage
 from langgraph.graph import START, StateGraph
 from langgraph.graph.message import add_messages
 
+from src.config import settings
+from src.utils.checkpointing import SQLiteSaver
+from src.utils.lifecycle import ThreadLifecycle
+from src.utils.monitoring import ThreadMonitor
+from src.utils.serde import CompactSerializer
+from src.utils.shared_data import SharedData
+from src.utils.thread_pool import ThreadPoolManager
+
+# Turn latencies, queue depths and stuck threads, pulled with render()
+thread_monitor = ThreadMonitor(stuck_after=60.0)
+
+# Conversation turns run concurrently here, one at a time per thread_id; the
+# workers are only started by the first turn
+thread_pool = ThreadPoolManager(max_workers=8, max_pending=1024, monitor=thread_monitor)
+
+# Data shared by all threads, with per-key locks and lock-free counters
+shared_data = SharedData()
+
+
+def forget_thread(thread_id: str) -> None:
+    """Drop the in-memory bookkeeping of a hibernated thread."""
+    thread_monitor.forget(thread_id)
+    thread_pool.forget(thread_id)
+
+
+# Thread states stay in memory while in use; idle ones are checkpointed. The
+# checkpoint database and the idle sweep are started on first use, not on
+# import
+_thread_states: ThreadLifecycle | None = None
+_thread_states_lock = threading.Lock()
+
+
+def start_thread_states() -> ThreadLifecycle:
+    """Open the thread state store and start its idle sweep, once."""
+    global _thread_states
+    with _thread_states_lock:
+        if _thread_states is None:
+            thread_states = ThreadLifecycle(
+                SQLiteSaver(
+                    settings.checkpoint_path or ":memory:",
+                    serde=CompactSerializer(compression="zlib"),
+                ),
+                max_resident=10_000,
+                idle_after=300.0,
+                on_hibernate=forget_thread,
+            )
+            thread_states.start()
+            _thread_states = thread_states
+        return _thread_states
+
+
+def stop_thread_states() -> None:
+    """Stop the idle sweep and close the thread state store, if started."""
+    global _thread_states
+    with _thread_states_lock:
+        if _thread_states is None:
+            return
+        thread_states, _thread_states = _thread_states, None
+    thread_states.stop()
+    thread_states.checkpointer.close()
+
 
 class State(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
@@ -22,41 +84,65 @@ class State(TypedDict):
 
 
 def manage_thread_pool(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for managing the thread pool
+    """Pick the next conversation thread to work on.
+
+    This graph walks its two demo threads in order. The picked thread
+    resumes from its stored state, with its view of the shared counter
+    refreshed from ``shared_data``.
+    """
     if not state.get("thread_id"):
-        return {
-            "messages": [],
-            "thread_id": "thread_1",
-            "shared_data": {"counter": 0},
-            "locks": [],
-        }
+        thread_id = "thread_1"
     elif state["thread_id"] == "thread_1":
-        return {
-            "messages": [],
-            "thread_id": "thread_2",
-            "shared_data": {"counter": 1},
-            "locks": [],
-        }
-    return state
+        thread_id = "thread_2"
+    else:
+        return state
+    stored = start_thread_states().get(thread_id) or {}
+    counter = shared_data.counter("counter").value
+    return {
+        "messages": [],
+        "thread_id": thread_id,
+        "shared_data": {**stored.get("shared_data", {}), "counter": counter},
+        "locks": [],
+    }
+
+
+def _contribute(thread_id: str, state: State, increment: int) -> State:
+    """One turn of ``thread_id``: publish its increment and store its state."""
+    shared_data.counter("counter").add(increment)
+    # The state's copy is replaced rather than mutated in place
+    counter = state["shared_data"]["counter"] + increment
+    update = {
+        "shared_data": {**state["shared_data"], "counter": counter},
+        "locks": ["counter"],
+    }
+    start_thread_states().update(thread_id, {**update, "locks": []})
+    return update
 
 
 def synchronize_data(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for synchronizing shared data
-    if state["thread_id"] == "thread_1":
-        state["shared_data"]["counter"] += 1
-        return {"locks": ["counter"]}
-    elif state["thread_id"] == "thread_2":
-        state["shared_data"]["counter"] += 2
-        return {"locks": ["counter"]}
-    return state
+    """Add this thread's contribution to the shared counter.
+
+    The contribution runs as a turn of the thread on ``thread_pool``, so it
+    is serialized with the thread's other turns and timed by
+    ``thread_monitor``.
+    """
+    increment = {"thread_1": 1, "thread_2": 2}.get(state["thread_id"])
+    if increment is None:
+        return state
+    turn = thread_pool.submit(
+        state["thread_id"], _contribute, state["thread_id"], state, increment
+    )
+    return turn.result()
 
 
 def monitor_threads(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for monitoring thread health
-    return {"shared_data": {"counter": 3, "status": "healthy"}}
+    """Report the health of the conversation threads.
+
+    ``degraded`` while any thread has had a turn running on ``thread_pool``
+    for longer than ``thread_monitor.stuck_after`` without a heartbeat.
+    """
+    status = "degraded" if thread_monitor.stuck_threads() else "healthy"
+    return {"shared_data": {**state.get("shared_data", {}), "status": status}}
 
 
 # Initialize the graph
@@ -7,11 +7,37 @@
 # - Implement approval tracking
 # - Add notification system
 
+from collections.abc import Callable
 from typing import Annotated, TypedDict
 
 from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, StateGraph
 from langgraph.graph.message import add_messages
+from langgraph.types import interrupt
+
+from src.config import settings
+from src.utils.approval_store import ApprovalStore
+from src.utils.approvals import ApprovalQueue
+from src.utils.checkpointing import SQLiteSaver
+from src.utils.notifications import LocalSink, NotificationDispatcher
+from src.utils.serde import CompactSerializer
+
+# Threads waiting for a reviewer are suspended here, holding no worker
+checkpointer = SQLiteSaver(
+    settings.checkpoint_path or ":memory:",
+    serde=CompactSerializer(compression="zlib"),
+)
+
+# The parked approvals, indexed by status, action, thread and age
+approval_store = ApprovalStore()
+
+# Approvals parked by suspended threads; decide in bulk, then resume()
+approvals = ApprovalQueue(store=approval_store)
+
+# Notifications are delivered in batches off the graph step; LocalSink keeps
+# the latest ones, swap in a real sink to deliver them
+notifier = NotificationDispatcher(LocalSink(maxlen=10_000))
 
 
 class State(TypedDict):
@@ -34,36 +60,66 @@ def request_approval(state: State) -> State:
     return state
 
 
+def _review(state: State, decide: Callable[[dict], str]) -> State:
+    """Apply ``decide``'s decision to each pending action."""
+    pending, approved = [], list(state["approved_actions"])
+    for approval in state["pending_approvals"]:
+        if approval["status"] == "pending":
+            status = decide(approval)
+            approval = {**approval, "status": status}
+            if status == "approved":
+                approved.append({"action": approval["action"]})
+        pending.append(approval)
+    return {"pending_approvals": pending, "approved_actions": approved}
+
+
 def review_handler(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for handling reviews
-    if state["pending_approvals"][0]["status"] == "pending":
-        state["pending_approvals"][0]["status"] = "approved"
-        state["approved_actions"].append({"action": "send_email"})
-        return state
-    return state
+    """Suspend the thread until each pending action has been reviewed.
 
+    Each review is an ``interrupt``, parked in ``approvals`` (and tracked in
+    ``approval_store``) when the thread runs through ``approvals.run``; the
+    reviewer's decision, ``"approved"`` or ``"rejected"``, is what the
+    thread is resumed with.
+    """
+    return _review(state, lambda approval: interrupt({"action": approval["action"]}))
 
-def notification_sender(state: State) -> State:
-    """This is a stub, you should implement this yourself."""
-    # Implement the logic for sending notifications
+
+def auto_review_handler(state: State) -> State:
+    """Approve each pending action, for runs that can't be suspended."""
+    return _review(state, lambda approval: "approved")
+
+
+def notification_sender(state: State, config: RunnableConfig) -> State:
+    """Queue a notification that the email was sent, delivered by ``notifier``."""
     if state["approved_actions"]:
-        state["notifications"].append("Email sent successfully!")
-        return state
+        text = "Email sent successfully!"
+        thread_id = config.get("configurable", {}).get("thread_id")
+        notifier.notify(text, thread_id=thread_id)
+        return {"notifications": [*state["notifications"], text]}
     return state
 
 
-# Initialize the graph
-graph_builder = StateGraph(State)
+def build_graph(review: Callable[[State], State]) -> StateGraph:
+    """Build the approval flow with ``review`` as its review step."""
+    # Initialize the graph
+    graph_builder = StateGraph(State)
+
+    # Add the nodes
+    graph_builder.add_node("request_approval", request_approval)
+    graph_builder.add_node("review_handler", review)
+    graph_builder.add_node("notification_sender", notification_sender)
 
-# Add the nodes
-graph_builder.add_node("request_approval", request_approval)
-graph_builder.add_node("review_handler", review_handler)
-graph_builder.add_node("notification_sender", notification_sender)
+    # Add the edges
+    graph_builder.add_edge(START, "request_approval")
+    graph_builder.add_edge("request_approval", "review_handler")
+    graph_builder.add_edge("review_handler", "notification_sender")
+    return graph_builder
 
-# Add the edges
-graph_builder.add_edge(START, "request_approval")
-graph_builder.add_edge("request_approval", "review_handler")
-graph_builder.add_edge("review_handler", "notification_sender")
 
+# Without a checkpointer nothing could resume a suspended review, so the
+# plain graph approves its actions itself
+graph_builder = build_graph(auto_review_handler)
 graph = graph_builder.compile()
+
+# The graph that suspends threads for review and resumes them later
+approval_graph = build_graph(review_handler).compile(checkpointer=checkpointer)
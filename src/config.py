@@ -21,6 +21,12 @@ class Settings(BaseSettings):
     langsmith_api_key: str | None = None
     langsmith_project: str | None = "deepdive-langgraph"
 
+    # Optional SQLite file for persisting LLM extraction results
+    extraction_cache_path: str | None = None
+
+    # Optional SQLite file for graph checkpoints (in-memory when unset)
+    checkpoint_path: str | None = None
+
     # Environment configuration
     environment: str = "development"
 
@@ -0,0 +1,324 @@
+"""
+Indexed tracking of approvals.
+
+Keeping approvals in lists means every "pending approvals of this thread"
+or "requests older than an hour" is a scan over all of them. ``ApprovalStore``
+keeps each approval once and indexes it by status, action type and thread,
+and by status together with each of the other two. Every index bucket is a
+list of keys sorted by age, so
+
+- ``find`` by status, action, thread, status and action, or status and
+  thread, with an optional age range, costs a binary search plus the matches
+  returned; other combinations scan the smallest matching bucket,
+- ``count`` with the same filters is O(1),
+- ``transition`` moves approvals to another status in bulk: a few moves
+  are binary-search deletes and inserts, many are applied by rebuilding
+  each bucket touched in one linear pass,
+- ``transition_where`` does the same for everything ``find`` matches, e.g.
+  to expire every pending approval older than a deadline.
+"""
+
+import itertools
+import time
+from bisect import bisect_left, insort
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any
+
+# Beyond this many changes, a bucket is rebuilt instead of edited in place
+_REBUILD_AFTER = 64
+
+# (created_at, sequence number, id): unique, and sorts by age
+Key = tuple[float, int, str]
+
+# The attributes of each index, in the order ``find`` takes them as filters
+_INDEXED = (
+    ("status",),
+    ("action",),
+    ("thread_id",),
+    ("status", "action"),
+    ("status", "thread_id"),
+)
+
+
+@dataclass(slots=True)
+class TrackedApproval:
+    """One approval and the values it is indexed by."""
+
+    id: str
+    action: str | None
+    thread_id: str | None
+    status: str
+    created_at: float
+    key: Key
+
+
+class _Buckets:
+    """Age-sorted keys grouped by some attributes of the approvals.
+
+    Buckets are keyed by the attribute's value, or by the tuple of values
+    with several attributes.
+    """
+
+    __slots__ = ("_buckets", "attrs", "value")
+
+    def __init__(self, attrs: tuple[str, ...]) -> None:
+        self.attrs = attrs
+        self.value = attrgetter(*attrs)
+        self._buckets: dict[Any, list[Key]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get(self, value: Any) -> list[Key]:
+        return self._buckets.get(value, [])
+
+    def append(self, value: Any, key: Key) -> None:
+        bucket = self._buckets.get(value)
+        if bucket is None:
+            self._buckets[value] = [key]
+        elif bucket[-1] < key:
+            # Approvals are mostly added newest last
+            bucket.append(key)
+        else:
+            insort(bucket, key)
+
+    def add(self, value: Any, keys: list[Key]) -> None:
+        bucket = self._buckets.get(value)
+        if bucket is None:
+            self._buckets[value] = sorted(keys)
+        elif len(keys) > _REBUILD_AFTER:
+            keys.sort()
+            if bucket[-1] < keys[0]:
+                bucket += keys
+            else:
+                # Two sorted runs, which timsort merges in linear time
+                bucket += keys
+                bucket.sort()
+        else:
+            for key in keys:
+                insort(bucket, key)
+
+    def remove(self, value: Any, keys: list[Key]) -> None:
+        bucket = self._buckets[value]
+        if len(keys) > _REBUILD_AFTER:
+            # Every index shares the approval's key object: compare identities
+            drop = set(map(id, keys))
+            bucket[:] = [key for key in bucket if id(key) not in drop]
+        else:
+            for key in keys:
+                del bucket[bisect_left(bucket, key)]
+        if not bucket:
+            del self._buckets[value]
+
+
+def _group(
+    approvals: Iterable[TrackedApproval], value: Callable[[TrackedApproval], Any]
+) -> dict[Any, list[Key]]:
+    groups: dict[Any, list[Key]] = {}
+    for approval in approvals:
+        groups.setdefault(value(approval), []).append(approval.key)
+    return groups
+
+
+class ApprovalStore:
+    """Approvals indexed by status, action type, thread and age.
+
+    Args:
+        clock: Timestamp of newly added approvals.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self.clock = clock
+        self._approvals: dict[str, TrackedApproval] = {}
+        self._age: list[Key] = []
+        self._indexes = {attrs: _Buckets(attrs) for attrs in _INDEXED}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._approvals)
+
+    def __contains__(self, approval_id: str) -> bool:
+        return approval_id in self._approvals
+
+    def get(self, approval_id: str) -> TrackedApproval | None:
+        return self._approvals.get(approval_id)
+
+    def add(
+        self,
+        approval_id: str,
+        action: str | None,
+        thread_id: str | None = None,
+        status: str = "pending",
+        created_at: float | None = None,
+    ) -> TrackedApproval:
+        """Track a new approval; an id already tracked is returned as is."""
+        approval = self._approvals.get(approval_id)
+        if approval is not None:
+            return approval
+        created_at = self.clock() if created_at is None else created_at
+        key = (created_at, next(self._seq), approval_id)
+        approval = TrackedApproval(
+            approval_id, action, thread_id, status, created_at, key
+        )
+        self._approvals[approval_id] = approval
+        if not self._age or self._age[-1] < key:
+            self._age.append(key)
+        else:
+            insort(self._age, key)
+        for index in self._indexes.values():
+            index.append(index.value(approval), key)
+        return approval
+
+    def _bucket(
+        self, status: str | None, action: str | None, thread_id: str | None
+    ) -> list[Key]:
+        """Smallest bucket of an index on some of the given filters."""
+        filters = {
+            attr: value
+            for attr, value in (
+                ("status", status),
+                ("action", action),
+                ("thread_id", thread_id),
+            )
+            if value is not None
+        }
+        buckets = [
+            index.get(
+                filters[attrs[0]]
+                if len(attrs) == 1
+                else tuple(filters[attr] for attr in attrs)
+            )
+            for attrs, index in self._indexes.items()
+            if all(attr in filters for attr in attrs)
+        ]
+        return min(buckets, key=len) if buckets else self._age
+
+    def iter(
+        self,
+        status: str | None = None,
+        action: str | None = None,
+        thread_id: str | None = None,
+        older_than: float | None = None,
+        newer_than: float | None = None,
+    ) -> Iterator[TrackedApproval]:
+        """Yield the matching approvals, oldest first.
+
+        ``older_than`` and ``newer_than`` bound ``created_at`` (exclusive
+        and inclusive). Don't change the store while iterating.
+        """
+        bucket = self._bucket(status, action, thread_id)
+        lo = 0 if newer_than is None else bisect_left(bucket, (newer_than,))
+        hi = len(bucket) if older_than is None else bisect_left(bucket, (older_than,))
+        approvals = self._approvals
+        for i in range(lo, hi):
+            approval = approvals[bucket[i][2]]
+            if (
+                (status is None or approval.status == status)
+                and (action is None or approval.action == action)
+                and (thread_id is None or approval.thread_id == thread_id)
+            ):
+                yield approval
+
+    def find(
+        self,
+        status: str | None = None,
+        action: str | None = None,
+        thread_id: str | None = None,
+        older_than: float | None = None,
+        newer_than: float | None = None,
+        limit: int | None = None,
+    ) -> list[TrackedApproval]:
+        """Return the matching approvals, oldest first; see ``iter``."""
+        matches = self.iter(status, action, thread_id, older_than, newer_than)
+        return list(itertools.islice(matches, limit))
+
+    def count(
+        self,
+        status: str | None = None,
+        action: str | None = None,
+        thread_id: str | None = None,
+    ) -> int:
+        """Number of matching approvals; O(1) unless filtering by action and thread."""
+        filters = tuple(
+            attr
+            for attr, value in (
+                ("status", status),
+                ("action", action),
+                ("thread_id", thread_id),
+            )
+            if value is not None
+        )
+        if not filters or filters in self._indexes:
+            return len(self._bucket(status, action, thread_id))
+        return sum(1 for _ in self.iter(status, action, thread_id))
+
+    def transition(
+        self,
+        approval_ids: Iterable[str],
+        status: str,
+        from_status: str | None = None,
+    ) -> int:
+        """Move approvals to ``status``, only those in ``from_status`` if given.
+
+        Unknown ids are ignored. Returns how many approvals changed.
+        """
+        moved = []
+        for approval_id in approval_ids:
+            approval = self._approvals.get(approval_id)
+            if (
+                approval is not None
+                and approval.status != status
+                and (from_status is None or approval.status == from_status)
+            ):
+                moved.append(approval)
+        if not moved:
+            return 0
+        indexes = [index for attrs, index in self._indexes.items() if "status" in attrs]
+        for index in indexes:
+            for old, keys in _group(moved, index.value).items():
+                index.remove(old, keys)
+        for approval in moved:
+            approval.status = status
+        for index in indexes:
+            for new, keys in _group(moved, index.value).items():
+                index.add(new, keys)
+        return len(moved)
+
+    def transition_where(
+        self,
+        status: str,
+        *,
+        from_status: str | None = None,
+        action: str | None = None,
+        thread_id: str | None = None,
+        older_than: float | None = None,
+    ) -> int:
+        """Move every approval ``find`` matches to ``status``."""
+        ids = [
+            approval.id
+            for approval in self.iter(from_status, action, thread_id, older_than)
+        ]
+        return self.transition(ids, status)
+
+    def remove(self, approval_ids: Iterable[str]) -> int:
+        """Stop tracking approvals; returns how many were tracked."""
+        removed = [
+            approval
+            for approval_id in set(approval_ids)
+            if (approval := self._approvals.pop(approval_id, None)) is not None
+        ]
+        if len(removed) > _REBUILD_AFTER:
+            drop = {id(approval.key) for approval in removed}
+            self._age[:] = [key for key in self._age if id(key) not in drop]
+        else:
+            for approval in removed:
+                del self._age[bisect_left(self._age, approval.key)]
+        for index in self._indexes.values():
+            for value, keys in _group(removed, index.value).items():
+                index.remove(value, keys)
+        return len(removed)
+
+
+__all__ = ["ApprovalStore", "TrackedApproval"]
@@ -0,0 +1,294 @@
+"""
+Non-blocking approval queue for human-in-the-loop graphs.
+
+Approving an action inside a node, or waiting for a reviewer there, holds a
+worker (or a coroutine) per pending approval. Instead, a node asks for
+approval with LangGraph's ``interrupt``: the run stops, the thread's state
+stays in the graph's checkpointer, and nothing is left running.
+``ApprovalQueue`` records each such interrupt in an indexed SQLite table:
+
+- ``run(graph, thread_id, input)`` runs a turn and parks its interrupts,
+- ``pending()`` lists parked approvals, oldest first, by thread or action,
+- ``approve(ids)`` / ``reject(ids)`` / ``decide(ids, value)`` record
+  decisions in bulk, in one transaction,
+- ``resume(graph)`` resumes every thread with decided approvals, one
+  ``Command(resume=...)`` per thread covering all its decisions, and parks
+  the interrupts the resumed runs raise next.
+
+A parked approval costs one row, so a process can keep any number of them.
+The graph must be compiled with a checkpointer. An ``ApprovalStore`` passed
+as ``store`` indexes the queue's approvals in memory, by the same interrupt
+ids; it is rebuilt from the table when the queue is opened.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Mapping, Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any
+
+from langgraph.types import Command, Interrupt
+
+from src.utils.approval_store import ApprovalStore
+from src.utils.thread_pool import ThreadPoolManager
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DECIDED = "decided"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS approvals (
+    id TEXT PRIMARY KEY,
+    thread_id TEXT NOT NULL,
+    action TEXT,
+    value TEXT NOT NULL,
+    status TEXT NOT NULL,
+    decision TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS approvals_status ON approvals (status, created_at);
+CREATE INDEX IF NOT EXISTS approvals_thread ON approvals (thread_id, status);
+CREATE INDEX IF NOT EXISTS approvals_action ON approvals (action, status);
+"""
+
+
+@dataclass
+class Approval:
+    """One parked approval.
+
+    Attributes:
+        id: Id of the interrupt that asked for it.
+        thread_id: The suspended thread.
+        value: What the interrupt was raised with.
+        status: ``"pending"`` or ``"decided"``.
+        decision: The value the thread is resumed with, once decided.
+        created_at: When it was parked, as a Unix timestamp.
+    """
+
+    id: str
+    thread_id: str
+    value: Any
+    status: str
+    decision: Any
+    created_at: float
+
+    @property
+    def action(self) -> str | None:
+        return self.value.get("action") if isinstance(self.value, dict) else None
+
+
+def _approval(row: tuple) -> Approval:
+    id, thread_id, value, status, decision, created_at = row
+    return Approval(
+        id,
+        thread_id,
+        json.loads(value),
+        status,
+        None if decision is None else json.loads(decision),
+        created_at,
+    )
+
+
+def _config(thread_id: str, config: Mapping[str, Any] | None = None) -> dict[str, Any]:
+    config = dict(config or {})
+    config["configurable"] = {**config.get("configurable", {}), "thread_id": thread_id}
+    return config
+
+
+class ApprovalQueue:
+    """Approvals of suspended graph threads, persisted in SQLite.
+
+    Args:
+        path: SQLite database file; the default keeps it in memory.
+        store: Kept in step with the queue: approvals are added when
+            parked, move to ``"decided"`` and are removed once resumed.
+    """
+
+    def __init__(
+        self, path: str = ":memory:", store: ApprovalStore | None = None
+    ) -> None:
+        self.path = path
+        self.store = store
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        if store is not None:
+            rows = self._db.execute(
+                "SELECT id, action, thread_id, status, created_at FROM approvals"
+                " ORDER BY created_at, rowid"
+            )
+            for row in rows:
+                store.add(*row)
+
+    def park(self, thread_id: str, interrupts: Iterable[Interrupt]) -> list[str]:
+        """Record the interrupts a run of ``thread_id`` stopped at.
+
+        Interrupts already parked are left alone. Returns their ids.
+        """
+        now = time.time()
+        rows = [
+            (
+                interrupt.id,
+                thread_id,
+                interrupt.value.get("action")
+                if isinstance(interrupt.value, dict)
+                else None,
+                json.dumps(interrupt.value),
+                PENDING,
+                now,
+            )
+            for interrupt in interrupts
+        ]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO approvals"
+                " (id, thread_id, action, value, status, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if self.store is not None:
+                for id, thread_id, action, _, status, created_at in rows:
+                    self.store.add(id, action, thread_id, status, created_at)
+        return [row[0] for row in rows]
+
+    def run(
+        self,
+        graph: Any,
+        thread_id: str,
+        input: Any,
+        config: Mapping[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Run a turn of ``thread_id`` and park the interrupts it stops at."""
+        output = graph.invoke(input, _config(thread_id, config))
+        self.park(thread_id, output.get("__interrupt__", ()))
+        return output
+
+    def get(self, approval_id: str) -> Approval | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, thread_id, value, status, decision, created_at"
+                " FROM approvals WHERE id = ?",
+                (approval_id,),
+            ).fetchone()
+        return None if row is None else _approval(row)
+
+    def pending(
+        self,
+        thread_id: str | None = None,
+        action: str | None = None,
+        limit: int | None = None,
+        status: str = PENDING,
+    ) -> list[Approval]:
+        """Parked approvals with ``status``, oldest first."""
+        sql = (
+            "SELECT id, thread_id, value, status, decision, created_at"
+            " FROM approvals WHERE status = ?"
+        )
+        params: list[Any] = [status]
+        if thread_id is not None:
+            sql += " AND thread_id = ?"
+            params.append(thread_id)
+        if action is not None:
+            sql += " AND action = ?"
+            params.append(action)
+        sql += " ORDER BY created_at, rowid LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [_approval(row) for row in rows]
+
+    def count(self, status: str = PENDING) -> int:
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM approvals WHERE status = ?", (status,)
+            ).fetchone()
+        return count
+
+    def decide(self, approval_ids: Iterable[str], decision: Any) -> int:
+        """Record ``decision`` for the pending approvals ``approval_ids``.
+
+        Returns how many were still pending.
+        """
+        value = json.dumps(decision)
+        approval_ids = list(approval_ids)
+        with self._lock, self._db:
+            cursor = self._db.executemany(
+                "UPDATE approvals SET status = ?, decision = ?"
+                " WHERE id = ? AND status = ?",
+                [(DECIDED, value, id, PENDING) for id in approval_ids],
+            )
+            if self.store is not None:
+                self.store.transition(approval_ids, DECIDED, from_status=PENDING)
+            return cursor.rowcount
+
+    def approve(self, approval_ids: Iterable[str]) -> int:
+        return self.decide(approval_ids, "approved")
+
+    def reject(self, approval_ids: Iterable[str]) -> int:
+        return self.decide(approval_ids, "rejected")
+
+    def resume(
+        self,
+        graph: Any,
+        limit: int | None = None,
+        pool: ThreadPoolManager | None = None,
+        config: Mapping[str, Any] | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """Resume the threads of decided approvals, oldest first.
+
+        Each thread is resumed once with all of its decisions, on ``pool``
+        if given. Resumed approvals leave the queue and the interrupts the
+        runs stop at next are parked. Returns each thread's output; a
+        thread whose run failed keeps its approvals and is left out.
+        """
+        decided = self.pending(limit=limit, status=DECIDED)
+        by_thread: dict[str, dict[str, Any]] = {}
+        for approval in decided:
+            by_thread.setdefault(approval.thread_id, {})[approval.id] = (
+                approval.decision
+            )
+        runs: dict[str, Future] = {}
+        for thread_id, decisions in by_thread.items():
+            command = Command(resume=decisions)
+            if pool is not None:
+                runs[thread_id] = pool.submit(
+                    thread_id, graph.invoke, command, _config(thread_id, config)
+                )
+            else:
+                runs[thread_id] = future = Future()
+                try:
+                    future.set_result(graph.invoke(command, _config(thread_id, config)))
+                except Exception as e:
+                    future.set_exception(e)
+
+        outputs = {}
+        for thread_id, run in runs.items():
+            if run.exception() is not None:
+                logger.warning(
+                    "Resuming thread %s failed", thread_id, exc_info=run.exception()
+                )
+                continue
+            outputs[thread_id] = output = run.result()
+            self._remove(by_thread[thread_id])
+            self.park(thread_id, output.get("__interrupt__", ()))
+        return outputs
+
+    def _remove(self, approval_ids: Sequence[str]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM approvals WHERE id = ?", [(id,) for id in approval_ids]
+            )
+            if self.store is not None:
+                self.store.remove(approval_ids)
+
+    def close(self) -> None:
+        self._db.close()
+
+
+__all__ = ["DECIDED", "PENDING", "Approval", "ApprovalQueue"]
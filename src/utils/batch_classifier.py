@@ -0,0 +1,155 @@
+"""
+Vectorized batch classification over an exact keyword vocabulary.
+
+Classifying one message per graph invocation pays Python overhead for every
+keyword of every message. ``KeywordClassifier`` finds the keywords of a whole
+batch with one scan of the router's trie-shaped pattern, maps each keyword to
+its row of a ``(len(vocabulary), n_labels)`` weight matrix through an exact
+index, and scores every message with NumPy.
+
+Keywords match like ``IntentRouter`` matches them: case-insensitive
+substrings, so ``"help"`` matches ``"helpful"`` and ``"+"`` matches
+``"2+2"``. There is no hashing, so two keywords never share a weight row.
+"""
+
+import re
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+from src.utils.routing import Intent, trie_pattern
+
+
+class KeywordClassifier:
+    """Score messages by the vocabulary keywords they contain.
+
+    Each distinct keyword of a message contributes its weight row once. The
+    label with the highest score wins, ties going to the earlier label; with
+    ``precedence`` the first label scoring above zero wins instead, like the
+    if/elif order of ``IntentRouter``. Messages scoring zero for every label
+    get the default classification.
+
+    Args:
+        vocabulary: Keywords, one per weight matrix row.
+        labels: Label names, one per weight matrix column.
+        weights: Matrix of shape ``(len(vocabulary), len(labels))``.
+        confidences: Confidence reported for each label.
+        default: Label for messages without any scoring keyword.
+        default_confidence: Confidence of the default label.
+        precedence: Pick the first label with a positive score.
+    """
+
+    def __init__(
+        self,
+        vocabulary: Sequence[str],
+        labels: Sequence[str],
+        weights: np.ndarray,
+        confidences: Sequence[float],
+        default: str = "unknown",
+        default_confidence: float = 0.0,
+        precedence: bool = False,
+    ) -> None:
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != (len(vocabulary), len(labels)):
+            raise ValueError("weights must have a row per keyword, a column per label")
+        if len(confidences) != len(labels):
+            raise ValueError("confidences must have one entry per label")
+        self.vocabulary = [keyword.lower() for keyword in vocabulary]
+        if "" in self.vocabulary or len(set(self.vocabulary)) < len(vocabulary):
+            raise ValueError("keywords must be non-empty and distinct ignoring case")
+        self.labels = np.array([*labels, default], dtype=object)
+        self.confidences = np.array([*confidences, default_confidence])
+        self.weights = weights
+        self.precedence = precedence
+        index = {keyword: row for row, keyword in enumerate(self.vocabulary)}
+        # The pattern reports the longest keyword starting at each position;
+        # the keywords that are prefixes of it matched there too.
+        self._rows = {
+            keyword: [
+                index[keyword[:i]]
+                for i in range(1, len(keyword) + 1)
+                if keyword[:i] in index
+            ]
+            for keyword in self.vocabulary
+        }
+        self._pattern = (
+            re.compile(f"(?=({trie_pattern(self.vocabulary)}))")
+            if self.vocabulary
+            else None
+        )
+
+    @classmethod
+    def from_intents(
+        cls,
+        intents: Iterable[Intent],
+        default: str = "unknown",
+        default_confidence: float = 0.0,
+    ) -> "KeywordClassifier":
+        """Build a classifier that labels messages like ``IntentRouter``."""
+        intents = list(intents)
+        vocabulary: dict[str, int] = {}
+        for intent in intents:
+            for keyword in intent.keywords:
+                if keyword:
+                    vocabulary.setdefault(keyword.lower(), len(vocabulary))
+        weights = np.zeros((len(vocabulary), len(intents)))
+        for column, intent in enumerate(intents):
+            for keyword in intent.keywords:
+                if keyword:
+                    weights[vocabulary[keyword.lower()], column] = 1
+        return cls(
+            list(vocabulary),
+            [intent.name for intent in intents],
+            weights,
+            [intent.confidence for intent in intents],
+            default=default,
+            default_confidence=default_confidence,
+            precedence=True,
+        )
+
+    def scores(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the ``(len(texts), n_labels)`` score matrix."""
+        scores = np.zeros((len(texts), self.weights.shape[1]))
+        if self._pattern is None or not len(texts):
+            return scores
+        lowered = [text.lower() for text in texts]
+        ends = np.cumsum([len(text) + 1 for text in lowered]) - 1
+        starts = ends - [len(text) for text in lowered]
+        hits: list[tuple[int, int]] = [
+            (match.start(), row)
+            for match in self._pattern.finditer("\n".join(lowered))
+            for row in self._rows[match.group(1)]
+        ]
+        if not hits:
+            return scores
+        positions, rows = np.array(hits).T
+        lengths = np.array([len(keyword) for keyword in self.vocabulary])[rows]
+        messages = np.searchsorted(starts, positions, side="right") - 1
+        # Keywords containing a newline may span two joined messages
+        inside = positions + lengths <= ends[messages]
+        # Count each (message, keyword) pair once
+        size = len(self.vocabulary)
+        pairs = np.unique(messages[inside] * size + rows[inside])
+        messages, rows = np.divmod(pairs, size)
+        np.add.at(scores, messages, self.weights[rows])
+        return scores
+
+    def classify(self, texts: Sequence[str]) -> list[dict[str, str | float]]:
+        """Return ``{"classification", "confidence"}`` for each of ``texts``."""
+        if not len(texts):
+            return []
+        scores = self.scores(texts)
+        if self.precedence:
+            best = (scores > 0).argmax(axis=1)
+        else:
+            best = scores.argmax(axis=1)
+        best[scores.max(axis=1) <= 0] = len(self.labels) - 1
+        return [
+            {"classification": label, "confidence": float(confidence)}
+            for label, confidence in zip(
+                self.labels[best], self.confidences[best], strict=True
+            )
+        ]
+
+
+__all__ = ["KeywordClassifier"]
@@ -0,0 +1,267 @@
+"""
+Copy-on-write branch store for time travel.
+
+Forking a conversation by copying its state costs time and memory linear in
+its length, which adds up when many what-if branches are forked off a long
+history. ``BranchStore`` shares structure instead:
+
+- a branch's messages are a persistent linked list whose cells point at
+  their predecessor, so a fork only copies the head pointer and appending to
+  one branch never affects another,
+- the other channel values are a dict shared with the parent until either
+  side writes to it, at which point the writer takes its own copy.
+
+Forking is O(1) and each branch only stores the messages it added after the
+fork. Deleting a branch never affects its children, which keep the cells
+they share alive.
+
+Branches of different conversations must not mix, so ``BranchStores`` keeps
+one store per conversation, evicting the least recently used.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+
+MAIN = "main"
+
+
+@dataclass(frozen=True, slots=True)
+class _Cell:
+    """One message of a branch history, linked to the message before it."""
+
+    message: BaseMessage
+    prev: "_Cell | None"
+    length: int
+
+
+def _walk(head: _Cell | None, stop: _Cell | None = None) -> Iterator[BaseMessage]:
+    """Yield messages from ``head`` back to (excluding) ``stop``, newest first."""
+    while head is not stop:
+        yield head.message
+        head = head.prev
+
+
+@dataclass(eq=False)
+class Branch:
+    """A branch of the conversation.
+
+    Attributes:
+        branch_id: Name of the branch.
+        parent_id: Branch it was forked from, ``None`` for the root.
+        base: Last message cell shared with the parent at the fork.
+        head: Last message cell of the branch.
+        base_values: The parent's values at the fork, never modified.
+    """
+
+    branch_id: str
+    parent_id: str | None
+    base: _Cell | None = None
+    head: _Cell | None = None
+    base_values: Mapping[str, Any] = field(default_factory=dict, repr=False)
+    _values: dict[str, Any] = field(default_factory=dict, repr=False)
+    # Whether ``_values`` may be referenced by another branch
+    _shared: bool = field(default=False, repr=False)
+
+    def __len__(self) -> int:
+        return self.head.length if self.head else 0
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        """All messages of the branch, oldest first."""
+        messages = list(_walk(self.head))
+        messages.reverse()
+        return messages
+
+    @property
+    def divergence(self) -> list[BaseMessage]:
+        """Messages added since the fork, oldest first."""
+        return self.messages_since(self.base)
+
+    def messages_since(self, cell: _Cell | None) -> list[BaseMessage]:
+        """Messages after ``cell``, an earlier cell of this branch, oldest first."""
+        messages = list(_walk(self.head, cell))
+        messages.reverse()
+        return messages
+
+    @property
+    def values(self) -> Mapping[str, Any]:
+        """Read-only view of the non-message channel values."""
+        return self._values
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the branch state as a plain dict, messages included."""
+        return {**self._values, "messages": self.messages}
+
+
+class BranchStore:
+    """Branches sharing their common history.
+
+    Args:
+        messages: Initial messages of the root branch.
+        values: Initial non-message values of the root branch.
+        root: Name of the root branch.
+    """
+
+    def __init__(
+        self,
+        messages: Iterable[BaseMessage] = (),
+        values: Mapping[str, Any] | None = None,
+        root: str = MAIN,
+    ) -> None:
+        self.root = root
+        self._branches = {root: Branch(root, None, _values=dict(values or {}))}
+        self._ids = count(1)
+        self.append(root, messages)
+
+    def __contains__(self, branch_id: object) -> bool:
+        return branch_id in self._branches
+
+    def __len__(self) -> int:
+        return len(self._branches)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._branches)
+
+    def get(self, branch_id: str) -> Branch:
+        try:
+            return self._branches[branch_id]
+        except KeyError:
+            raise KeyError(f"Unknown branch: {branch_id!r}") from None
+
+    def fork(
+        self,
+        parent_id: str | None = None,
+        branch_id: str | None = None,
+        *,
+        at: int | None = None,
+        replace: bool = False,
+    ) -> Branch:
+        """Create a branch sharing the history of ``parent_id``.
+
+        Args:
+            parent_id: Branch to fork, the root by default.
+            branch_id: Name of the new branch; ``branch_<n>`` by default.
+            at: Fork after this many messages of the parent instead of at
+                its head. Finding an earlier point walks back from the head.
+            replace: Re-fork ``branch_id`` if it already exists.
+        """
+        parent = self.get(parent_id or self.root)
+        if branch_id is None:
+            branch_id = f"branch_{next(self._ids)}"
+            while branch_id in self._branches:
+                branch_id = f"branch_{next(self._ids)}"
+        elif branch_id in self._branches and not replace:
+            raise ValueError(f"Branch {branch_id!r} already exists")
+        if branch_id == self.root:
+            raise ValueError("The root branch can't be re-forked")
+
+        base = parent.head
+        if at is not None:
+            if not 0 <= at <= len(parent):
+                raise ValueError(f"Can't fork at {at}, parent has {len(parent)}")
+            while base is not None and base.length > at:
+                base = base.prev
+        parent._shared = True
+        # The parent's dict is shared, and copied by whichever side writes first
+        values = parent._values
+        branch = Branch(branch_id, parent.branch_id, base, base, values, values, True)
+        self._branches[branch_id] = branch
+        return branch
+
+    def append(self, branch_id: str, messages: Iterable[BaseMessage]) -> Branch:
+        """Add ``messages`` to the end of a branch."""
+        branch = self.get(branch_id)
+        head = branch.head
+        for message in messages:
+            head = _Cell(message, head, head.length + 1 if head else 1)
+        branch.head = head
+        return branch
+
+    def update(self, branch_id: str, values: Mapping[str, Any]) -> Branch:
+        """Set non-message channel values of a branch."""
+        branch = self.get(branch_id)
+        if "messages" in values:
+            raise ValueError("Use append() to add messages")
+        if branch._shared:
+            branch._values = dict(branch._values)
+            branch._shared = False
+        branch._values.update(values)
+        return branch
+
+    def delete(self, branch_id: str) -> None:
+        """Remove a branch; its children are re-parented to its parent."""
+        branch = self.get(branch_id)
+        if branch.parent_id is None:
+            raise ValueError("The root branch can't be deleted")
+        del self._branches[branch_id]
+        for child in self._branches.values():
+            if child.parent_id == branch_id:
+                child.parent_id = branch.parent_id
+
+    def common_ancestor(self, a: str, b: str) -> _Cell | None:
+        """Return the last message cell two branches share, ``None`` if none.
+
+        Only the cells after the shared history are visited.
+        """
+        left, right = self.get(a).head, self.get(b).head
+        while left is not right:
+            if left is None or right is None:
+                return None
+            if left.length >= right.length:
+                left = left.prev
+            else:
+                right = right.prev
+        return left
+
+
+class BranchStores:
+    """One ``BranchStore`` per conversation, least recently used evicted.
+
+    Args:
+        max_conversations: Stores kept at most.
+    """
+
+    def __init__(self, max_conversations: int = 1024) -> None:
+        self.max_conversations = max_conversations
+        self._stores: OrderedDict[str, BranchStore] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._stores)
+
+    def __contains__(self, conversation_id: object) -> bool:
+        return conversation_id in self._stores
+
+    def get(self, conversation_id: str) -> BranchStore | None:
+        """Return the store of ``conversation_id``, if it has one."""
+        with self._lock:
+            store = self._stores.get(conversation_id)
+            if store is not None:
+                self._stores.move_to_end(conversation_id)
+            return store
+
+    def get_or_create(self, conversation_id: str) -> BranchStore:
+        """Return the store of ``conversation_id``, creating it if needed."""
+        with self._lock:
+            store = self._stores.get(conversation_id)
+            if store is None:
+                store = self._stores[conversation_id] = BranchStore()
+                if len(self._stores) > self.max_conversations:
+                    self._stores.popitem(last=False)
+            else:
+                self._stores.move_to_end(conversation_id)
+            return store
+
+    def discard(self, conversation_id: str) -> None:
+        """Forget the branches of ``conversation_id``."""
+        with self._lock:
+            self._stores.pop(conversation_id, None)
+
+
+__all__ = ["MAIN", "Branch", "BranchStore", "BranchStores"]
@@ -0,0 +1,106 @@
+"""
+Calculator engine with compiled numexpr expressions.
+
+``numexpr.evaluate`` re-validates the expression, re-derives its variable names
+and re-resolves its arguments on every call. The engine compiles each
+expression once into a ``NumExpr`` program (LRU-cached by expression text) and
+can evaluate it over whole NumPy arrays of variable bindings in one call.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from numexpr.necompiler import NumExpr, getExprNames
+
+# Same context ``numexpr.evaluate`` resolves to by default
+_CONTEXT = {"optimization": "aggressive", "truediv": False}
+
+DEFAULT_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    """A compiled numexpr program and the variable names it reads."""
+
+    expression: str
+    names: tuple[str, ...]
+    program: Any
+
+    def __call__(self, values: Mapping[str, Any]) -> np.ndarray:
+        try:
+            args = [np.asarray(values[name], dtype=np.float64) for name in self.names]
+        except KeyError as e:
+            raise NameError(f"name {e.args[0]!r} is not defined") from None
+        return self.program(*args)
+
+
+class CalculatorEngine:
+    """Evaluate arithmetic expressions with cached compiled programs.
+
+    Args:
+        constants: Names always available to expressions (``pi`` and ``e`` by
+            default). Bindings passed at call time take precedence.
+        maxsize: Number of compiled expressions to keep.
+    """
+
+    def __init__(
+        self, constants: Mapping[str, float] | None = None, maxsize: int = 256
+    ) -> None:
+        self.constants = dict(DEFAULT_CONSTANTS if constants is None else constants)
+        self.maxsize = maxsize
+        self._compiled: OrderedDict[str, CompiledExpression] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, expression: str) -> CompiledExpression:
+        """Return the compiled program for ``expression``, compiling it once."""
+        expression = expression.strip()
+        with self._lock:
+            compiled = self._compiled.get(expression)
+            if compiled is not None:
+                self._compiled.move_to_end(expression)
+                return compiled
+
+        names, _ = getExprNames(expression, _CONTEXT)
+        signature = [(name, np.float64) for name in names]
+        compiled = CompiledExpression(
+            expression, tuple(names), NumExpr(expression, signature, **_CONTEXT)
+        )
+        with self._lock:
+            self._compiled[expression] = compiled
+            if len(self._compiled) > self.maxsize:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def calculate(self, expression: str, **bindings: Any) -> np.ndarray:
+        """Evaluate a single expression."""
+        return self.compile(expression)({**self.constants, **bindings})
+
+    def calculate_many(
+        self,
+        expressions: Sequence[str],
+        bindings: Mapping[str, Any] | None = None,
+    ) -> list[np.ndarray]:
+        """Evaluate many expressions over the same variable bindings.
+
+        Each binding may be a scalar or a NumPy array; every expression is
+        evaluated once over the full arrays, so a batch of N rows costs one
+        call per distinct expression rather than N.
+        """
+        values = {**self.constants, **(bindings or {})}
+        results: dict[str, np.ndarray] = {}
+        for expression in expressions:
+            key = expression.strip()
+            if key not in results:
+                results[key] = self.compile(key)(values)
+        return [results[expression.strip()] for expression in expressions]
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+
+__all__ = ["DEFAULT_CONSTANTS", "CalculatorEngine", "CompiledExpression"]
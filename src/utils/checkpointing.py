@@ -0,0 +1,815 @@
+"""
+Durable SQLite checkpointer with write-behind batching.
+
+``MemorySaver`` loses every thread when the process exits. ``SQLiteSaver``
+persists checkpoints, channel blobs and pending writes to a SQLite database in
+WAL mode. Writes are serialized on the caller's thread (so later mutation of
+state objects cannot leak into a stored checkpoint) and handed to a background
+writer, which commits everything queued within ``batch_window`` seconds in a
+single transaction. A super-step's ``put_writes`` calls and the following
+``put`` therefore usually land in one commit instead of one fsync each.
+
+Reads flush the queue first, so a saver always observes its own writes.
+
+Channel values are delta-encoded against the previous version of the same
+channel (see ``src.utils.deltas``): appending to a message list stores only
+the new messages, and a full keyframe is written every ``keyframe_interval``
+versions so reading a value never replays a long chain.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Collection, Iterator, Sequence
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from src.utils.deltas import apply_delta, diff_value
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+_INSERT_CHECKPOINT = (
+    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_BLOB = "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)"
+# Regular writes are idempotent per (task, idx); special writes overwrite
+_INSERT_WRITE = "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_REPLACE_WRITE = "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+# Blob type prefix of delta-encoded channel values
+DELTA_TYPE = "delta:"
+
+# Decoded "empty" blob: the channel had no value (unlike a stored None)
+_EMPTY = object()
+
+Statement = tuple[str, tuple[Any, ...]]
+BlobKey = tuple[str, str, str, str]  # thread_id, checkpoint_ns, channel, version
+
+
+class CheckpointCorruptedError(RuntimeError):
+    """Raised when a stored delta's base version is missing."""
+
+
+class _Head(NamedTuple):
+    """Latest stored version of a channel, the base for the next delta."""
+
+    version: str
+    value: Any
+    depth: int  # deltas since the last keyframe
+
+
+@dataclass(frozen=True)
+class CheckpointInfo:
+    """Storage summary of one checkpoint, as used by retention policies."""
+
+    checkpoint_ns: str
+    checkpoint_id: str
+    ts: str
+    # Bytes of the checkpoint row, its writes and the blobs it introduced
+    size: int
+
+
+@dataclass(frozen=True)
+class PruneResult:
+    """What a call to ``SQLiteSaver.drop_checkpoints`` removed or rewrote."""
+
+    checkpoints: int = 0
+    blobs: int = 0
+    writes: int = 0
+    keyframes: int = 0
+    bytes_reclaimed: int = 0
+
+
+def _snapshot(value: Any) -> Any:
+    """Shallow copy of a channel value, so later mutation can't alter it."""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class SQLiteSaver(BaseCheckpointSaver[str]):
+    """Checkpoint saver backed by SQLite, with batched background writes.
+
+    Use it like any LangGraph checkpointer::
+
+        saver = SQLiteSaver("checkpoints.sqlite3")
+        graph = builder.compile(checkpointer=saver)
+
+    Call ``close()`` (or use the saver as a context manager) to flush pending
+    writes before exiting.
+
+    Args:
+        path: Database file, or ``":memory:"`` for a private in-memory store.
+        serde: Serializer for checkpoints and channel values.
+        batch_window: Seconds the writer waits to collect more statements
+            before committing.
+        max_batch: Statements that trigger a commit without waiting.
+        keyframe_interval: Store a channel value in full after this many
+            deltas; ``0`` disables delta encoding.
+        cache_size: Number of decoded channel values kept in memory, both as
+            delta bases for writes and to shorten delta chains on reads.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        *,
+        serde: SerializerProtocol | None = None,
+        batch_window: float = 0.005,
+        max_batch: int = 512,
+        keyframe_interval: int = 16,
+        cache_size: int = 1024,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.keyframe_interval = keyframe_interval
+        self.cache_size = cache_size
+        # One connection shared by readers and the writer; in WAL mode other
+        # processes can still read while a batch is being committed.
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        # Re-entrant so compaction can decode values inside its transaction
+        self._db_lock = threading.RLock()
+
+        self._pending: list[Statement] = []
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._committed = 0
+        self._flushing = 0
+        self._closed = False
+        self._error: BaseException | None = None
+        self.commits = 0
+
+        self._heads: OrderedDict[tuple[str, str, str], _Head] = OrderedDict()
+        self._values: OrderedDict[BlobKey, Any] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="sqlite-checkpoint-writer", daemon=True
+        )
+        self._writer.start()
+
+    # -- write-behind queue -------------------------------------------------
+
+    def _enqueue(self, statements: list[Statement]) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SQLiteSaver is closed")
+            self._raise_writer_error()
+            self._pending.extend(statements)
+            self._enqueued += len(statements)
+            self._cond.notify_all()
+
+    def _raise_writer_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Background checkpoint write failed") from error
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # Give the rest of the super-step a moment to arrive
+                self._cond.wait_for(
+                    lambda: (
+                        self._flushing
+                        or self._closed
+                        or len(self._pending) >= self.max_batch
+                    ),
+                    timeout=self.batch_window,
+                )
+                batch, self._pending = self._pending, []
+                target = self._committed + len(batch)
+            try:
+                self._commit(batch)
+            except BaseException as e:
+                logger.exception("Checkpoint batch of %d statements failed", len(batch))
+                with self._cond:
+                    self._error = e
+            with self._cond:
+                self._committed = target
+                self._cond.notify_all()
+
+    def _commit(self, batch: list[Statement]) -> None:
+        # Consecutive rows of the same statement go through one executemany;
+        # statements are never reordered (a delete must not overtake inserts)
+        with self._db_lock, self._db:
+            for sql, group in itertools.groupby(batch, key=lambda item: item[0]):
+                self._db.executemany(sql, [params for _, params in group])
+        self.commits += 1
+
+    def flush(self) -> None:
+        """Block until every queued write has been committed."""
+        with self._cond:
+            target = self._enqueued
+            if self._committed < target:
+                self._flushing += 1
+                self._cond.notify_all()
+                try:
+                    self._cond.wait_for(lambda: self._committed >= target)
+                finally:
+                    self._flushing -= 1
+            self._raise_writer_error()
+
+    def close(self) -> None:
+        """Flush pending writes, stop the writer and close the database."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        with self._db_lock:
+            self._db.close()
+        self._raise_writer_error()
+
+    def __enter__(self) -> "SQLiteSaver":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "SQLiteSaver":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await asyncio.to_thread(self.close)
+
+    # -- reads ----------------------------------------------------------------
+
+    def _query(self, sql: str, params: Sequence[Any]) -> list[tuple[Any, ...]]:
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _remember(self, key: BlobKey, value: Any) -> None:
+        with self._cache_lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            if len(self._values) > self.cache_size:
+                self._values.popitem(last=False)
+
+    def _load_value(self, key: BlobKey) -> Any:
+        """Return the decoded channel value stored under ``key``.
+
+        Delta chains are followed back to the nearest keyframe or cached
+        value, then replayed forwards. Raises ``KeyError`` if absent, and
+        ``CheckpointCorruptedError`` if a delta's base is missing.
+        """
+        thread_id, checkpoint_ns, channel = key[:3]
+        deltas = []
+        while True:
+            with self._cache_lock:
+                if key in self._values:
+                    value = self._values[key]
+                    break
+            rows = self._query(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? "
+                "AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                key,
+            )
+            if not rows:
+                if deltas:
+                    logger.error(
+                        "Delta %s of channel %r has no base version %s",
+                        deltas[-1][0][3],
+                        channel,
+                        key[3],
+                    )
+                    raise CheckpointCorruptedError(
+                        f"Missing base {key[3]} of channel {channel!r} "
+                        f"in thread {thread_id!r}"
+                    )
+                raise KeyError(key)
+            type_, blob = rows[0]
+            if not type_.startswith(DELTA_TYPE):
+                value = _EMPTY if type_ == "empty" else self.serde.loads_typed(rows[0])
+                self._remember(key, value)
+                break
+            delta = self.serde.loads_typed((type_[len(DELTA_TYPE) :], blob))
+            deltas.append((key, delta))
+            key = (thread_id, checkpoint_ns, channel, delta["base"])
+        for key, delta in reversed(deltas):
+            value = apply_delta(value, delta)
+            self._remember(key, value)
+        return value
+
+    def _load_blobs(
+        self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions
+    ) -> dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            try:
+                value = self._load_value(
+                    (thread_id, checkpoint_ns, channel, str(version))
+                )
+            except KeyError:
+                continue
+            if value is not _EMPTY:
+                # Cached values are shared; hand out a copy
+                values[channel] = _snapshot(value)
+        return values
+
+    def _load_writes(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> list[tuple[str, str, Any]]:
+        rows = self._query(
+            "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? "
+            "AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        return [
+            (task_id, channel, self.serde.loads_typed((type_, value)))
+            for task_id, channel, type_, value in rows
+        ]
+
+    def _to_tuple(self, row: tuple[Any, ...]) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id = row[:4]
+        checkpoint: Checkpoint = self.serde.loads_typed((row[4], row[5]))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(
+                    thread_id, checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self.serde.loads_typed((row[6], row[7])),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Return the requested checkpoint, or the thread's latest one."""
+        self.flush()
+        configurable = config["configurable"]
+        params: list[Any] = [
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+        ]
+        sql = "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        if checkpoint_id := get_checkpoint_id(config):
+            sql += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            sql += " ORDER BY checkpoint_id DESC LIMIT 1"
+        rows = self._query(sql, params)
+        return self._to_tuple(rows[0]) if rows else None
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Yield matching checkpoints, newest first."""
+        self.flush()
+        clauses, params = [], []
+        if config is not None:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if (checkpoint_ns := configurable.get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = "SELECT * FROM checkpoints"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY checkpoint_id DESC"
+        # Metadata filters are applied after decoding, so only limit in SQL
+        # when there is nothing to filter.
+        if limit is not None and not filter:
+            sql += f" LIMIT {int(limit)}"
+
+        for row in self._query(sql, params):
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if any(metadata.get(key) != value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._to_tuple(row)
+
+    # -- writes ---------------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Queue a checkpoint and its changed channel values for writing."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint = checkpoint.copy()
+        values: dict[str, Any] = checkpoint.pop("channel_values")  # type: ignore[misc]
+
+        statements: list[Statement] = []
+        for channel, version in new_versions.items():
+            type_, blob = self._encode(
+                (thread_id, checkpoint_ns, channel, str(version)), values
+            )
+            statements.append(
+                (
+                    _INSERT_BLOB,
+                    (thread_id, checkpoint_ns, channel, str(version), type_, blob),
+                )
+            )
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        statements.append(
+            (
+                _INSERT_CHECKPOINT,
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    configurable.get("checkpoint_id"),
+                    type_,
+                    blob,
+                    metadata_type,
+                    metadata_blob,
+                ),
+            )
+        )
+        self._enqueue(statements)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _encode(self, key: BlobKey, values: dict[str, Any]) -> tuple[str, Any]:
+        """Serialize a channel value, as a delta against its head if possible."""
+        thread_id, checkpoint_ns, channel, version = key
+        if channel not in values:
+            return "empty", None
+        value = values[channel]
+        head_key = (thread_id, checkpoint_ns, channel)
+        with self._cache_lock:
+            head = self._heads.get(head_key)
+        delta = None
+        if head is not None and head.depth < self.keyframe_interval:
+            delta = diff_value(head.value, value)
+
+        if delta is None:
+            type_, blob = self.serde.dumps_typed(value)
+            head = _Head(version, _snapshot(value), 0)
+        else:
+            type_, blob = self.serde.dumps_typed({"base": head.version, **delta})
+            type_ = DELTA_TYPE + type_
+            head = _Head(version, _snapshot(value), head.depth + 1)
+        with self._cache_lock:
+            self._heads[head_key] = head
+            self._heads.move_to_end(head_key)
+            if len(self._heads) > self.cache_size:
+                self._heads.popitem(last=False)
+        # The next read of this version (usually the very next turn) is free
+        self._remember(key, head.value)
+        return type_, blob
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Queue intermediate writes for a checkpoint."""
+        configurable = config["configurable"]
+        key = (
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            configurable["checkpoint_id"],
+        )
+        statements: list[Statement] = []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            sql = _REPLACE_WRITE if write_idx < 0 else _INSERT_WRITE
+            type_, blob = self.serde.dumps_typed(value)
+            statements.append(
+                (sql, (*key, task_id, write_idx, channel, type_, blob, task_path))
+            )
+        self._enqueue(statements)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint, blob and write of ``thread_id``."""
+        with self._cache_lock:
+            for cache in (self._heads, self._values):
+                for key in [key for key in cache if key[0] == thread_id]:
+                    del cache[key]
+        self._enqueue(
+            [
+                (f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                for table in ("checkpoints", "blobs", "writes")
+            ]
+        )
+        self.flush()
+
+    # -- retention ------------------------------------------------------------
+
+    def thread_ids(self) -> Sequence[str]:
+        """Return every thread id with stored checkpoints."""
+        self.flush()
+        return [
+            row[0]
+            for row in self._query("SELECT DISTINCT thread_id FROM checkpoints", ())
+        ]
+
+    def checkpoint_infos(self, thread_id: str) -> Sequence[CheckpointInfo]:
+        """Return the checkpoints of ``thread_id``, oldest first, with sizes."""
+        self.flush()
+        rows = self._query(
+            "SELECT checkpoint_ns, checkpoint_id, type, checkpoint, "
+            "LENGTH(checkpoint) + LENGTH(metadata) FROM checkpoints "
+            "WHERE thread_id = ? ORDER BY checkpoint_ns, checkpoint_id",
+            (thread_id,),
+        )
+        write_sizes = {
+            (ns, checkpoint_id): size or 0
+            for ns, checkpoint_id, size in self._query(
+                "SELECT checkpoint_ns, checkpoint_id, SUM(LENGTH(value)) FROM writes "
+                "WHERE thread_id = ? GROUP BY checkpoint_ns, checkpoint_id",
+                (thread_id,),
+            )
+        }
+        blob_sizes = {
+            (ns, channel, version): size or 0
+            for ns, channel, version, size in self._query(
+                "SELECT checkpoint_ns, channel, version, LENGTH(blob) FROM blobs "
+                "WHERE thread_id = ?",
+                (thread_id,),
+            )
+        }
+        infos, seen = [], set()
+        for ns, checkpoint_id, type_, blob, size in rows:
+            checkpoint = self.serde.loads_typed((type_, blob))
+            size += write_sizes.get((ns, checkpoint_id), 0)
+            # A blob counts towards the first checkpoint that references it
+            for channel, version in checkpoint["channel_versions"].items():
+                key = (ns, channel, str(version))
+                if key not in seen:
+                    seen.add(key)
+                    size += blob_sizes.get(key, 0)
+            infos.append(CheckpointInfo(ns, checkpoint_id, checkpoint["ts"], size))
+        return infos
+
+    def drop_checkpoints(
+        self, thread_id: str, checkpoint_ns: str, drop: Collection[str]
+    ) -> PruneResult:
+        """Delete the checkpoints ``drop`` of a namespace.
+
+        Runs in one transaction. Only the given ids are deleted, so
+        checkpoints committed after the caller chose them are kept. Blobs
+        still referenced by a kept checkpoint survive; if such a blob is a
+        delta whose base is going away, it is rewritten as a keyframe first.
+        Kept checkpoints are re-parented to their nearest kept ancestor.
+        """
+        self.flush()
+        drop = set(drop)
+        where = "thread_id = ? AND checkpoint_ns = ?"
+        scope = (thread_id, checkpoint_ns)
+        with self._db_lock, self._db:
+            rows = self._db.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                f"LENGTH(checkpoint) + LENGTH(metadata) FROM checkpoints WHERE {where}",
+                scope,
+            ).fetchall()
+            dropped = [row for row in rows if row[0] in drop]
+            if not dropped:
+                return PruneResult()
+            keep = {row[0] for row in rows} - drop
+            parents = {row[0]: row[1] for row in rows}
+            referenced = set()
+            for checkpoint_id, _, type_, blob, _ in rows:
+                if checkpoint_id in keep:
+                    versions = self.serde.loads_typed((type_, blob))["channel_versions"]
+                    referenced.update((ch, str(v)) for ch, v in versions.items())
+
+            # Rewrite surviving deltas whose base is about to be deleted
+            keyframes = reclaimed = 0
+            blobs = self._db.execute(
+                f"SELECT channel, version, type, blob FROM blobs WHERE {where}", scope
+            ).fetchall()
+            for channel, version, type_, blob in blobs:
+                if (channel, version) not in referenced or not type_.startswith(
+                    DELTA_TYPE
+                ):
+                    continue
+                delta = self.serde.loads_typed((type_[len(DELTA_TYPE) :], blob))
+                if (channel, delta["base"]) in referenced:
+                    continue
+                value = self._load_value((*scope, channel, version))
+                new_type, new_blob = self.serde.dumps_typed(value)
+                self._db.execute(
+                    f"UPDATE blobs SET type = ?, blob = ? WHERE {where} "
+                    "AND channel = ? AND version = ?",
+                    (new_type, new_blob, *scope, channel, version),
+                )
+                keyframes += 1
+                reclaimed -= len(new_blob) - len(blob)
+
+            stale_blobs = [
+                (channel, version, blob)
+                for channel, version, _, blob in blobs
+                if (channel, version) not in referenced
+            ]
+            self._db.executemany(
+                f"DELETE FROM blobs WHERE {where} AND channel = ? AND version = ?",
+                [(*scope, channel, version) for channel, version, _ in stale_blobs],
+            )
+            reclaimed += sum(len(blob or b"") for _, _, blob in stale_blobs)
+
+            dropped_ids = [(*scope, row[0]) for row in dropped]
+            (write_bytes, write_count) = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0), COUNT(*) FROM writes "
+                f"WHERE {where} AND checkpoint_id IN "
+                f"({', '.join('?' * len(dropped))})",
+                (*scope, *(row[0] for row in dropped)),
+            ).fetchone()
+            for table in ("writes", "checkpoints"):
+                self._db.executemany(
+                    f"DELETE FROM {table} WHERE {where} AND checkpoint_id = ?",
+                    dropped_ids,
+                )
+            reclaimed += write_bytes + sum(row[4] for row in dropped)
+
+            for checkpoint_id in keep & parents.keys():
+                parent = parents[checkpoint_id]
+                while parent is not None and parent not in keep:
+                    parent = parents.get(parent)
+                if parent != parents[checkpoint_id]:
+                    self._db.execute(
+                        f"UPDATE checkpoints SET parent_checkpoint_id = ? "
+                        f"WHERE {where} AND checkpoint_id = ?",
+                        (parent, *scope, checkpoint_id),
+                    )
+        return PruneResult(
+            checkpoints=len(dropped),
+            blobs=len(stale_blobs),
+            writes=write_count,
+            keyframes=keyframes,
+            bytes_reclaimed=reclaimed,
+        )
+
+    def prune(
+        self, thread_ids: Sequence[str], *, strategy: str = "keep_latest"
+    ) -> None:
+        """Keep only the latest checkpoint per namespace, or delete threads."""
+        for thread_id in thread_ids:
+            if strategy == "delete":
+                self.delete_thread(thread_id)
+                continue
+            if strategy != "keep_latest":
+                raise ValueError(f"Unknown prune strategy: {strategy!r}")
+            older: dict[str, list[str]] = {}
+            for info in self.checkpoint_infos(thread_id):
+                older.setdefault(info.checkpoint_ns, []).append(info.checkpoint_id)
+            for checkpoint_ns, checkpoint_ids in older.items():
+                # Oldest first: everything but the last one goes
+                self.drop_checkpoints(thread_id, checkpoint_ns, checkpoint_ids[:-1])
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # -- async API ------------------------------------------------------------
+    # Writes only enqueue and never block; reads may wait for a flush, so they
+    # run in a worker thread.
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: [*self.list(config, filter=filter, before=before, limit=limit)]
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+__all__ = ["CheckpointCorruptedError", "CheckpointInfo", "PruneResult", "SQLiteSaver"]
@@ -0,0 +1,61 @@
+"""
+Channel deltas for checkpoint storage.
+
+A checkpoint normally stores the full value of every channel that changed,
+so a message list is re-serialized in full on every turn. A delta records
+only what changed since a base value: the items appended to a list, or the
+keys set and removed in a dict. Anything else (a list edited in place, a
+scalar) has no delta and is stored in full.
+"""
+
+from typing import Any
+
+APPEND = "append"
+UPDATE = "update"
+
+
+def _same(a: Any, b: Any) -> bool:
+    return a is b or a == b
+
+
+def diff_value(previous: Any, value: Any) -> dict[str, Any] | None:
+    """Return a delta turning ``previous`` into ``value``, or ``None``.
+
+    ``None`` means the value should be stored in full: the types differ, a
+    list was changed other than by appending, or the delta would not be
+    smaller than the value itself.
+    """
+    if isinstance(previous, list) and isinstance(value, list):
+        size = len(previous)
+        # Identity checks make the prefix comparison cheap for message lists,
+        # whose reducer keeps existing message objects.
+        if 0 < size <= len(value) and all(map(_same, previous, value)):
+            return {"kind": APPEND, "items": value[size:]}
+        return None
+    if isinstance(previous, dict) and isinstance(value, dict) and previous:
+        changed = {
+            key: item
+            for key, item in value.items()
+            if key not in previous or not _same(previous[key], item)
+        }
+        removed = [key for key in previous if key not in value]
+        if len(changed) + len(removed) >= len(value):
+            return None
+        return {"kind": UPDATE, "set": changed, "unset": removed}
+    return None
+
+
+def apply_delta(base: Any, delta: dict[str, Any]) -> Any:
+    """Return ``base`` with ``delta`` applied, without modifying ``base``."""
+    kind = delta["kind"]
+    if kind == APPEND:
+        return [*base, *delta["items"]]
+    if kind == UPDATE:
+        unset = set(delta["unset"])
+        value = {key: item for key, item in base.items() if key not in unset}
+        value.update(delta["set"])
+        return value
+    raise ValueError(f"Unknown delta kind: {kind!r}")
+
+
+__all__ = ["APPEND", "UPDATE", "apply_delta", "diff_value"]
@@ -0,0 +1,226 @@
+"""
+Structural diffs between graph states.
+
+Comparing two states value by value costs a full traversal of every message,
+even though states from the same conversation share most of their structure.
+The diff engine short-circuits on that sharing:
+
+- channels holding the same object are skipped without looking inside,
+- runs of equal messages are skipped by comparing slices of per-message
+  keys (their field dicts) in exponentially growing chunks, which CPython
+  does at C speed and with an identity check first,
+- only the messages where the lists differ are matched, by id,
+- for two branches of a ``BranchStore``, the history they share is never
+  visited at all.
+
+A diff is a list of change dicts with an ``op`` and a ``channel``:
+
+- ``add``, ``remove`` or ``replace`` of a message, with its ``index`` in the
+  new (``add``, ``replace``) or old (``remove``) list, its ``id`` and the new
+  message as ``value``,
+- ``set`` or ``unset`` of a dict ``key``, or of a whole channel when there
+  is no ``key``.
+"""
+
+from collections.abc import Mapping, Sequence
+from operator import attrgetter, itemgetter
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+
+from src.utils.branching import BranchStore
+
+_MISSING = object()
+_CHUNK = 64
+_MIN_CHUNK = 8
+
+# What makes two messages equal: their field values, the type included.
+# Unlike ``BaseMessage.__eq__``, the keys of a whole list are computed and
+# compared in C. Extra attributes outside the message schema are ignored.
+_message_key = attrgetter("__dict__")
+_key_id = itemgetter("id")
+
+
+def _same(a: Any, b: Any) -> bool:
+    return a is b or a == b
+
+
+def _common_run(
+    old: Sequence[Any], new: Sequence[Any], i: int, j: int, limit: int
+) -> int:
+    """Length of the common run of ``old[i:]`` and ``new[j:]``, at most ``limit``."""
+    run, step = 0, _CHUNK
+    # Slice comparison runs in C and checks identity first, so shared
+    # messages cost almost nothing. Grow the chunk while slices match and
+    # shrink it to close in on the first difference.
+    while run < limit:
+        size = min(step, limit - run)
+        if old[i + run : i + run + size] == new[j + run : j + run + size]:
+            run, step = run + size, step * 2
+        elif step > _MIN_CHUNK:
+            step //= 2
+        else:
+            break
+    while run < limit and _same(old[i + run], new[j + run]):
+        run += 1
+    return run
+
+
+def _is_message_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and isinstance(value[0], BaseMessage)
+
+
+def diff_messages(
+    old: Sequence[BaseMessage],
+    new: Sequence[BaseMessage],
+    channel: str = "messages",
+    offset: int = 0,
+) -> list[dict[str, Any]]:
+    """Return the changes turning the message list ``old`` into ``new``.
+
+    Both lists are walked once, skipping runs of equal messages. At a
+    difference, messages with the same id are a ``replace``, and a message
+    whose id is not on the other side is a ``remove`` or an ``add``; a
+    message moved within the list is a ``remove`` followed by an ``add``.
+    ``offset`` is added to every index, for lists that are the tail of a
+    longer history.
+    """
+    old_keys = list(map(_message_key, old))
+    new_keys = list(map(_message_key, new))
+    shortest = min(len(old), len(new))
+    prefix = _common_run(old_keys, new_keys, 0, 0, shortest)
+    suffix = _common_run(old_keys[::-1], new_keys[::-1], 0, 0, shortest - prefix)
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+    if prefix == old_end and prefix == new_end:
+        return []
+
+    changes = []
+    # Positions of the ids in the differing range, only needed where two
+    # messages with different ids meet
+    old_pos: dict[str | None, int] = {}
+    new_pos: dict[str | None, int] = {}
+    indexed = False
+
+    def index() -> None:
+        nonlocal indexed
+        indexed = True
+        old_ids = map(_key_id, old_keys[prefix:old_end])
+        new_ids = map(_key_id, new_keys[prefix:new_end])
+        old_pos.update(zip(old_ids, range(prefix, old_end), strict=False))
+        new_pos.update(zip(new_ids, range(prefix, new_end), strict=False))
+        # Drop the messages replaced so far
+        for change in changes:
+            old_pos.pop(change["id"], None)
+            new_pos.pop(change["id"], None)
+
+    # Both record the message as consumed, so a later occurrence of its id
+    # on the other side is unmatched
+    def remove(i: int) -> None:
+        old_pos.pop(old[i].id, None)
+        changes.append(
+            {"op": "remove", "channel": channel, "index": offset + i, "id": old[i].id}
+        )
+
+    def add(j: int, op: str = "add") -> None:
+        message = new[j]
+        new_pos.pop(message.id, None)
+        changes.append(
+            {
+                "op": op,
+                "channel": channel,
+                "index": offset + j,
+                "id": message.id,
+                "value": message,
+            }
+        )
+
+    i, j = prefix, prefix
+    while i < old_end and j < new_end:
+        run = _common_run(old_keys, new_keys, i, j, min(old_end - i, new_end - j))
+        i, j = i + run, j + run
+        if i == old_end or j == new_end:
+            break
+        before, after = old[i].id, new[j].id
+        if before is not None and before == after:
+            old_pos.pop(before, None)
+            add(j, "replace")
+            i, j = i + 1, j + 1
+            continue
+        if not indexed:
+            index()
+        if before is None or before not in new_pos:
+            remove(i)
+            i += 1
+        elif after is None or after not in old_pos:
+            add(j)
+            j += 1
+        elif new_pos[before] - j > old_pos[after] - i:
+            # Reordered, and the old message moved further: remove it here,
+            # it is added back where it appears in the new list
+            del new_pos[before]
+            remove(i)
+            i += 1
+        else:
+            del old_pos[after]
+            add(j)
+            j += 1
+    while i < old_end:
+        remove(i)
+        i += 1
+    while j < new_end:
+        add(j)
+        j += 1
+    return changes
+
+
+def diff_values(old: Mapping[str, Any], new: Mapping[str, Any]) -> list[dict[str, Any]]:
+    """Return the changes turning state ``old`` into state ``new``."""
+    if old is new:
+        return []
+    changes: list[dict[str, Any]] = []
+    for channel in {**dict.fromkeys(old), **dict.fromkeys(new)}:
+        before, after = old.get(channel, _MISSING), new.get(channel, _MISSING)
+        if before is after:
+            continue
+        if after is _MISSING:
+            changes.append({"op": "unset", "channel": channel})
+        elif before is _MISSING:
+            changes.append({"op": "set", "channel": channel, "value": after})
+        elif isinstance(before, list) and (
+            _is_message_list(before) or _is_message_list(after)
+        ):
+            if isinstance(after, list):
+                changes += diff_messages(before, after, channel)
+            else:
+                changes.append({"op": "set", "channel": channel, "value": after})
+        elif isinstance(before, dict) and isinstance(after, dict):
+            changes += (
+                {"op": "unset", "channel": channel, "key": key}
+                for key in before
+                if key not in after
+            )
+            for key, value in after.items():
+                if not _same(before.get(key, _MISSING), value):
+                    changes.append(
+                        {"op": "set", "channel": channel, "key": key, "value": value}
+                    )
+        elif not _same(before, after):
+            changes.append({"op": "set", "channel": channel, "value": after})
+    return changes
+
+
+def diff_branches(store: BranchStore, old: str, new: str) -> list[dict[str, Any]]:
+    """Return the changes turning branch ``old`` into branch ``new``.
+
+    Only the messages after the branches' common ancestor are compared.
+    """
+    a, b = store.get(old), store.get(new)
+    ancestor = store.common_ancestor(old, new)
+    offset = ancestor.length if ancestor else 0
+    changes = diff_messages(
+        a.messages_since(ancestor), b.messages_since(ancestor), offset=offset
+    )
+    return changes + diff_values(a.values, b.values)
+
+
+__all__ = ["diff_branches", "diff_messages", "diff_values"]
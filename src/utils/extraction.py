@@ -0,0 +1,356 @@
+"""
+Batched LLM extraction service.
+
+Extraction prompts differ only in their system instructions, so the prompt and
+chain for each instruction string are built once and reused. Callers are
+coalesced: requests arriving within a short window for the same instructions
+are sent to the model as a single ``chain.abatch`` call (``aextract``) or
+``chain.batch`` call, from whichever thread asked first (``extract_batched``).
+
+An optional ``ExtractionCache`` sits in front of the model, keyed on the
+instructions plus the normalized message, so repeating the same extraction
+within a turn (or across conversations, with the SQLite backend) does not cost
+another LLM round-trip.
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(message: str) -> str:
+    return " ".join(message.split()).lower()
+
+
+class ExtractionCache:
+    """Content-addressed TTL cache for extraction results.
+
+    Entries live in an in-memory LRU bounded by ``maxsize``. When ``path`` is
+    given, entries are also written to a SQLite database there and looked up on
+    a memory miss, so results survive restarts and are shared between
+    processes.
+
+    Args:
+        maxsize: Maximum number of entries kept (in memory and on disk).
+        ttl: Seconds an entry stays valid.
+        path: Optional SQLite database file for the on-disk backend.
+        clock: Time source, wall-clock seconds by default.
+    """
+
+    _PRUNE_EVERY = 64
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600.0,
+        path: str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(message: str, instructions: str) -> str:
+        """Return the cache key for ``message`` under ``instructions``."""
+        raw = f"{instructions}\0{_normalize(message)}".encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, message: str, instructions: str) -> str | None:
+        """Return the cached extraction or ``None`` on a miss."""
+        key = self.key(message, instructions)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM extraction_cache "
+                    "WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[1], row[0])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, message: str, instructions: str, value: str) -> None:
+        """Store an extraction result."""
+        key = self.key(message, instructions)
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO extraction_cache VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._writes += 1
+                if self._writes % self._PRUNE_EVERY == 0:
+                    self._prune_db()
+                self._db.commit()
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _prune_db(self) -> None:
+        assert self._db is not None
+        self._db.execute(
+            "DELETE FROM extraction_cache WHERE expires_at <= ?", (self.clock(),)
+        )
+        self._db.execute(
+            "DELETE FROM extraction_cache WHERE key IN ("
+            "SELECT key FROM extraction_cache ORDER BY expires_at DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM extraction_cache")
+                self._db.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self) -> None:
+        """Close the on-disk backend, if any."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Batch:
+    """Blocking extraction requests waiting to be sent together."""
+
+    __slots__ = ("full", "items")
+
+    def __init__(self) -> None:
+        self.items: list[tuple[str, Future[str]]] = []
+        self.full = threading.Event()
+
+
+class ExtractionService:
+    """Extract information from messages with a cached chain per instruction.
+
+    Args:
+        llm: Chat model used for extraction.
+        batch_window: Seconds to wait for more requests before flushing a batch.
+        max_batch_size: Flush immediately once this many requests are pending.
+        cache: Optional cache consulted before calling the model.
+    """
+
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        batch_window: float = 0.005,
+        max_batch_size: int = 64,
+        cache: ExtractionCache | None = None,
+    ) -> None:
+        self.llm = llm
+        self.cache = cache
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._chains: dict[str, Runnable] = {}
+        self._chains_lock = threading.Lock()
+        self._pending: dict[str, list[tuple[str, asyncio.Future[str]]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._batches: dict[str, _Batch] = {}
+        self._batches_lock = threading.Lock()
+        self.batches = 0
+
+    def chain_for(self, instructions: str) -> Runnable:
+        """Return the prompt | llm chain for ``instructions``, building it once."""
+        chain = self._chains.get(instructions)
+        if chain is None:
+            with self._chains_lock:
+                chain = self._chains.get(instructions)
+                if chain is None:
+                    prompt = ChatPromptTemplate.from_messages(
+                        [("system", instructions), ("user", "{query}")]
+                    )
+                    chain = prompt | self.llm
+                    self._chains[instructions] = chain
+        return chain
+
+    @staticmethod
+    def _content(response: Any) -> str:
+        return str(response.content).strip()
+
+    def extract(self, message: str, instructions: str) -> str:
+        """Extract information from a single message (blocking)."""
+        if self.cache is not None:
+            cached = self.cache.get(message, instructions)
+            if cached is not None:
+                return cached
+        response = self.chain_for(instructions).invoke({"query": message})
+        result = self._content(response)
+        if self.cache is not None:
+            self.cache.set(message, instructions, result)
+        return result
+
+    def extract_batched(self, message: str, instructions: str) -> str:
+        """Extract information (blocking), batched with concurrent callers.
+
+        The first caller for ``instructions`` waits up to ``batch_window``
+        for callers on other threads, then sends everything collected in
+        one ``batch`` call; the others wait for their result.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(message, instructions)
+            if cached is not None:
+                return cached
+        future: Future[str] = Future()
+        with self._batches_lock:
+            batch = self._batches.get(instructions)
+            leader = batch is None
+            if batch is None:
+                batch = self._batches[instructions] = _Batch()
+            batch.items.append((message, future))
+            if len(batch.items) >= self.max_batch_size:
+                del self._batches[instructions]
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.batch_window)
+            with self._batches_lock:
+                if self._batches.get(instructions) is batch:
+                    del self._batches[instructions]
+            self._run_batch(instructions, batch.items)
+        return future.result()
+
+    def _run_batch(
+        self, instructions: str, batch: list[tuple[str, Future[str]]]
+    ) -> None:
+        self.batches += 1
+        logger.debug("Running extraction batch of %d requests", len(batch))
+        try:
+            responses = self.chain_for(instructions).batch(
+                [{"query": message} for message, _ in batch],
+                return_exceptions=True,
+            )
+        except BaseException as e:
+            # Don't leave the other callers waiting forever
+            for _, future in batch:
+                future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        self._resolve(instructions, batch, responses)
+
+    async def aextract(self, message: str, instructions: str) -> str:
+        """Extract information, coalescing with concurrent requests."""
+        if self.cache is not None:
+            cached = self.cache.get(message, instructions)
+            if cached is not None:
+                return cached
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[str] = loop.create_future()
+        pending = self._pending.setdefault(instructions, [])
+        pending.append((message, future))
+
+        if len(pending) >= self.max_batch_size:
+            self._schedule_flush(instructions)
+        elif instructions not in self._timers:
+            self._timers[instructions] = loop.call_later(
+                self.batch_window, self._schedule_flush, instructions
+            )
+        return await future
+
+    def _schedule_flush(self, instructions: str) -> None:
+        timer = self._timers.pop(instructions, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(instructions, [])
+        if batch:
+            task = asyncio.ensure_future(self._flush(instructions, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush(
+        self, instructions: str, batch: list[tuple[str, asyncio.Future[str]]]
+    ) -> None:
+        self.batches += 1
+        logger.debug("Flushing extraction batch of %d requests", len(batch))
+        try:
+            responses = await self.chain_for(instructions).abatch(
+                [{"query": message} for message, _ in batch],
+                return_exceptions=True,
+            )
+        except Exception as e:
+            responses = [e] * len(batch)
+        except BaseException:
+            # Cancelled: cancel the waiters instead of leaving them pending
+            for _, future in batch:
+                future.cancel()
+            raise
+        self._resolve(instructions, batch, responses)
+
+    def _resolve(
+        self,
+        instructions: str,
+        batch: list[tuple[str, Any]],
+        responses: list[Any],
+    ) -> None:
+        for (message, future), response in zip(batch, responses, strict=True):
+            if isinstance(response, BaseException):
+                if not future.done():
+                    future.set_exception(response)
+                continue
+            result = self._content(response)
+            if self.cache is not None:
+                self.cache.set(message, instructions, result)
+            if not future.done():
+                future.set_result(result)
+
+    async def aextract_many(self, messages: list[str], instructions: str) -> list[str]:
+        """Extract information from many messages in one batch."""
+        return list(
+            await asyncio.gather(*(self.aextract(m, instructions) for m in messages))
+        )
+
+
+__all__ = ["ExtractionCache", "ExtractionService"]
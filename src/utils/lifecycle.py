@@ -0,0 +1,250 @@
+"""
+Idle-thread hibernation for conversation threads.
+
+Keeping the state of every conversation thread in memory grows without
+bound. ``ThreadLifecycle`` keeps only recently used threads resident, in
+LRU order, and hibernates the others to a checkpoint store:
+
+- a thread idle for ``idle_after`` seconds is hibernated by the background
+  sweep (or ``hibernate_idle``); since the LRU order is also the idle order,
+  a sweep only visits the threads it hibernates,
+- at most ``max_resident`` threads stay in memory; using one more hibernates
+  the least recently used,
+- a hibernated thread is rehydrated from its latest checkpoint the next time
+  it is used,
+- only threads changed since they were loaded are written back; a thread
+  whose write fails stays resident and is skipped, so the other threads
+  are still evicted.
+
+``get`` hands out copies, so a state only changes through ``put`` and
+``update``, which mark it for writing.
+
+Hibernated states are ordinary checkpoints of the thread, so a graph
+compiled with the same checkpointer resumes from them.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, empty_checkpoint
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LifecycleStats:
+    """Cumulative lifecycle counters."""
+
+    hibernated: int = 0
+    rehydrated: int = 0
+    written: int = 0
+
+
+def _copy(state: Mapping[str, Any]) -> dict[str, Any]:
+    """Copy of a state, down to the contents of each channel."""
+    return {
+        channel: (
+            list(value)
+            if isinstance(value, list)
+            else dict(value)
+            if isinstance(value, dict)
+            else value
+        )
+        for channel, value in state.items()
+    }
+
+
+@dataclass(slots=True)
+class _Resident:
+    state: dict[str, Any]
+    last_used: float
+    dirty: bool
+
+
+class ThreadLifecycle:
+    """LRU-capped resident thread states, hibernated to a checkpointer.
+
+    Args:
+        checkpointer: Store for hibernated states.
+        max_resident: Threads kept in memory at most.
+        idle_after: Seconds of inactivity before a thread is hibernated;
+            ``None`` only hibernates to respect ``max_resident``.
+        interval: Seconds between background sweeps for idle threads.
+        on_hibernate: Called with the thread id of every hibernated thread,
+            e.g. to drop its metrics.
+    """
+
+    def __init__(
+        self,
+        checkpointer: BaseCheckpointSaver,
+        max_resident: int = 10_000,
+        idle_after: float | None = 300.0,
+        interval: float = 30.0,
+        on_hibernate: Callable[[str], None] | None = None,
+    ) -> None:
+        self.checkpointer = checkpointer
+        self.max_resident = max_resident
+        self.idle_after = idle_after
+        self.interval = interval
+        self.on_hibernate = on_hibernate
+        self.stats = LifecycleStats()
+        # Least recently used first
+        self._resident: OrderedDict[str, _Resident] = OrderedDict()
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def is_resident(self, thread_id: str) -> bool:
+        return thread_id in self._resident
+
+    @staticmethod
+    def _config(thread_id: str) -> dict[str, Any]:
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+    def get(self, thread_id: str) -> dict[str, Any] | None:
+        """Return a copy of the state of ``thread_id``, rehydrating it if needed.
+
+        Returns ``None`` for a thread with no state at all. Changing the copy
+        changes nothing; pass it to ``put`` to keep the changes.
+        """
+        with self._lock:
+            resident = self._resident.get(thread_id)
+            if resident is None:
+                saved = self.checkpointer.get_tuple(self._config(thread_id))
+                if saved is None:
+                    return None
+                state = dict(saved.checkpoint["channel_values"])
+                resident = self._admit(thread_id, state, dirty=False)
+                self.stats.rehydrated += 1
+            else:
+                resident.last_used = time.monotonic()
+                self._resident.move_to_end(thread_id)
+            return _copy(resident.state)
+
+    def put(self, thread_id: str, state: Mapping[str, Any]) -> None:
+        """Replace the state of ``thread_id``; it is written on hibernation."""
+        with self._lock:
+            self._resident.pop(thread_id, None)
+            self._admit(thread_id, _copy(state), dirty=True)
+
+    def update(self, thread_id: str, values: Mapping[str, Any]) -> dict[str, Any]:
+        """Merge ``values`` into the state of ``thread_id`` and return it."""
+        with self._lock:
+            state = {**(self.get(thread_id) or {}), **values}
+            self.put(thread_id, state)
+            return _copy(state)
+
+    def _admit(self, thread_id: str, state: dict[str, Any], dirty: bool) -> _Resident:
+        resident = self._resident[thread_id] = _Resident(state, time.monotonic(), dirty)
+        excess = len(self._resident) - self.max_resident
+        if excess > 0:
+            # Least recently used first, skipping threads that can't be written
+            candidates = itertools.islice(self._resident, len(self._resident) - 1)
+            for candidate in list(candidates):
+                if self._try_hibernate(candidate):
+                    excess -= 1
+                    if not excess:
+                        break
+        return resident
+
+    def _try_hibernate(self, thread_id: str) -> bool:
+        """Hibernate ``thread_id``, logging instead of raising if that fails."""
+        try:
+            self._hibernate(thread_id)
+        except Exception:
+            # Stays resident, where a later eviction or sweep retries it
+            logger.exception("Hibernating thread %s failed", thread_id)
+            return False
+        return True
+
+    def _hibernate(self, thread_id: str) -> None:
+        resident = self._resident[thread_id]
+        if resident.dirty:
+            # Raises if the write fails, keeping the only copy resident
+            self._write(thread_id, resident.state)
+        del self._resident[thread_id]
+        self.stats.hibernated += 1
+        if self.on_hibernate is not None:
+            self.on_hibernate(thread_id)
+
+    def _write(self, thread_id: str, state: dict[str, Any]) -> None:
+        config = self._config(thread_id)
+        previous = self.checkpointer.get_tuple(config)
+        versions = previous.checkpoint["channel_versions"] if previous else {}
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = state
+        new_versions = {
+            channel: self.checkpointer.get_next_version(versions.get(channel), None)
+            for channel in state
+        }
+        checkpoint["channel_versions"] = {**versions, **new_versions}
+        if previous is not None:
+            config = previous.config
+            checkpoint["versions_seen"] = previous.checkpoint["versions_seen"]
+        step = previous.metadata.get("step", -1) + 1 if previous else -1
+        metadata = {"source": "update", "step": step, "parents": {}}
+        self.checkpointer.put(config, checkpoint, metadata, new_versions)
+        self.stats.written += 1
+
+    def hibernate(self, thread_id: str) -> bool:
+        """Hibernate ``thread_id`` now; returns whether it was resident."""
+        with self._lock:
+            if thread_id not in self._resident:
+                return False
+            self._hibernate(thread_id)
+            return True
+
+    def hibernate_idle(self, now: float | None = None) -> int:
+        """Hibernate every thread idle for ``idle_after``; returns how many.
+
+        Threads that fail to be written are logged and stay resident.
+        """
+        if self.idle_after is None:
+            return 0
+        deadline = (time.monotonic() if now is None else now) - self.idle_after
+        count = 0
+        with self._lock:
+            idle = []
+            for thread_id, resident in self._resident.items():
+                if resident.last_used > deadline:
+                    break
+                idle.append(thread_id)
+            for thread_id in idle:
+                count += self._try_hibernate(thread_id)
+        return count
+
+    def start(self) -> None:
+        """Start the background sweep for idle threads."""
+        if self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(
+            target=self._run, name="thread-lifecycle", daemon=True
+        )
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Stop the background sweep."""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.hibernate_idle()
+            except Exception:
+                logger.exception("Hibernating idle threads failed")
+
+
+__all__ = ["LifecycleStats", "ThreadLifecycle"]
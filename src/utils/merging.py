@@ -0,0 +1,277 @@
+"""
+Three-way merges of graph states.
+
+Merging two branches by replaying one branch's steps on top of the other
+re-runs the graph. A three-way merge instead compares each side with the
+common ancestor state and keeps both sides' changes, channel by channel:
+
+- message channels (reduced with ``add_messages``) are merged by message id
+  in linear time: messages changed or added on either side are kept, and the
+  ancestor's order is preserved,
+- channels reduced with ``operator.add`` keep the items both sides appended,
+- dicts are merged key by key,
+- anything else takes whichever side changed it.
+
+When both sides changed the same message, key or value differently, the
+merge reports a conflict and keeps the preferred side.
+"""
+
+import operator
+import typing
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
+
+from src.utils.branching import BranchStore
+
+_MISSING = object()
+
+Conflict = dict[str, Any]
+# (base, ours, theirs, channel, prefer_ours) -> (merged, conflicts)
+ChannelMerge = Callable[[Any, Any, Any, str, bool], tuple[Any, list[Conflict]]]
+
+
+@dataclass
+class MergeResult:
+    """Outcome of a three-way merge.
+
+    Attributes:
+        values: The merged state.
+        conflicts: One entry per conflicting message, key or value, with the
+            ``channel``, the ``id`` or ``key`` if any, and both sides'
+            values as ``ours`` and ``theirs`` (``None`` if deleted).
+    """
+
+    values: dict[str, Any]
+    conflicts: list[Conflict] = field(default_factory=list)
+
+
+def _same(a: Any, b: Any) -> bool:
+    return a is b or a == b
+
+
+def _conflict(channel: str, ours: Any, theirs: Any, **where: Any) -> Conflict:
+    return {
+        "channel": channel,
+        **where,
+        "ours": None if ours is _MISSING else ours,
+        "theirs": None if theirs is _MISSING else theirs,
+    }
+
+
+def _pick(base: Any, ours: Any, theirs: Any, prefer_ours: bool) -> tuple[Any, bool]:
+    """Three-way pick of one value; returns ``(value, conflicted)``.
+
+    ``_MISSING`` stands for an absent (or deleted) value on any side.
+    """
+    if _same(ours, theirs) or _same(theirs, base):
+        return ours, False
+    if _same(ours, base):
+        return theirs, False
+    return (ours if prefer_ours else theirs), True
+
+
+def merge_scalars(
+    base: Any, ours: Any, theirs: Any, channel: str, prefer_ours: bool = True
+) -> tuple[Any, list[Conflict]]:
+    """Merge a value that can only be replaced as a whole."""
+    value, conflicted = _pick(base, ours, theirs, prefer_ours)
+    return value, [_conflict(channel, ours, theirs)] if conflicted else []
+
+
+def merge_dicts(
+    base: Any, ours: Any, theirs: Any, channel: str, prefer_ours: bool = True
+) -> tuple[Any, list[Conflict]]:
+    """Merge dicts key by key; other values are merged as scalars."""
+    if not all(isinstance(v, dict) for v in (base, ours, theirs)):
+        return merge_scalars(base, ours, theirs, channel, prefer_ours)
+    merged, conflicts = {}, []
+    for key in {**dict.fromkeys(base), **dict.fromkeys(ours), **dict.fromkeys(theirs)}:
+        a, b = ours.get(key, _MISSING), theirs.get(key, _MISSING)
+        value, conflicted = _pick(base.get(key, _MISSING), a, b, prefer_ours)
+        if conflicted:
+            conflicts.append(_conflict(channel, a, b, key=key))
+        if value is not _MISSING:
+            merged[key] = value
+    return merged, conflicts
+
+
+def merge_appends(
+    base: Any, ours: Any, theirs: Any, channel: str, prefer_ours: bool = True
+) -> tuple[Any, list[Conflict]]:
+    """Merge lists both sides only appended to: ours' items, then theirs'."""
+    if not all(isinstance(v, list) for v in (base, ours, theirs)):
+        return merge_scalars(base, ours, theirs, channel, prefer_ours)
+    size = len(base)
+    if ours[:size] != base or theirs[:size] != base:
+        return merge_scalars(base, ours, theirs, channel, prefer_ours)
+    return [*ours, *theirs[size:]], []
+
+
+def _key(message: BaseMessage) -> Any:
+    # ``add_messages`` gives every message an id; fall back to identity
+    return message.id if message.id is not None else id(message)
+
+
+def merge_messages(
+    base: Any, ours: Any, theirs: Any, channel: str, prefer_ours: bool = True
+) -> tuple[Any, list[Conflict]]:
+    """Merge message lists by id, with ``add_messages`` semantics.
+
+    The ancestor's messages keep their order, each merged three-way (a side
+    may have replaced or removed it); then come the messages added by ours,
+    then those added by theirs. Linear in the total number of messages.
+    """
+    base, ours, theirs = (
+        v if isinstance(v, list) else [] for v in (base, ours, theirs)
+    )
+    in_base = {_key(m): m for m in base}
+    in_ours = {_key(m): m for m in ours}
+    in_theirs = {_key(m): m for m in theirs}
+    merged, conflicts = [], []
+
+    for key, message in in_base.items():
+        a, b = in_ours.get(key, _MISSING), in_theirs.get(key, _MISSING)
+        value, conflicted = _pick(message, a, b, prefer_ours)
+        if conflicted:
+            conflicts.append(_conflict(channel, a, b, id=key))
+        if value is not _MISSING:
+            merged.append(value)
+    for key, message in in_ours.items():
+        if key in in_base:
+            continue
+        other = in_theirs.get(key, _MISSING)
+        value, conflicted = _pick(_MISSING, message, other, prefer_ours)
+        if conflicted:
+            conflicts.append(_conflict(channel, message, other, id=key))
+        merged.append(value)
+    merged += (
+        message
+        for key, message in in_theirs.items()
+        if key not in in_base and key not in in_ours
+    )
+    return merged, conflicts
+
+
+def reducers_from_schema(schema: type) -> dict[str, ChannelMerge]:
+    """Pick a channel merge for each ``Annotated`` reducer of a state schema.
+
+    Channels reduced with ``add_messages`` merge as messages and channels
+    reduced with ``operator.add`` merge as appends; the others use the
+    default, ``merge_dicts``.
+    """
+    merges: dict[str, ChannelMerge] = {}
+    for channel, hint in typing.get_type_hints(schema, include_extras=True).items():
+        for reducer in getattr(hint, "__metadata__", ()):
+            if reducer is add_messages:
+                merges[channel] = merge_messages
+            elif reducer is operator.add:
+                merges[channel] = merge_appends
+    return merges
+
+
+def merge_states(
+    base: Mapping[str, Any],
+    ours: Mapping[str, Any],
+    theirs: Mapping[str, Any],
+    merges: Mapping[str, ChannelMerge] | None = None,
+    prefer: Literal["ours", "theirs"] = "ours",
+) -> MergeResult:
+    """Merge two states that both derive from ``base``.
+
+    Args:
+        base: The common ancestor state.
+        ours: One side; its values win conflicts by default.
+        theirs: The other side.
+        merges: Merge function per channel, see ``reducers_from_schema``.
+            Message lists are detected without one; other channels default
+            to ``merge_dicts``.
+        prefer: Which side wins a conflict.
+    """
+    merges = merges or {}
+    prefer_ours = prefer == "ours"
+    result = MergeResult({})
+    channels = {**dict.fromkeys(base), **dict.fromkeys(ours), **dict.fromkeys(theirs)}
+    for channel in channels:
+        a, b = ours.get(channel, _MISSING), theirs.get(channel, _MISSING)
+        c = base.get(channel, _MISSING)
+        if a is b or b is c:
+            value = a
+        elif a is c:
+            value = b
+        else:
+            merge = merges.get(channel)
+            if merge is None:
+                merge = merge_messages if _has_messages(a, b, c) else merge_dicts
+            value, conflicts = merge(c, a, b, channel, prefer_ours)
+            result.conflicts += conflicts
+        if value is not _MISSING:
+            result.values[channel] = value
+    return result
+
+
+def _has_messages(*values: Any) -> bool:
+    return any(
+        isinstance(value, list) and value and isinstance(value[0], BaseMessage)
+        for value in values
+    )
+
+
+def merge_branches(
+    store: BranchStore,
+    source: str,
+    target: str | None = None,
+    merges: Mapping[str, ChannelMerge] | None = None,
+    prefer: Literal["ours", "theirs"] = "ours",
+) -> MergeResult:
+    """Merge branch ``source`` into ``target`` (its parent by default).
+
+    Only the messages after the branches' common ancestor are looked at:
+    ``source``'s messages are appended to ``target`` unless ``target``
+    added a message with the same id since; if the two differ, that is a
+    conflict and ``target``'s message stays, since branch histories are
+    append-only. The other values are merged three-way against the values
+    ``source`` was forked with, ``target`` being ours and ``source`` theirs.
+    The result holds the messages appended to ``target`` and its merged
+    values.
+    """
+    branch = store.get(source)
+    target = target or branch.parent_id
+    if target is None:
+        raise ValueError(f"Branch {source!r} has no parent to merge into")
+    into = store.get(target)
+    ancestor = store.common_ancestor(target, source)
+    ours = {_key(m): m for m in into.messages_since(ancestor)}
+    appended, conflicts = [], []
+    for message in branch.messages_since(ancestor):
+        key = _key(message)
+        existing = ours.get(key, _MISSING)
+        if existing is _MISSING:
+            appended.append(message)
+        elif not _same(existing, message):
+            conflicts.append(_conflict("messages", existing, message, id=key))
+    store.append(target, appended)
+
+    merged = merge_states(
+        branch.base_values, into.values, branch.values, merges, prefer
+    )
+    store.update(target, {k: v for k, v in merged.values.items() if k != "messages"})
+    return MergeResult(
+        {**merged.values, "messages": appended}, conflicts + merged.conflicts
+    )
+
+
+__all__ = [
+    "ChannelMerge",
+    "MergeResult",
+    "merge_appends",
+    "merge_branches",
+    "merge_dicts",
+    "merge_messages",
+    "merge_scalars",
+    "merge_states",
+    "reducers_from_schema",
+]
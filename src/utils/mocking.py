@@ -0,0 +1,131 @@
+"""
+API mocking helpers for running the exercises without network access.
+"""
+
+import json
+import threading
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def _echo(system: str, query: str) -> str:
+    return query
+
+
+class FakeChatModel(BaseChatModel):
+    """Local chat model that answers with ``responder(system, query)``.
+
+    ``system`` is the content of the first system message (empty if there is
+    none) and ``query`` the content of the last message. Every call is counted
+    so tests can assert how many completions were requested.
+    """
+
+    responder: Callable[[str, str], str] = _echo
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        system = next((m.content for m in messages if m.type == "system"), "")
+        query = messages[-1].content if messages else ""
+        self.calls += 1
+        content = self.responder(str(system), str(query))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content))])
+
+
+class _SearchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server: "_SearchHTTPServer"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self.server.record(self.client_address, payload)
+        query = payload.get("query", "")
+        body = json.dumps(
+            {
+                "query": query,
+                "results": [
+                    {
+                        "title": f"Result for {query}",
+                        "url": "https://example.com/search",
+                        "content": f"Stub content for {query}",
+                        "score": 1.0,
+                    }
+                ],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _SearchHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _SearchHandler)
+        self.requests: list[dict[str, Any]] = []
+        self.clients: set[tuple[str, int]] = set()
+        self._lock = threading.Lock()
+
+    def record(self, client: tuple[str, int], payload: dict[str, Any]) -> None:
+        with self._lock:
+            self.requests.append(payload)
+            self.clients.add(client)
+
+
+class StubSearchServer:
+    """Local HTTP server speaking the Tavily ``/search`` API.
+
+    Use as a context manager; ``base_url`` points at the running server.
+    ``requests`` records every payload received and ``connections`` counts
+    distinct client sockets, which shows whether keep-alive is effective.
+    """
+
+    def __init__(self) -> None:
+        self._server = _SearchHTTPServer()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> list[dict[str, Any]]:
+        return self._server.requests
+
+    @property
+    def connections(self) -> int:
+        return len(self._server.clients)
+
+    def __enter__(self) -> "StubSearchServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+__all__ = ["FakeChatModel", "StubSearchServer"]
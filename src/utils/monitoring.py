@@ -0,0 +1,241 @@
+"""
+Health monitoring for conversation threads.
+
+``ThreadMonitor`` records every turn of every conversation thread in a
+per-thread latency histogram with fixed buckets, so recording costs O(1) per
+step, and keeps the time of each thread's last heartbeat. Everything else is
+computed when metrics are pulled:
+
+- ``stuck_threads()``: threads with a turn in progress and no heartbeat for
+  ``stuck_after`` seconds (long-running nodes can call ``heartbeat``),
+- ``render()``: a snapshot in the Prometheus text exposition format, with
+  latency histograms, queue depths of the attached ``ThreadPoolManager``
+  and stuck threads,
+- ``write(path)``: the snapshot written atomically to a file, for a
+  node_exporter style textfile collector,
+- ``serve(port)``: the snapshot served over HTTP at ``/metrics``.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    __slots__ = ("bounds", "count", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = bounds
+        # One count per bucket plus the +Inf bucket, not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self) -> list[int]:
+        """Counts per bucket, cumulative as in Prometheus, +Inf last."""
+        total, counts = 0, []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class ThreadMonitor:
+    """Per-thread step latencies and heartbeats.
+
+    Args:
+        stuck_after: Seconds without a heartbeat after which a thread with a
+            turn in progress counts as stuck.
+        buckets: Upper bounds of the latency histogram buckets.
+        prefix: Prefix of the metric names.
+    """
+
+    def __init__(
+        self,
+        stuck_after: float = 60.0,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        prefix: str = "graph",
+    ) -> None:
+        self.stuck_after = stuck_after
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._heartbeats: dict[str, float] = {}
+        # Threads with a turn in progress -> when it started
+        self._running: dict[str, float] = {}
+        self._queue_depths: Callable[[], Mapping[str, int]] | None = None
+
+    def track_queues(self, queue_depths: Callable[[], Mapping[str, int]]) -> None:
+        """Report the queue depths returned by ``queue_depths`` on each pull."""
+        self._queue_depths = queue_depths
+
+    def heartbeat(self, thread_id: str) -> None:
+        """Mark ``thread_id`` as alive."""
+        self._heartbeats[thread_id] = time.monotonic()
+
+    def step_started(self, thread_id: str) -> float:
+        """Record the start of a turn; returns the start time."""
+        now = time.monotonic()
+        with self._lock:
+            self._running[thread_id] = now
+            self._heartbeats[thread_id] = now
+        return now
+
+    def step_finished(self, thread_id: str, started: float) -> None:
+        """Record the end of a turn that began at ``started``."""
+        now = time.monotonic()
+        with self._lock:
+            histogram = self._histograms.get(thread_id)
+            if histogram is None:
+                histogram = self._histograms[thread_id] = LatencyHistogram(self.buckets)
+            histogram.observe(now - started)
+            self._running.pop(thread_id, None)
+            self._heartbeats[thread_id] = now
+
+    @contextmanager
+    def track(self, thread_id: str) -> Iterator[None]:
+        """Record the enclosed block as one turn of ``thread_id``."""
+        started = self.step_started(thread_id)
+        try:
+            yield
+        finally:
+            self.step_finished(thread_id, started)
+
+    def forget(self, thread_id: str) -> None:
+        """Drop everything recorded about ``thread_id``."""
+        with self._lock:
+            self._histograms.pop(thread_id, None)
+            self._heartbeats.pop(thread_id, None)
+            self._running.pop(thread_id, None)
+
+    def histogram(self, thread_id: str) -> LatencyHistogram | None:
+        return self._histograms.get(thread_id)
+
+    def stuck_threads(self, now: float | None = None) -> list[str]:
+        """Threads with a turn in progress and no recent heartbeat."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [
+                thread_id
+                for thread_id in self._running
+                if now - self._heartbeats.get(thread_id, 0.0) > self.stuck_after
+            ]
+
+    def render(self) -> str:
+        """Return a metrics snapshot in the Prometheus text format."""
+        now = time.monotonic()
+        with self._lock:
+            histograms = [
+                (thread_id, h.cumulative(), h.sum, h.count)
+                for thread_id, h in self._histograms.items()
+            ]
+            running = dict(self._running)
+        stuck = self.stuck_threads(now)
+        depths = self._queue_depths() if self._queue_depths else {}
+        bounds = [*map(_format_float, self.buckets), "+Inf"]
+
+        name = f"{self.prefix}_step_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of conversation turns.",
+            f"# TYPE {name} histogram",
+        ]
+        for thread_id, counts, total, count in histograms:
+            label = f'thread_id="{_escape(thread_id)}"'
+            lines += (
+                f'{name}_bucket{{{label},le="{le}"}} {n}'
+                for le, n in zip(bounds, counts, strict=True)
+            )
+            lines.append(f"{name}_sum{{{label}}} {_format_float(total)}")
+            lines.append(f"{name}_count{{{label}}} {count}")
+
+        for metric, kind, text, values in [
+            ("thread_queue_depth", "gauge", "Turns waiting to run.", depths),
+            (
+                "thread_step_running_seconds",
+                "gauge",
+                "Age of the turn in progress.",
+                {t: now - started for t, started in running.items()},
+            ),
+            (
+                "thread_stuck",
+                "gauge",
+                "Threads without a heartbeat.",
+                dict.fromkeys(stuck, 1),
+            ),
+        ]:
+            name = f"{self.prefix}_{metric}"
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            lines += (
+                f'{name}{{thread_id="{_escape(thread_id)}"}} {_format_float(value)}'
+                for thread_id, value in values.items()
+            )
+        name = f"{self.prefix}_threads_stuck"
+        lines += [f"# TYPE {name} gauge", f"{name} {len(stuck)}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | os.PathLike[str]) -> None:
+        """Write a snapshot to ``path``, atomically replacing it."""
+        directory = os.path.dirname(os.fspath(path)) or "."
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".prom.tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                file.write(self.render())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve snapshots at ``http://host:port/metrics`` from a daemon thread.
+
+        Call ``shutdown()`` on the returned server to stop it.
+        """
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = monitor.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(
+            target=server.serve_forever, name="metrics", daemon=True
+        ).start()
+        return server
+
+
+__all__ = ["DEFAULT_BUCKETS", "LatencyHistogram", "ThreadMonitor"]
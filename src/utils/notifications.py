@@ -0,0 +1,319 @@
+"""
+Out-of-band notification delivery.
+
+Sending a notification from inside a graph step makes the step wait for the
+delivery, and for every retry of it. ``NotificationDispatcher.notify`` only
+queues the notification and returns; an event loop on a background thread
+delivers the queue to a sink:
+
+- batching: up to ``batch_size`` notifications per sink call, waiting up to
+  ``batch_window`` seconds for a batch to fill,
+- coalescing: a notification identical to one still queued (same text,
+  channel and thread) is merged into it, counting the duplicates,
+- retries: a failed batch is retried with exponential backoff and jitter,
+  and dropped with a warning after ``max_retries`` retries,
+- ``max_in_flight`` batches are delivered concurrently.
+
+A sink is any async callable taking a list of ``Notification``;
+``LocalSink`` keeps what it receives, for tests and demos.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Notification:
+    """A queued notification.
+
+    Attributes:
+        text: What to notify.
+        channel: Where to deliver it, e.g. a recipient or topic.
+        thread_id: The conversation thread it is about, if any.
+        created_at: When it was first queued, as a Unix timestamp.
+        count: How many identical notifications were coalesced into it.
+    """
+
+    text: str
+    channel: str = "default"
+    thread_id: str | None = None
+    created_at: float = 0.0
+    count: int = 1
+
+
+Sink = Callable[[list[Notification]], Awaitable[None]]
+
+
+@dataclass
+class DispatchStats:
+    """Cumulative delivery counters."""
+
+    queued: int = 0
+    coalesced: int = 0
+    sent: int = 0
+    batches: int = 0
+    retries: int = 0
+    dropped: int = 0
+
+
+class LocalSink:
+    """Sink that keeps the notifications it receives.
+
+    Args:
+        maxlen: Notifications kept at most, the oldest are discarded.
+        fail_times: Fail this many deliveries first, to exercise retries.
+    """
+
+    def __init__(self, maxlen: int | None = None, fail_times: int = 0) -> None:
+        self.notifications: deque[Notification] = deque(maxlen=maxlen)
+        self.batches = 0
+        self.fail_times = fail_times
+
+    async def __call__(self, batch: list[Notification]) -> None:
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("Delivery failed")
+        self.notifications.extend(batch)
+        self.batches += 1
+
+
+class NotificationDispatcher:
+    """Deliver notifications to ``sink`` from a background event loop.
+
+    Args:
+        sink: Async callable delivering one batch; raising fails the batch.
+        batch_size: Notifications per sink call at most.
+        batch_window: Seconds to wait for a batch to fill.
+        max_retries: Retries of a failed batch before it is dropped.
+        backoff: Delay before the first retry, doubled for every retry.
+        max_backoff: Longest delay between retries.
+        max_in_flight: Batches delivered at once.
+        coalesce: Merge duplicates of queued notifications.
+    """
+
+    def __init__(
+        self,
+        sink: Sink,
+        batch_size: int = 100,
+        batch_window: float = 0.05,
+        max_retries: int = 5,
+        backoff: float = 0.1,
+        max_backoff: float = 10.0,
+        max_in_flight: int = 4,
+        coalesce: bool = True,
+    ) -> None:
+        self.sink = sink
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_in_flight = max_in_flight
+        self.coalesce = coalesce
+        self.stats = DispatchStats()
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        # Queued notifications by coalescing key, oldest first
+        self._queued: dict[Hashable, Notification] = {}
+        self._seq = itertools.count()
+        # Notifications queued or being delivered
+        self._outstanding = 0
+        self._flushing = 0
+        self._closing = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._full: asyncio.Event | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self, timeout: float = 10.0) -> None:
+        """Start the delivery loop; ``notify`` does so when first called.
+
+        Raises whatever prevented the loop from starting, or
+        ``RuntimeError`` if it didn't start within ``timeout`` seconds.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+            failure: list[BaseException] = []
+            thread = threading.Thread(
+                target=self._serve,
+                args=(ready, failure),
+                name="notifications",
+                daemon=True,
+            )
+            thread.start()
+            if not ready.wait(timeout):
+                raise RuntimeError("Notification loop did not start")
+            if failure:
+                raise failure[0]
+            # Published only once the loop can be signalled
+            self._thread = thread
+
+    def _serve(self, ready: threading.Event, failure: list[BaseException]) -> None:
+        loop = None
+        try:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._wake, self._full = asyncio.Event(), asyncio.Event()
+            self._loop = loop
+        except BaseException as e:
+            if loop is not None:
+                loop.close()
+            failure.append(e)
+            return
+        finally:
+            # Set even on failure, so start() never waits forever
+            ready.set()
+        try:
+            loop.run_until_complete(self._run())
+        finally:
+            loop.close()
+
+    def _signal(self, event: asyncio.Event | None) -> None:
+        if self._loop is not None and event is not None:
+            self._loop.call_soon_threadsafe(event.set)
+
+    def notify(
+        self, text: str, channel: str = "default", thread_id: str | None = None
+    ) -> Notification:
+        """Queue a notification and return at once.
+
+        Returns the queued notification, which may be an earlier identical
+        one it was coalesced into.
+        """
+        if self._closing:
+            raise RuntimeError("Cannot notify after close")
+        if self._thread is None:
+            self.start()
+        key = (channel, thread_id, text) if self.coalesce else next(self._seq)
+        with self._lock:
+            queued = self._queued.get(key)
+            if queued is not None:
+                queued.count += 1
+                self.stats.coalesced += 1
+                return queued
+            notification = self._queued[key] = Notification(
+                text, channel, thread_id, time.time()
+            )
+            self._outstanding += 1
+            self.stats.queued += 1
+            size = len(self._queued)
+        if size == 1:
+            self._signal(self._wake)
+        elif size == self.batch_size:
+            self._signal(self._full)
+        return notification
+
+    def _take(self) -> list[Notification]:
+        with self._lock:
+            keys = list(itertools.islice(self._queued, self.batch_size))
+            return [self._queued.pop(key) for key in keys]
+
+    async def _run(self) -> None:
+        assert self._wake is not None and self._full is not None
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks: set[asyncio.Task[None]] = set()
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if (
+                len(self._queued) < self.batch_size
+                and not self._flushing
+                and not self._closing
+            ):
+                # Give the rest of the batch a moment to arrive
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.batch_window)
+                except TimeoutError:
+                    pass
+            self._full.clear()
+            while batch := self._take():
+                await slots.acquire()
+                task = asyncio.create_task(self._deliver(batch))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+            if self._closing:
+                await asyncio.gather(*tasks)
+                if not self._queued:
+                    return
+                self._wake.set()
+
+    async def _deliver(self, batch: list[Notification]) -> None:
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await self.sink(batch)
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        logger.warning(
+                            "Dropping %d notifications after %d attempts",
+                            len(batch),
+                            attempt + 1,
+                            exc_info=e,
+                        )
+                        self.stats.dropped += len(batch)
+                        break
+                    self.stats.retries += 1
+                    delay = min(self.max_backoff, self.backoff * 2**attempt)
+                    await asyncio.sleep(random.uniform(delay / 2, delay))
+                else:
+                    self.stats.sent += len(batch)
+                    self.stats.batches += 1
+                    break
+        except BaseException:
+            # Cancelled or worse: the batch is lost, but flush() must return
+            self.stats.dropped += len(batch)
+            raise
+        finally:
+            with self._lock:
+                self._outstanding -= len(batch)
+                if not self._outstanding:
+                    self._done.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Deliver (or drop) everything queued so far, without batch delays.
+
+        Returns ``False`` if that took longer than ``timeout`` seconds.
+        """
+        with self._lock:
+            self._flushing += 1
+        try:
+            self._signal(self._wake)
+            with self._done:
+                return self._done.wait_for(lambda: not self._outstanding, timeout)
+        finally:
+            with self._lock:
+                self._flushing -= 1
+
+    def close(self) -> None:
+        """Deliver what is queued, then stop the delivery loop."""
+        self._closing = True
+        if self._thread is not None:
+            self._signal(self._wake)
+            self._thread.join()
+
+    def __enter__(self) -> "NotificationDispatcher":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+__all__ = [
+    "DispatchStats",
+    "LocalSink",
+    "Notification",
+    "NotificationDispatcher",
+    "Sink",
+]
@@ -0,0 +1,229 @@
+"""
+Checkpoint retention and compaction.
+
+Every super-step adds a checkpoint, so a busy thread's history grows without
+bound. A ``RetentionPolicy`` decides which checkpoints of a thread are worth
+keeping (the last N, one per hour or day, a byte budget), and a
+``CheckpointCompactor`` applies it to a ``SQLiteSaver``: dropped checkpoints
+lose their writes and unreferenced blobs, and surviving delta chains are
+merged into keyframes so they no longer depend on deleted versions.
+
+The compactor works incrementally: ``schedule`` marks a thread as dirty and
+the background worker compacts at most ``max_threads_per_run`` threads per
+pass, so it never holds the database for long.
+"""
+
+import logging
+import threading
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, fields
+
+from src.utils.checkpointing import CheckpointInfo, PruneResult, SQLiteSaver
+
+logger = logging.getLogger(__name__)
+
+# Length of the ISO timestamp prefix that identifies an hour and a day
+_HOUR = len("2025-01-01T00")
+_DAY = len("2025-01-01")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Which checkpoints of a thread to keep.
+
+    A checkpoint is kept if any of ``keep_last``, ``keep_hourly`` or
+    ``keep_daily`` selects it; with none of them set, all are kept. The
+    newest checkpoint is always kept. ``max_bytes`` then trims the kept set,
+    oldest first, until its estimated size fits.
+
+    Args:
+        keep_last: Number of most recent checkpoints to keep.
+        keep_hourly: Keep the newest checkpoint of each of the last N hours
+            that have checkpoints.
+        keep_daily: Same, per day.
+        max_bytes: Storage budget for the kept checkpoints of a namespace.
+    """
+
+    keep_last: int | None = None
+    keep_hourly: int = 0
+    keep_daily: int = 0
+    max_bytes: int | None = None
+
+    def select(self, infos: Sequence[CheckpointInfo]) -> set[str]:
+        """Return the ids to keep among ``infos`` (one namespace, oldest first)."""
+        if not infos:
+            return set()
+        newest_first = infos[::-1]
+        if self.keep_last is None and not self.keep_hourly and not self.keep_daily:
+            keep = {info.checkpoint_id for info in infos}
+        else:
+            keep = {newest_first[0].checkpoint_id}
+            if self.keep_last:
+                keep.update(i.checkpoint_id for i in newest_first[: self.keep_last])
+            for count, prefix in ((self.keep_hourly, _HOUR), (self.keep_daily, _DAY)):
+                buckets: set[str] = set()
+                for info in newest_first:
+                    bucket = info.ts[:prefix]
+                    if bucket in buckets:
+                        continue
+                    if len(buckets) >= count:
+                        break
+                    buckets.add(bucket)
+                    keep.add(info.checkpoint_id)
+
+        if self.max_bytes is not None:
+            within_budget, total = set(), 0
+            for info in newest_first:
+                if info.checkpoint_id not in keep:
+                    continue
+                total += info.size
+                if total > self.max_bytes and within_budget:
+                    break
+                within_budget.add(info.checkpoint_id)
+            keep = within_budget
+        return keep
+
+
+@dataclass
+class RetentionStats:
+    """Cumulative compaction metrics."""
+
+    threads: int = 0
+    checkpoints_deleted: int = 0
+    blobs_deleted: int = 0
+    writes_deleted: int = 0
+    keyframes_written: int = 0
+    bytes_reclaimed: int = 0
+
+    def add(self, result: PruneResult) -> None:
+        self.checkpoints_deleted += result.checkpoints
+        self.blobs_deleted += result.blobs
+        self.writes_deleted += result.writes
+        self.keyframes_written += result.keyframes
+        self.bytes_reclaimed += result.bytes_reclaimed
+
+    def merge(self, other: "RetentionStats") -> None:
+        for field in fields(self):
+            name = field.name
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+class CheckpointCompactor:
+    """Apply a retention policy to a saver, on demand or in the background.
+
+    Args:
+        saver: The checkpoint store to compact.
+        policy: Retention policy applied to every namespace of a thread.
+        interval: Seconds between background sweeps over all threads;
+            ``None`` only compacts threads passed to ``schedule``.
+        max_threads_per_run: Threads compacted per background pass.
+    """
+
+    def __init__(
+        self,
+        saver: SQLiteSaver,
+        policy: RetentionPolicy,
+        interval: float | None = 300.0,
+        max_threads_per_run: int = 32,
+    ) -> None:
+        self.saver = saver
+        self.policy = policy
+        self.interval = interval
+        self.max_threads_per_run = max_threads_per_run
+        self.stats = RetentionStats()
+        # Insertion-ordered set of threads waiting for compaction
+        self._dirty: dict[str, None] = {}
+        self._cond = threading.Condition()
+        self._stopped = True
+        self._worker: threading.Thread | None = None
+
+    def compact_thread(self, thread_id: str) -> RetentionStats:
+        """Apply the policy to one thread now and return what it reclaimed."""
+        stats = RetentionStats(threads=1)
+        by_ns: dict[str, list[CheckpointInfo]] = {}
+        for info in self.saver.checkpoint_infos(thread_id):
+            by_ns.setdefault(info.checkpoint_ns, []).append(info)
+        for checkpoint_ns, infos in by_ns.items():
+            keep = self.policy.select(infos)
+            # Drop only what the policy saw: newer checkpoints are left alone
+            drop = {info.checkpoint_id for info in infos} - keep
+            if drop:
+                stats.add(self.saver.drop_checkpoints(thread_id, checkpoint_ns, drop))
+        self._record(stats)
+        return stats
+
+    def compact(self, thread_ids: Iterable[str] | None = None) -> RetentionStats:
+        """Compact ``thread_ids`` (every stored thread by default) now."""
+        total = RetentionStats()
+        for thread_id in self.saver.thread_ids() if thread_ids is None else thread_ids:
+            total.merge(self.compact_thread(thread_id))
+        return total
+
+    def _record(self, stats: RetentionStats) -> None:
+        with self._cond:
+            self.stats.merge(stats)
+        if stats.checkpoints_deleted:
+            logger.debug(
+                "Compacted %d checkpoints, reclaimed %d bytes",
+                stats.checkpoints_deleted,
+                stats.bytes_reclaimed,
+            )
+
+    def schedule(self, thread_id: str) -> None:
+        """Mark ``thread_id`` for compaction by the background worker."""
+        with self._cond:
+            self._dirty[thread_id] = None
+            self._cond.notify()
+
+    def run_pending(self) -> int:
+        """Compact up to ``max_threads_per_run`` scheduled threads.
+
+        Returns the number of threads compacted.
+        """
+        with self._cond:
+            batch = list(self._dirty)[: self.max_threads_per_run]
+            for thread_id in batch:
+                del self._dirty[thread_id]
+        for thread_id in batch:
+            try:
+                self.compact_thread(thread_id)
+            except Exception:
+                logger.exception("Compacting thread %s failed", thread_id)
+        return len(batch)
+
+    def start(self) -> None:
+        """Start the background worker."""
+        with self._cond:
+            if not self._stopped:
+                return
+            self._stopped = False
+        self._worker = threading.Thread(
+            target=self._run, name="checkpoint-compactor", daemon=True
+        )
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Stop the background worker after its current pass."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                woken = self._cond.wait_for(
+                    lambda: self._dirty or self._stopped, timeout=self.interval
+                )
+                if self._stopped:
+                    return
+            if not woken:
+                # Periodic sweep: queue every thread, a batch at a time below
+                for thread_id in self.saver.thread_ids():
+                    self.schedule(thread_id)
+            self.run_pending()
+
+
+__all__ = ["CheckpointCompactor", "RetentionPolicy", "RetentionStats"]
@@ -0,0 +1,127 @@
+"""
+Precompiled keyword/intent routing.
+
+Routing with ``if "hello" in text.lower(): ... elif ...`` rescans the message
+once per keyword, so the cost grows with the number of intents. The router
+compiles every keyword of every intent into a single trie-shaped regular
+expression, so one scan over the message finds all keyword hits regardless of
+how many intents are registered. Intents are ranked by registration order,
+matching the precedence of an if/elif chain.
+"""
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A named intent, the keywords that trigger it and its confidence."""
+
+    name: str
+    keywords: tuple[str, ...]
+    confidence: float = 1.0
+
+
+@dataclass(frozen=True)
+class Route:
+    """Result of routing one message."""
+
+    intent: str
+    confidence: float
+    keyword: str | None = None
+
+
+def trie_pattern(keywords: Iterable[str]) -> str:
+    """Return a regex matching any of ``keywords``, shaped like their trie.
+
+    Shared prefixes are factored out so the engine tests each character of the
+    input against one branch per distinct next character, instead of trying
+    every keyword in turn. Longer keywords win over their prefixes.
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        terminal = "" in node
+        branches = [
+            re.escape(char) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if terminal:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class IntentRouter:
+    """Classify text by keyword with a single precompiled pattern.
+
+    Matching is case-insensitive substring matching, like ``kw in text.lower()``.
+    When keywords of several intents occur, the intent registered first wins.
+
+    Args:
+        intents: Intents in precedence order.
+        default: Intent name returned when no keyword matches.
+        default_confidence: Confidence of the default route.
+    """
+
+    def __init__(
+        self,
+        intents: Iterable[Intent],
+        default: str = "unknown",
+        default_confidence: float = 0.0,
+    ) -> None:
+        self.intents = tuple(intents)
+        self.default = Route(default, default_confidence)
+        # keyword -> rank of the first intent that declares it
+        ranks: dict[str, int] = {}
+        for rank, intent in enumerate(self.intents):
+            for keyword in intent.keywords:
+                if keyword:
+                    ranks.setdefault(keyword.lower(), rank)
+        # The pattern reports the longest keyword starting at each position;
+        # any keyword that is a prefix of it matched there too, so resolve
+        # each keyword to the best (rank, keyword) among its prefixes.
+        self._best: dict[str, tuple[int, str]] = {}
+        for keyword in ranks:
+            prefixes = (keyword[:i] for i in range(1, len(keyword) + 1))
+            self._best[keyword] = min(
+                (ranks[prefix], prefix) for prefix in prefixes if prefix in ranks
+            )
+        # A lookahead makes matches zero-width, so every start position is
+        # tried and overlapping keywords are all seen.
+        self._pattern = re.compile(f"(?=({trie_pattern(ranks)}))") if ranks else None
+
+    def route(self, text: str) -> Route:
+        """Return the highest-precedence intent whose keyword occurs in ``text``."""
+        if self._pattern is None:
+            return self.default
+        best_rank = len(self.intents)
+        best_keyword = None
+        for match in self._pattern.finditer(text.lower()):
+            rank, keyword = self._best[match.group(1)]
+            if rank < best_rank:
+                best_rank, best_keyword = rank, keyword
+                if rank == 0:
+                    break
+        if best_keyword is None:
+            return self.default
+        intent = self.intents[best_rank]
+        return Route(intent.name, intent.confidence, best_keyword)
+
+    def route_many(self, texts: Iterable[str]) -> list[Route]:
+        """Route each of ``texts``."""
+        return [self.route(text) for text in texts]
+
+
+__all__ = ["Intent", "IntentRouter", "Route", "trie_pattern"]
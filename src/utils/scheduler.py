@@ -0,0 +1,124 @@
+"""
+Bounded-concurrency fan-out scheduler for tool calls.
+
+An unbounded ``asyncio.gather`` over every pending tool call starts them all at
+once and only returns when the slowest one finishes. The scheduler instead:
+
+- orders calls by their ``priority`` field (higher first, stable otherwise),
+- caps concurrency globally and per ``tool_name``,
+- applies a per-call timeout and an overall deadline after which stragglers
+  are cancelled,
+- yields each outcome as soon as its call finishes.
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+ToolCall = dict[str, Any]
+
+
+class FanOutScheduler:
+    """Run tool calls concurrently under global and per-tool limits.
+
+    Args:
+        max_concurrency: Maximum number of calls running at once.
+        per_tool_limits: Optional cap per ``tool_name``.
+        call_timeout: Seconds a single call may run before it fails.
+        deadline: Seconds after which all unfinished calls are cancelled.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        per_tool_limits: Mapping[str, int] | None = None,
+        call_timeout: float | None = None,
+        deadline: float | None = None,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.per_tool_limits = dict(per_tool_limits or {})
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+
+    @staticmethod
+    def order(calls: list[ToolCall]) -> list[ToolCall]:
+        """Return ``calls`` sorted by descending ``priority`` (stable)."""
+        return sorted(calls, key=lambda call: -call.get("priority", 0))
+
+    async def stream(
+        self,
+        calls: list[ToolCall],
+        execute: Callable[[ToolCall], Awaitable[Any]],
+    ) -> AsyncIterator[tuple[ToolCall, Any]]:
+        """Execute ``calls`` and yield ``(call, outcome)`` as each finishes.
+
+        ``outcome`` is the value returned by ``execute`` or the exception it
+        raised; calls that time out or are cancelled at the deadline yield a
+        ``TimeoutError``.
+        """
+        global_slots = asyncio.Semaphore(self.max_concurrency)
+        tool_slots = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in self.per_tool_limits.items()
+        }
+
+        async def run(call: ToolCall) -> Any:
+            tool_slot = tool_slots.get(call.get("tool_name", ""))
+            # Take the per-tool slot first so a saturated tool never holds
+            # global slots that other tools could use.
+            if tool_slot is not None:
+                await tool_slot.acquire()
+            try:
+                async with global_slots:
+                    try:
+                        async with asyncio.timeout(self.call_timeout):
+                            return await execute(call)
+                    except TimeoutError:
+                        raise TimeoutError(
+                            f"Tool call timed out after {self.call_timeout}s"
+                        ) from None
+            finally:
+                if tool_slot is not None:
+                    tool_slot.release()
+
+        # Semaphores wake waiters in FIFO order, so creating the tasks in
+        # priority order makes higher priority calls start first.
+        tasks = {asyncio.create_task(run(call)): call for call in self.order(calls)}
+        rank = {task: i for i, task in enumerate(tasks)}
+        pending = set(tasks)
+        loop = asyncio.get_running_loop()
+        end = None if self.deadline is None else loop.time() + self.deadline
+
+        try:
+            while pending:
+                remaining = None if end is None else max(0.0, end - loop.time())
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                # Calls finishing together are reported in priority order
+                for task in sorted(done, key=rank.__getitem__):
+                    if task.cancelled():
+                        yield tasks[task], TimeoutError("Tool call was cancelled")
+                    else:
+                        exc = task.exception()
+                        yield tasks[task], exc if exc is not None else task.result()
+
+            for task in sorted(pending, key=rank.__getitem__):
+                task.cancel()
+                logger.debug("Cancelling straggler %s", tasks[task].get("id"))
+                error = TimeoutError(f"Tool call cancelled after {self.deadline}s")
+                yield tasks[task], error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+__all__ = ["FanOutScheduler", "ToolCall"]
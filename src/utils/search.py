@@ -0,0 +1,147 @@
+"""
+Async-native Tavily search client.
+
+``TavilySearchResults.invoke`` is synchronous, so fanning out searches means
+one worker thread per call and a fresh HTTP connection each time. This client
+talks to the Tavily REST API directly over a shared ``aiohttp`` session with a
+pooled keep-alive connector, and caps the number of in-flight requests with a
+semaphore instead of relying on the thread pool size.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+TAVILY_API_URL = "https://api.tavily.com"
+
+
+class AsyncTavilySearch:
+    """Pooled async client for the Tavily search API.
+
+    The session is created lazily on first use and bound to the running event
+    loop. If the client is later used from a different loop, a new session is
+    created and the old one is closed on its own loop, as soon as that loop
+    runs again. Call ``aclose`` before the last loop using the client stops.
+
+    Args:
+        api_key: Tavily API key.
+        base_url: API root, overridable to point at a local stub server.
+        max_concurrency: Maximum number of requests in flight at once.
+        max_results: Number of results requested per search.
+        search_depth: ``"basic"`` or ``"advanced"``.
+        timeout: Total timeout in seconds for a single request.
+        keepalive_timeout: Seconds an idle pooled connection is kept open.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = TAVILY_API_URL,
+        max_concurrency: int = 32,
+        max_results: int = 5,
+        search_depth: str = "advanced",
+        timeout: float = 30.0,
+        keepalive_timeout: float = 30.0,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_results = max_results
+        self.search_depth = search_depth
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Sessions being closed on the loops they were created on
+        self._closing: set[asyncio.Task[None]] = set()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                self._close_elsewhere(self._session, self._loop)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_concurrency,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session
+
+    def _close_elsewhere(
+        self, session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop | None
+    ) -> None:
+        """Close ``session`` on ``loop``, the loop its connections belong to."""
+
+        def close() -> None:
+            task = loop.create_task(session.close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+        try:
+            if loop is None or loop.is_closed():
+                raise RuntimeError("Event loop is closed")
+            loop.call_soon_threadsafe(close)
+        except RuntimeError:
+            # Nothing can run on that loop any more
+            logger.warning("Search session left open by a closed event loop")
+
+    async def search(self, query: str, **options: Any) -> list[dict[str, Any]]:
+        """Search Tavily and return the cleaned result list."""
+        session = await self._get_session()
+        assert self._semaphore is not None
+        payload = {
+            "api_key": self.api_key,
+            "query": query,
+            "max_results": self.max_results,
+            "search_depth": self.search_depth,
+            **options,
+        }
+        async with self._semaphore:
+            async with session.post(f"{self.base_url}/search", json=payload) as res:
+                res.raise_for_status()
+                data = await res.json()
+        return [
+            {
+                "title": result.get("title"),
+                "url": result.get("url"),
+                "content": result.get("content"),
+                "score": result.get("score"),
+            }
+            for result in data.get("results", [])
+        ]
+
+    async def ainvoke(self, args: dict[str, Any]) -> list[dict[str, Any]]:
+        """Run a search from tool-call style arguments (``{"query": ...}``)."""
+        query = args.get("query")
+        if not query:
+            raise ValueError("Search requires a non-empty 'query' argument")
+        options = {key: value for key, value in args.items() if key != "query"}
+        return await self.search(query, **options)
+
+    async def aclose(self) -> None:
+        """Close the pooled session; the client can still be used afterwards."""
+        if self._session is not None and not self._session.closed:
+            if self._loop is asyncio.get_running_loop():
+                await self._session.close()
+            else:
+                self._close_elsewhere(self._session, self._loop)
+        self._session = None
+        self._loop = None
+
+    async def __aenter__(self) -> "AsyncTavilySearch":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+
+__all__ = ["TAVILY_API_URL", "AsyncTavilySearch"]
@@ -0,0 +1,230 @@
+"""
+Compact binary serializer for checkpointed state.
+
+LangGraph's default serializer encodes every message as a generic object
+(module path, class name and a dict of every field, defaults included) and
+repeats identical contents in full. ``CompactSerializer`` knows the message
+schema instead:
+
+- each message is an ext record ``[tag, content, id, fields, extra]`` where
+  ``tag`` is a small integer interned per message class,
+- fields holding their default value are omitted; the others are keyed by
+  name, so payloads survive langchain releases that add, remove or reorder
+  message fields,
+- a message content seen earlier in the same payload is written as a back
+  reference to its first occurrence,
+- payloads above ``min_compress_size`` can be compressed with zstd (if the
+  ``zstandard`` package is installed) or zlib.
+
+Anything else the encoder does not handle natively (tuples, datetimes,
+pydantic models, ``Send`` objects...) makes the whole payload fall back to
+the default serializer, so every value still round-trips.
+"""
+
+import zlib
+from collections.abc import Callable
+from functools import partial
+from typing import Any, Literal
+
+import ormsgpack
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    ChatMessage,
+    FunctionMessage,
+    HumanMessage,
+    HumanMessageChunk,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+    ToolMessageChunk,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+TYPE = "cmsgpack"
+_MESSAGE_EXT = 1
+
+# Interned message tags: the position in this tuple. Only append to it, since
+# stored payloads refer to classes by index.
+MESSAGE_TYPES: tuple[type[BaseMessage], ...] = (
+    HumanMessage,
+    AIMessage,
+    SystemMessage,
+    ToolMessage,
+    ChatMessage,
+    FunctionMessage,
+    RemoveMessage,
+    AIMessageChunk,
+    HumanMessageChunk,
+    ToolMessageChunk,
+)
+
+# Values the encoder must not pack natively, so they reach ``default``
+_OPTIONS = (
+    ormsgpack.OPT_PASSTHROUGH_TUPLE
+    | ormsgpack.OPT_PASSTHROUGH_DATACLASS
+    | ormsgpack.OPT_PASSTHROUGH_DATETIME
+    | ormsgpack.OPT_PASSTHROUGH_ENUM
+    | ormsgpack.OPT_PASSTHROUGH_SUBCLASS
+    | ormsgpack.OPT_PASSTHROUGH_UUID
+    | ormsgpack.OPT_PASSTHROUGH_BIG_INT
+)
+
+
+class _Schema:
+    """Per-class field layout, computed once."""
+
+    __slots__ = ("cls", "defaults", "factories", "fields", "names", "tag")
+
+    def __init__(self, tag: int, cls: type[BaseMessage]) -> None:
+        self.tag = tag
+        self.cls = cls
+        self.names = tuple(
+            name for name in cls.model_fields if name not in ("content", "id", "type")
+        )
+        self.defaults = tuple(
+            cls.model_fields[name].get_default(call_default_factory=True)
+            for name in self.names
+        )
+        # (name, default) pairs, walked once per encoded message
+        self.fields = tuple(zip(self.names, self.defaults, strict=True))
+        # Decoding passes every field to ``model_construct``, which is much
+        # slower when it has to resolve defaults itself
+        self.factories = {
+            name: field.default_factory or partial(_constant, field.default)
+            for name, field in cls.model_fields.items()
+            if name not in ("content", "id")
+        }
+
+
+def _constant(value: Any) -> Any:
+    return value
+
+
+_SCHEMAS = {cls: _Schema(tag, cls) for tag, cls in enumerate(MESSAGE_TYPES)}
+_SCHEMAS_BY_TAG = tuple(_SCHEMAS.values())
+
+
+def _encoder() -> Callable[[Any], Any]:
+    # Content -> index of its first occurrence. Every literal content takes an
+    # index, in the order the decoder will see them: after the record's nested
+    # values.
+    contents: dict[str, int] = {}
+    count = 0
+
+    def default(obj: Any) -> Any:
+        nonlocal count
+        schema = _SCHEMAS.get(type(obj))
+        if schema is None:
+            raise TypeError(f"Type is not supported: {type(obj).__name__}")
+        fields = []
+        for name, default_value in schema.fields:
+            value = getattr(obj, name)
+            if value != default_value:
+                fields += (name, value)
+        content = obj.content
+        literal = isinstance(content, str) and content not in contents
+        if isinstance(content, str) and not literal:
+            content = contents[content]
+        record = [schema.tag, content, obj.id, fields or None, obj.__pydantic_extra__]
+        while record[-1] is None:
+            record.pop()
+        data = ormsgpack.packb(record, default=default, option=_OPTIONS)
+        if literal:
+            contents.setdefault(obj.content, count)
+            count += 1
+        return ormsgpack.Ext(_MESSAGE_EXT, data)
+
+    return default
+
+
+def _decoder(contents: list[str]) -> Callable[[int, bytes], Any]:
+    def ext_hook(code: int, data: bytes) -> Any:
+        if code != _MESSAGE_EXT:
+            raise ValueError(f"Unknown ext code {code}")
+        tag, content, *rest = ormsgpack.unpackb(data, ext_hook=ext_hook)
+        schema = _SCHEMAS_BY_TAG[tag]
+        # Back references are ints; real contents are str or list
+        if isinstance(content, int):
+            content = contents[content]
+        elif isinstance(content, str):
+            contents.append(content)
+        values = {name: factory() for name, factory in schema.factories.items()}
+        values["content"] = content
+        values["id"] = rest[0] if rest else None
+        if len(rest) > 1 and rest[1]:
+            fields = rest[1]
+            for i in range(0, len(fields), 2):
+                values[fields[i]] = fields[i + 1]
+        if len(rest) > 2 and rest[2]:
+            values.update(rest[2])
+        # Values come from a valid message, so validation can be skipped
+        return schema.cls.model_construct(**values)
+
+    return ext_hook
+
+
+class CompactSerializer(SerializerProtocol):
+    """Schema-aware msgpack serializer with optional compression.
+
+    Args:
+        compression: ``"zstd"``, ``"zlib"`` or ``None``.
+        min_compress_size: Payloads smaller than this are never compressed.
+        level: Compression level, ``None`` for the codec default.
+        fallback: Serializer for values the compact encoding can't handle.
+    """
+
+    def __init__(
+        self,
+        compression: Literal["zstd", "zlib"] | None = None,
+        min_compress_size: int = 1024,
+        level: int | None = None,
+        fallback: SerializerProtocol | None = None,
+    ) -> None:
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        if compression not in (None, "zstd", "zlib"):
+            raise ValueError(f"Unknown compression: {compression!r}")
+        self.compression = compression
+        self.min_compress_size = min_compress_size
+        self.level = level
+        self.fallback = fallback or JsonPlusSerializer()
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        try:
+            data = ormsgpack.packb(obj, default=_encoder(), option=_OPTIONS)
+        except TypeError:
+            # ormsgpack reports any unsupported value, ours included, this way
+            return self.fallback.dumps_typed(obj)
+        if self.compression is None or len(data) < self.min_compress_size:
+            return TYPE, data
+        if self.compression == "zstd":
+            # zstd contexts are not thread safe, so each call gets its own
+            compressor = zstandard.ZstdCompressor(
+                level=3 if self.level is None else self.level
+            )
+            return f"{TYPE}+zstd", compressor.compress(data)
+        level = -1 if self.level is None else self.level
+        return f"{TYPE}+zlib", zlib.compress(data, level)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if not type_.startswith(TYPE):
+            return self.fallback.loads_typed(data)
+        if type_ == f"{TYPE}+zstd":
+            if zstandard is None:
+                raise ImportError("zstd payloads require the 'zstandard' package")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif type_ == f"{TYPE}+zlib":
+            payload = zlib.decompress(payload)
+        return ormsgpack.unpackb(payload, ext_hook=_decoder([]))
+
+
+__all__ = ["MESSAGE_TYPES", "CompactSerializer"]
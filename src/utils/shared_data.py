@@ -0,0 +1,131 @@
+"""
+Shared data for concurrent graph threads.
+
+Conversation threads running on a worker pool share some values (counters,
+quotas, caches). One lock around all of them serializes every thread on
+every access; mutating a dict in state without any lock loses updates.
+``SharedData`` stripes its keys over a fixed set of locks, so threads only
+contend when they touch keys in the same stripe, and offers
+
+- ``update(key, fn)``: atomic read-modify-write of one key,
+- ``lock(*keys)``: a critical section over several keys, acquiring their
+  stripes in a fixed order so that two sections can't deadlock,
+- ``counter(key)``: a ``PNCounter``, whose increments take no lock at all.
+
+``PNCounter`` is a CRDT: every writer (by default, every OS thread) owns a
+slot of increments and one of decrements that only it writes, the value is
+the sum over slots, and two counters merge by taking the slot-wise maximum.
+"""
+
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+_MISSING = object()
+
+
+class PNCounter:
+    """Counter whose writers never contend.
+
+    Args:
+        replica: Slot used when ``add`` is given none; defaults to the
+            calling OS thread.
+    """
+
+    def __init__(self, replica: Callable[[], Any] = threading.get_ident) -> None:
+        self._replica = replica
+        self._incs: dict[Any, int] = {}
+        self._decs: dict[Any, int] = {}
+
+    def add(self, amount: int = 1, replica: Any = None) -> None:
+        """Add ``amount`` (possibly negative) in the writer's own slot.
+
+        Each slot must only be written by one thread at a time.
+        """
+        if replica is None:
+            replica = self._replica()
+        slots = self._incs if amount >= 0 else self._decs
+        # Only this replica writes its slot, so the read-add-write can't race
+        slots[replica] = slots.get(replica, 0) + abs(amount)
+
+    @property
+    def value(self) -> int:
+        # Copies first: another thread may add a slot while summing
+        return sum(self._incs.copy().values()) - sum(self._decs.copy().values())
+
+    def merge(self, other: "PNCounter") -> None:
+        """Merge ``other`` (a replica of the same counter) into this one."""
+        for mine, theirs in ((self._incs, other._incs), (self._decs, other._decs)):
+            for replica, count in theirs.copy().items():
+                if count > mine.get(replica, 0):
+                    mine[replica] = count
+
+    def __int__(self) -> int:
+        return self.value
+
+    def __repr__(self) -> str:
+        return f"PNCounter({self.value})"
+
+
+class SharedData:
+    """Key-value store with fine-grained, striped locking.
+
+    Args:
+        stripes: Number of locks the keys are spread over.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        self._locks = tuple(threading.RLock() for _ in range(stripes))
+        self._data: dict[str, Any] = {}
+
+    def _stripe(self, key: str) -> int:
+        return hash(key) % len(self._locks)
+
+    @contextmanager
+    def lock(self, *keys: str) -> Iterator[None]:
+        """Hold the locks of ``keys`` for a multi-key critical section."""
+        stripes = sorted({self._stripe(key) for key in keys})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._locks[self._stripe(key)]:
+            self._data[key] = value
+
+    def update(self, key: str, fn: Callable[[Any], Any], default: Any = None) -> Any:
+        """Atomically replace the value of ``key`` with ``fn(value)``.
+
+        ``fn`` gets ``default`` if the key is unset. Returns the new value.
+        """
+        with self._locks[self._stripe(key)]:
+            value = self._data[key] = fn(self._data.get(key, default))
+            return value
+
+    def counter(self, key: str) -> PNCounter:
+        """Return the counter stored at ``key``, creating it if needed."""
+        counter = self._data.get(key, _MISSING)
+        if counter is _MISSING:
+            with self._locks[self._stripe(key)]:
+                counter = self._data.setdefault(key, PNCounter())
+        if not isinstance(counter, PNCounter):
+            raise TypeError(f"{key!r} holds a {type(counter).__name__}, not a counter")
+        return counter
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a copy of all values, counters as their current value."""
+        return {
+            key: value.value if isinstance(value, PNCounter) else value
+            for key, value in self._data.copy().items()
+        }
+
+
+__all__ = ["PNCounter", "SharedData"]
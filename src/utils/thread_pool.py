@@ -0,0 +1,245 @@
+"""
+Bounded worker pool for conversation threads.
+
+Each LangGraph conversation (``thread_id``) must process its turns one at a
+time and in order, or two turns would race on the same checkpoint, while
+different conversations should run concurrently. ``ThreadPoolManager`` keeps
+a FIFO queue per conversation and at most one executor task per
+conversation: the task runs one queued turn and, if more are waiting,
+re-submits itself behind every other conversation's task. That gives
+
+- per-thread serialization: a conversation's turns never overlap and run in
+  submission order,
+- fair scheduling: busy conversations take turns round-robin instead of
+  draining their whole queue,
+- backpressure: at most ``max_pending`` turns are queued or running, and
+  ``submit`` blocks (or times out) beyond that,
+- per-thread queue depth and throughput metrics.
+"""
+
+import threading
+from collections import deque
+from collections.abc import Callable, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from src.utils.monitoring import ThreadMonitor
+
+
+@dataclass
+class ThreadStats:
+    """Counters of one conversation thread.
+
+    ``completed`` counts the turns that ran, ``failed`` included;
+    ``cancelled`` the turns cancelled before they could run.
+    """
+
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    max_depth: int = 0
+
+
+@dataclass(slots=True)
+class _Job:
+    fn: Callable[..., Any]
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    future: Future
+
+
+class ThreadPoolManager:
+    """Run conversation turns concurrently, serialized per ``thread_id``.
+
+    Args:
+        max_workers: Worker threads, i.e. conversations running at once.
+        max_pending: Turns queued or running before ``submit`` blocks.
+        name: Prefix of the worker thread names.
+        monitor: Records every turn and reports the queue depths.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        max_pending: int = 1024,
+        name: str = "graph",
+        monitor: ThreadMonitor | None = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.monitor = monitor
+        if monitor is not None:
+            monitor.track_queues(self.queue_depths)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        # Conversations with queued or running turns; a conversation is in
+        # here exactly while one executor task is scheduled for it
+        self._queues: dict[str, deque[_Job]] = {}
+        self._stats: dict[str, ThreadStats] = {}
+        self._pending = 0
+
+    def submit(
+        self,
+        thread_id: str,
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> Future:
+        """Queue ``fn(*args, **kwargs)`` as the next turn of ``thread_id``.
+
+        Blocks while ``max_pending`` turns are outstanding; raises
+        ``TimeoutError`` if no slot frees up within ``timeout`` seconds.
+        """
+        if self._closed:
+            raise RuntimeError("Cannot submit after shutdown")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"{self.max_pending} turns already pending")
+        job = _Job(fn, args, kwargs, Future())
+        with self._lock:
+            queue = self._queues.get(thread_id)
+            idle = queue is None
+            if idle:
+                queue = self._queues[thread_id] = deque()
+            queue.append(job)
+            self._pending += 1
+            stats = self._stats.get(thread_id)
+            if stats is None:
+                stats = self._stats[thread_id] = ThreadStats()
+            stats.submitted += 1
+            stats.max_depth = max(stats.max_depth, len(queue))
+        if idle:
+            try:
+                self._executor.submit(self._run_next, thread_id)
+            except RuntimeError:
+                self._abandon(thread_id)
+                raise
+        return job.future
+
+    def invoke(
+        self,
+        graph: Any,
+        thread_id: str,
+        input: Any,
+        config: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> Future:
+        """Queue ``graph.invoke`` on conversation ``thread_id``."""
+        config = dict(config or {})
+        config["configurable"] = {
+            **config.get("configurable", {}),
+            "thread_id": thread_id,
+        }
+        return self.submit(thread_id, graph.invoke, input, config, **kwargs)
+
+    def _run_next(self, thread_id: str) -> None:
+        with self._lock:
+            job = self._queues[thread_id].popleft()
+        failed = False
+        ran = job.future.set_running_or_notify_cancel()
+        if ran:
+            monitor = self.monitor
+            started = monitor.step_started(thread_id) if monitor else 0.0
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as e:
+                failed = True
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            finally:
+                if monitor:
+                    monitor.step_finished(thread_id, started)
+        with self._lock:
+            self._pending -= 1
+            stats = self._stats[thread_id]
+            if ran:
+                stats.completed += 1
+                if failed:
+                    stats.failed += 1
+            else:
+                stats.cancelled += 1
+            more = bool(self._queues[thread_id])
+            if not more:
+                del self._queues[thread_id]
+                if not self._queues:
+                    self._idle.notify_all()
+        self._slots.release()
+        if more:
+            # Back of the executor queue: other conversations go first
+            try:
+                self._executor.submit(self._run_next, thread_id)
+            except RuntimeError:
+                self._abandon(thread_id)
+
+    def _abandon(self, thread_id: str) -> None:
+        """Cancel the queued turns of ``thread_id`` after a shutdown."""
+        with self._lock:
+            jobs = self._queues.pop(thread_id, ())
+            self._pending -= len(jobs)
+            if jobs:
+                self._stats[thread_id].cancelled += len(jobs)
+            if not self._queues:
+                self._idle.notify_all()
+        for job in jobs:
+            job.future.cancel()
+            self._slots.release()
+
+    def queue_depth(self, thread_id: str) -> int:
+        """Turns of ``thread_id`` waiting to run."""
+        with self._lock:
+            return len(self._queues.get(thread_id, ()))
+
+    def queue_depths(self) -> dict[str, int]:
+        """Queue depth of every conversation with queued or running turns."""
+        with self._lock:
+            return {thread_id: len(queue) for thread_id, queue in self._queues.items()}
+
+    @property
+    def pending(self) -> int:
+        """Turns queued or running across all conversations."""
+        return self._pending
+
+    def stats(self, thread_id: str) -> ThreadStats:
+        """Return a copy of the counters of ``thread_id``."""
+        with self._lock:
+            stats = self._stats.get(thread_id) or ThreadStats()
+            return ThreadStats(**vars(stats))
+
+    def forget(self, thread_id: str) -> None:
+        """Drop the counters of ``thread_id`` unless it has turns queued."""
+        with self._lock:
+            if thread_id not in self._queues:
+                self._stats.pop(thread_id, None)
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stop accepting turns.
+
+        With ``wait``, block until every queued turn has run (or been
+        cancelled, with ``cancel_pending``).
+        """
+        self._closed = True
+        if cancel_pending:
+            with self._lock:
+                jobs = [job for queue in self._queues.values() for job in queue]
+            for job in jobs:
+                job.future.cancel()
+        if wait:
+            with self._idle:
+                self._idle.wait_for(lambda: not self._queues)
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "ThreadPoolManager":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.shutdown()
+
+
+__all__ = ["ThreadPoolManager", "ThreadStats"]
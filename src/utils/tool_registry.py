@@ -0,0 +1,96 @@
+"""
+Tool registry with cached ToolNode instances.
+
+Building a ``ToolNode`` introspects every tool (argument schemas, injected
+arguments), so doing it on every tool call puts schema work on the hot path.
+The registry builds one ``ToolNode`` per distinct tool set and keeps the most
+recently used ones around, together with the parsed argument schema of each
+tool.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Sequence
+from typing import Any, NamedTuple
+
+from langgraph.prebuilt import ToolNode
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry(NamedTuple):
+    node: ToolNode
+    schemas: dict[str, dict[str, Any]]
+
+
+def _tool_name(tool: Any) -> str:
+    """Return the name a tool is registered under."""
+    return getattr(tool, "name", None) or getattr(tool, "__name__", repr(tool))
+
+
+class ToolRegistry:
+    """LRU cache of ``ToolNode`` instances keyed by the tool set.
+
+    Tools are identified by name and object identity, so two lists holding the
+    same tool objects (in any order) share a single ``ToolNode``. Cached nodes
+    keep a reference to their tools, which keeps the identities stable for as
+    long as the entry lives.
+    """
+
+    def __init__(self, maxsize: int = 32) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(tools: Sequence[Any]) -> Hashable:
+        return frozenset((_tool_name(tool), id(tool)) for tool in tools)
+
+    def _get(self, tools: Sequence[Any]) -> _Entry:
+        key = self._key(tools)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Build outside the lock; a concurrent miss on the same key only costs
+        # one extra construction and the last writer wins.
+        logger.debug("Building ToolNode for tools: %s", sorted(k[0] for k in key))
+        node = ToolNode(list(tools))
+        schemas = {name: dict(tool.args) for name, tool in node.tools_by_name.items()}
+        entry = _Entry(node, schemas)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_tool_node(self, tools: Sequence[Any]) -> ToolNode:
+        """Return a cached ``ToolNode`` for ``tools``, building it on first use."""
+        return self._get(tools).node
+
+    def get_schemas(self, tools: Sequence[Any]) -> dict[str, dict[str, Any]]:
+        """Return the parsed argument schemas of ``tools`` keyed by tool name."""
+        return self._get(tools).schemas
+
+    def clear(self) -> None:
+        """Drop all cached entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = ["ToolRegistry"]
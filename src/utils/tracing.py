@@ -0,0 +1,164 @@
+"""
+Lazy, structured tracing for graph modules.
+
+Debug lines such as ``logger.debug(f"Validated state: {state}")`` format the
+entire state on every step, even when nothing listens at DEBUG. A ``Tracer``
+checks the level before doing any work, renders only once a handler actually
+emits the record, and summarizes states (channel sizes, last message) instead
+of dumping full reprs. Debug events can also be sampled.
+
+Usage::
+
+    tracer = get_tracer(__name__)
+    tracer.debug("Routing", state=state, target="error_handler")
+
+The message is positional-only, so ``message`` can also be a field name.
+"""
+
+import itertools
+import logging
+from collections.abc import Mapping
+from typing import Any
+
+DEFAULT_MAX_LEN = 120
+
+
+def _truncate(text: str, max_len: int) -> str:
+    return text if len(text) <= max_len else f"{text[: max_len - 3]}..."
+
+
+def _summarize_message(message: Any, max_len: int) -> str:
+    content = _truncate(str(message.content), max_len)
+    return f"{message.type}({content!r})"
+
+
+def summarize(value: Any, max_len: int = DEFAULT_MAX_LEN) -> str:
+    """Return a short, bounded description of ``value``.
+
+    Messages show their type and truncated content, sequences their length
+    and last item, and mappings (e.g. graph states) one summary per key.
+    """
+    if hasattr(value, "content") and hasattr(value, "type"):
+        return _summarize_message(value, max_len)
+    if isinstance(value, Mapping):
+        parts = ", ".join(
+            f"{key}={_summarize_item(item, max_len)}" for key, item in value.items()
+        )
+        return "{" + _truncate(parts, max_len * 2) + "}"
+    if isinstance(value, list | tuple):
+        return _summarize_item(value, max_len)
+    return _truncate(str(value), max_len)
+
+
+def _summarize_item(value: Any, max_len: int) -> str:
+    if isinstance(value, list | tuple):
+        if not value:
+            return "[]"
+        last = value[-1]
+        if hasattr(last, "content") and hasattr(last, "type"):
+            return f"[{len(value)} items, last={_summarize_message(last, max_len)}]"
+        return f"[{len(value)} items]"
+    if isinstance(value, Mapping):
+        return f"{{{len(value)} keys}}" if value else "{}"
+    return _truncate(repr(value), max_len)
+
+
+class _Event:
+    """Log record payload rendered only when a handler formats it."""
+
+    __slots__ = ("fields", "max_len", "message")
+
+    def __init__(self, message: str, fields: dict[str, Any], max_len: int) -> None:
+        self.message = message
+        self.fields = fields
+        self.max_len = max_len
+
+    def __str__(self) -> str:
+        if not self.fields:
+            return self.message
+        rendered = " ".join(
+            f"{key}={summarize(value, self.max_len)}"
+            for key, value in self.fields.items()
+        )
+        return f"{self.message} {rendered}"
+
+
+class Tracer:
+    """Structured, lazily formatted logger.
+
+    Args:
+        name: Logger name, usually the module ``__name__``.
+        sample_rate: Fraction of DEBUG events emitted (``0.1`` keeps every
+            tenth). Other levels are never sampled.
+        max_len: Maximum length of each summarized field.
+    """
+
+    def __init__(
+        self, name: str, sample_rate: float = 1.0, max_len: int = DEFAULT_MAX_LEN
+    ) -> None:
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self.logger = logging.getLogger(name)
+        self.sample_rate = sample_rate
+        self.max_len = max_len
+        self._every = round(1 / sample_rate)
+        self._counter = itertools.count()
+
+    def enabled(self, level: int = logging.DEBUG) -> bool:
+        """Return whether events at ``level`` would be emitted."""
+        return self.logger.isEnabledFor(level)
+
+    def _log(self, level: int, message: str, fields: dict[str, Any], **kw: Any) -> None:
+        # stacklevel points the record at the caller, not at the tracer
+        self.logger.log(
+            level, "%s", _Event(message, fields, self.max_len), stacklevel=3, **kw
+        )
+
+    def debug(self, message: str, /, **fields: Any) -> None:
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        if self._every > 1 and next(self._counter) % self._every:
+            return
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message: str, /, **fields: Any) -> None:
+        if self.logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, message, fields)
+
+    def warning(self, message: str, /, **fields: Any) -> None:
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, message, fields)
+
+    def error(self, message: str, /, **fields: Any) -> None:
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, message, fields)
+
+    def exception(self, message: str, /, **fields: Any) -> None:
+        """Log at ERROR with the current exception's traceback."""
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, message, fields, exc_info=True)
+
+
+_tracers: dict[str, Tracer] = {}
+
+
+def get_tracer(name: str, sample_rate: float | None = None) -> Tracer:
+    """Return the tracer for ``name``, creating it on first use.
+
+    ``sample_rate`` defaults to 1.0 for a new tracer. Asking an existing
+    tracer for a different rate raises ``ValueError`` rather than silently
+    returning the first caller's rate.
+    """
+    tracer = _tracers.get(name)
+    if tracer is None:
+        rate = 1.0 if sample_rate is None else sample_rate
+        tracer = _tracers[name] = Tracer(name, sample_rate=rate)
+    elif sample_rate is not None and sample_rate != tracer.sample_rate:
+        raise ValueError(
+            f"Tracer {name!r} already samples at {tracer.sample_rate},"
+            f" not {sample_rate}"
+        )
+    return tracer
+
+
+__all__ = ["Tracer", "get_tracer", "summarize"]
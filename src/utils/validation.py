@@ -0,0 +1,97 @@
+"""
+State validation for graph entry points.
+
+Validating and defaulting state in every node means re-building default
+values and re-checking every channel on each step. ``StateValidator`` does the
+work once, at the graph's entry node: per-channel type checks are derived from
+the state schema when the validator is built, and default values are frozen
+and shared between runs. Downstream nodes can then read state directly.
+"""
+
+from collections.abc import Iterable, Mapping
+from types import MappingProxyType
+from typing import Any, get_origin, get_type_hints
+
+
+class StateValidationError(TypeError):
+    """Raised when a state channel holds a value of the wrong type."""
+
+
+def _freeze(value: Any) -> Any:
+    """Return an immutable top-level container for a default value."""
+    if isinstance(value, list):
+        return tuple(value)
+    if isinstance(value, dict):
+        return MappingProxyType(dict(value))
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Return a fresh shallow container for a frozen default value."""
+    if isinstance(value, tuple):
+        return list(value)
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    return value
+
+
+def _runtime_type(hint: Any) -> type | None:
+    """Return the class to ``isinstance``-check for a schema annotation."""
+    origin = get_origin(hint) or hint
+    return origin if isinstance(origin, type) and origin is not Any else None
+
+
+class StateValidator:
+    """Validate a state dict against a ``TypedDict`` schema with defaults.
+
+    Missing channels (and channels listed in ``non_empty`` that are empty) are
+    filled from ``defaults``. Default containers are stored frozen and only
+    shallow-copied when used, so the objects inside them (messages, tool call
+    dicts) are shared between runs and must be treated as read-only.
+
+    Args:
+        schema: The ``TypedDict`` state class.
+        defaults: Default value for every channel of ``schema``.
+        non_empty: Channels that fall back to their default when empty.
+    """
+
+    def __init__(
+        self,
+        schema: type,
+        defaults: Mapping[str, Any],
+        non_empty: Iterable[str] = (),
+    ) -> None:
+        hints = get_type_hints(schema)
+        missing = hints.keys() - defaults.keys()
+        if missing:
+            raise ValueError(f"No defaults for channels: {sorted(missing)}")
+        self._checks = tuple((key, _runtime_type(hint)) for key, hint in hints.items())
+        self._defaults = MappingProxyType(
+            {key: _freeze(defaults[key]) for key in hints}
+        )
+        self._non_empty = frozenset(non_empty)
+
+    def defaults(self) -> dict[str, Any]:
+        """Return a state made only of default values."""
+        return {key: _thaw(value) for key, value in self._defaults.items()}
+
+    def __call__(self, state: Mapping[str, Any] | None) -> dict[str, Any]:
+        """Return a validated state with defaults filled in."""
+        if not state:
+            return self.defaults()
+
+        valid = {}
+        for key, expected in self._checks:
+            value = state.get(key)
+            if value is None or (not value and key in self._non_empty):
+                value = _thaw(self._defaults[key])
+            elif expected is not None and not isinstance(value, expected):
+                raise StateValidationError(
+                    f"State channel {key!r} expected {expected.__name__}, "
+                    f"got {type(value).__name__}"
+                )
+            valid[key] = value
+        return valid
+
+
+__all__ = ["StateValidationError", "StateValidator"]
@@ -0,0 +1,108 @@
+"""
+Token-budgeted message windowing with incremental summaries.
+
+Slicing the full history by message count and re-joining every message into a
+fresh summary makes each turn cost O(conversation length). Instead:
+
+- the message channel is kept as a bounded FIFO: the oldest messages are
+  evicted (with ``RemoveMessage``) once the window exceeds a token budget or a
+  message cap, so the window itself never grows with the conversation,
+- token counts are computed once per message and cached by message id,
+- only newly evicted messages are folded into the running summary, which is
+  capped in length.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+
+from langchain_core.messages import BaseMessage, RemoveMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+SUMMARY_SEPARATOR = " -> "
+
+
+def _approximate_tokens(message: BaseMessage) -> int:
+    return count_tokens_approximately([message])
+
+
+class TokenCounter:
+    """Count message tokens, caching the result per message id.
+
+    Args:
+        count: Function returning the token count of one message.
+        maxsize: Maximum number of cached counts.
+    """
+
+    def __init__(
+        self,
+        count: Callable[[BaseMessage], int] = _approximate_tokens,
+        maxsize: int = 4096,
+    ) -> None:
+        self._count = count
+        self.maxsize = maxsize
+        self._cache: OrderedDict[str, int] = OrderedDict()
+
+    def __call__(self, message: BaseMessage) -> int:
+        if message.id is None:
+            return self._count(message)
+        tokens = self._cache.get(message.id)
+        if tokens is None:
+            tokens = self._cache[message.id] = self._count(message)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(message.id)
+        return tokens
+
+
+def split_window(
+    messages: Sequence[BaseMessage],
+    max_tokens: int | None = None,
+    max_messages: int | None = None,
+    counter: Callable[[BaseMessage], int] = _approximate_tokens,
+) -> tuple[list[BaseMessage], list[BaseMessage]]:
+    """Split ``messages`` into ``(evicted, kept)``.
+
+    Messages are walked newest first and kept while they fit in both limits;
+    the newest message is always kept. The walk stops at the first message
+    that does not fit, so its cost is bounded by the window size rather than
+    by the length of the conversation.
+    """
+    kept = tokens = 0
+    for message in reversed(messages):
+        if max_messages is not None and kept >= max_messages:
+            break
+        tokens += counter(message)
+        if max_tokens is not None and tokens > max_tokens and kept:
+            break
+        kept += 1
+    cut = len(messages) - kept
+    return list(messages[:cut]), list(messages[cut:])
+
+
+def evict(messages: Sequence[BaseMessage]) -> list[RemoveMessage]:
+    """Return the ``add_messages`` updates that delete ``messages``."""
+    return [RemoveMessage(id=message.id) for message in messages if message.id]
+
+
+def fold_summary(
+    summary: str, evicted: Sequence[BaseMessage], max_chars: int = 2000
+) -> str:
+    """Append ``evicted`` to ``summary``, keeping at most the last ``max_chars``."""
+    if not evicted:
+        return summary
+    parts = [summary] if summary else []
+    parts.extend(str(message.content) for message in evicted)
+    folded = SUMMARY_SEPARATOR.join(parts)
+    if len(folded) > max_chars:
+        folded = "..." + folded[len(folded) - max_chars + 3 :]
+    return folded
+
+
+__all__ = [
+    "SUMMARY_SEPARATOR",
+    "TokenCounter",
+    "evict",
+    "fold_summary",
+    "split_window",
+]
@@ -55,3 +55,38 @@ def test_exercise_1_2(student_submission):
         assert final_output["summary"] == ""
 
     logger.info("All checks passed successfully!")
+
+
+def test_token_budgeted_windowing(student_submission):
+    """Evicted messages leave the window and are folded into the summary once."""
+    from langchain_core.messages import HumanMessage
+    from langgraph.graph.message import add_messages
+
+    state = {
+        "messages": [],
+        "summary": "",
+        "window_size": 100,
+        "token_budget": 40,
+        "evicted_summary": "",
+    }
+    for i in range(50):
+        new = [HumanMessage(content=f"message number {i}", id=f"m{i}")]
+        state["messages"] = add_messages(state["messages"], new)
+        update = student_submission.message_windowing(state)
+        if "messages" in update:
+            state["messages"] = add_messages(state["messages"], update["messages"])
+        state["evicted_summary"] = update.get(
+            "evicted_summary", state["evicted_summary"]
+        )
+        state.update(student_submission.summary_generation(state))
+
+    messages = state["messages"]
+    assert messages[-1].content == "message number 49"
+    counter = student_submission.token_counter
+    assert sum(counter(m) for m in messages) <= state["token_budget"]
+    assert len(messages) < 50
+
+    # Every evicted message appears exactly once in the running summary
+    evicted = state["evicted_summary"].split(" -> ")
+    assert evicted == [f"message number {i}" for i in range(50 - len(messages))]
+    assert state["summary"].endswith("message number 49")
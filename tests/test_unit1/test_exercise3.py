@@ -72,3 +72,74 @@ def test_exercise_1_3(student_submission):
     )
 
     logger.info("All routing tests passed successfully!")
+
+
+def test_intent_router(student_submission):
+    """The compiled router keeps if/elif precedence and scales to many intents."""
+    from src.utils.routing import Intent, IntentRouter
+
+    router = student_submission.intent_router
+    assert router.route("HELLO, can you help?").intent == "greeting"
+    assert router.route("helpful").intent == "help"
+    assert router.route("Foo bar").confidence == 0.1
+
+    # Overlapping and prefix keywords resolve like substring checks would
+    router = IntentRouter(
+        [Intent("first", ("b", "help")), Intent("second", ("ab", "helper"))]
+    )
+    assert router.route("ab").intent == "first"
+    assert router.route("helper").keyword == "help"
+
+    intents = [Intent(f"intent{i}", (f"kw{i:04d}x",)) for i in range(2000)]
+    router = IntentRouter(intents)
+    assert router.route("text with kw1234x and kw0042x").intent == "intent42"
+    assert router.route("kw99999").intent == "unknown"
+
+
+def test_batch_classification(student_submission):
+    """Batch classification matches classifier_node and routes with graph.batch."""
+    texts = ["Hello", "I need help", "Foo bar", "hello, I need help"] * 25
+    messages = [HumanMessage(content=text) for text in texts]
+
+    labels = student_submission.classify_batch(messages)
+    for message, label in zip(messages, labels, strict=True):
+        route = student_submission.intent_router.route(message.content)
+        assert label == {
+            "classification": route.intent,
+            "confidence": route.confidence,
+        }
+
+    default_input = student_submission.default_input
+    results = student_submission.invoke_batch(
+        [{**default_input, "messages": [message]} for message in messages]
+    )
+    responses = {
+        "greeting": "Hello there!",
+        "help": "How can I help you?",
+        "unknown": "I don't understand.",
+    }
+    for label, state in zip(labels, results, strict=True):
+        assert state["classification"] == label["classification"]
+        assert state["messages"][-1].content == responses[label["classification"]]
+
+    # Labels match the router's substring rules, including symbol keywords
+    from src.utils.batch_classifier import KeywordClassifier
+    from src.utils.routing import Intent, IntentRouter
+
+    intents = [Intent("math", ("+", "calc")), Intent("help", ("help", "helper"))]
+    texts = ["2+2", "helpful", "calculate", "HELPER", "nothing", "a\ncalc"]
+    labels = KeywordClassifier.from_intents(intents).classify(texts)
+    router = IntentRouter(intents)
+    assert [label["classification"] for label in labels] == [
+        router.route(text).intent for text in texts
+    ]
+
+    # A classification left over from an earlier turn is not reused
+    state = student_submission.graph.invoke(
+        {
+            "messages": [HumanMessage(content="I need help")],
+            "classification": "greeting",
+            "confidence": 0.9,
+        }
+    )
+    assert state["classification"] == "help"
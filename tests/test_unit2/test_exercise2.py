@@ -115,4 +115,173 @@ async def test_rate_limits(student_submission: Any) -> None:
     # Second call should hit rate limit
     result["tool_usage"]["check_weather"] = 1
     result = tool_selector(result)
-    assert "Rate limit exceeded" in result["messages"][-1].content
\ No newline at end of file
+    assert "Rate limit exceeded" in result["messages"][-1].content
+
+def test_tool_registry_reuses_tool_nodes(student_submission: Any) -> None:
+    """Test that ToolNodes are cached per tool set with LRU eviction."""
+    from src.utils.tool_registry import ToolRegistry
+
+    calculator = student_submission.calculator
+    check_weather = student_submission.check_weather
+
+    registry = ToolRegistry(maxsize=1)
+    node = registry.get_tool_node([calculator, check_weather])
+
+    # Same tool set in any order hits the cache
+    assert registry.get_tool_node([check_weather, calculator]) is node
+    assert registry.hits == 1 and registry.misses == 1
+    assert set(registry.get_schemas([calculator, check_weather])) == {
+        "calculator",
+        "check_weather",
+    }
+    assert "expression" in registry.get_schemas([calculator])["calculator"]
+
+    # The one-tool set above evicted the two-tool node
+    assert len(registry) == 1
+    assert registry.get_tool_node([calculator, check_weather]) is not node
+
+
+@pytest.mark.asyncio
+@pytest.mark.enable_socket
+async def test_batched_extraction() -> None:
+    """Test that concurrent extractions are coalesced into one batch."""
+    import asyncio
+
+    from src.utils.extraction import ExtractionService
+    from src.utils.mocking import FakeChatModel
+
+    fake_llm = FakeChatModel(responder=lambda system, query: query.split()[-1])
+    service = ExtractionService(fake_llm, batch_window=0.01)
+    instructions = "Extract the location from the weather query."
+
+    queries = [f"weather in City{i}" for i in range(10)]
+    results = await asyncio.gather(
+        *(service.aextract(query, instructions) for query in queries)
+    )
+
+    assert results == [f"City{i}" for i in range(10)]
+    assert service.batches == 1
+    assert fake_llm.calls == 10
+    assert service.chain_for(instructions) is service.chain_for(instructions)
+    assert service.extract("weather in Oslo", instructions) == "Oslo"
+
+
+def test_nodes_share_extraction_batches(
+    student_submission: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that nodes running on several threads share one extraction batch."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src.utils.extraction import ExtractionService
+    from src.utils.mocking import FakeChatModel
+
+    def respond(system: str, query: str) -> str:
+        if "nowhere" in query:
+            raise ValueError("No location")
+        return query.split()[-1]
+
+    service = ExtractionService(FakeChatModel(responder=respond), batch_window=0.5)
+    monkeypatch.setattr(student_submission, "extraction_service", service)
+    initial = student_submission.tool_selector({})
+    states = [
+        {**initial, "messages": [HumanMessage(content=f"Weather in City{i}")]}
+        for i in range(8)
+    ]
+
+    with ThreadPoolExecutor(len(states)) as pool:
+        results = list(pool.map(student_submission.tool_selector, states))
+
+    assert [r["extracted_location"] for r in results] == [f"city{i}" for i in range(8)]
+    assert service.batches == 1
+
+    # A failed extraction fails only its own caller
+    with ThreadPoolExecutor(2) as pool:
+        ok = pool.submit(service.extract_batched, "weather in oslo", "where?")
+        failed = pool.submit(service.extract_batched, "weather nowhere", "where?")
+        assert ok.result() == "oslo"
+        with pytest.raises(ValueError):
+            failed.result()
+
+
+def test_extraction_cache(tmp_path: Any) -> None:
+    """Test TTL, eviction and the SQLite backend of the extraction cache."""
+    from src.utils.extraction import ExtractionCache, ExtractionService
+    from src.utils.mocking import FakeChatModel
+
+    now = [1000.0]
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ExtractionCache(maxsize=2, ttl=60, path=path, clock=lambda: now[0])
+    fake_llm = FakeChatModel(responder=lambda system, query: query.split()[-1])
+    service = ExtractionService(fake_llm, cache=cache)
+    instructions = "Extract the location from the weather query."
+
+    # Selector (lower-cased) and executor (original) messages share an entry
+    assert service.extract("weather in london", instructions) == "london"
+    assert service.extract("Weather in  London", instructions) == "london"
+    assert fake_llm.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Max entries evicts the least recently used entry from memory
+    service.extract("weather in Paris", instructions)
+    service.extract("weather in Rome", instructions)
+    assert len(cache) == 2
+
+    # A fresh cache on the same file is served from disk
+    reopened = ExtractionCache(path=path, clock=lambda: now[0])
+    assert reopened.get("weather in london", instructions) == "london"
+
+    # Entries expire after the TTL
+    now[0] += 61
+    assert cache.get("weather in Rome", instructions) is None
+    assert reopened.get("weather in Rome", instructions) is None
+    cache.close()
+    reopened.close()
+
+
+def test_calculator_engine() -> None:
+    """Test compiled expression caching and batch evaluation."""
+    import numexpr
+    import numpy as np
+
+    from src.utils.calculator import CalculatorEngine
+
+    engine = CalculatorEngine()
+    for expression in ["2 + 2", "25 * 4", "1 / 2", "pi * 2", "sqrt(16) + e"]:
+        expected = numexpr.evaluate(
+            expression, global_dict={}, local_dict=dict(engine.constants)
+        )
+        assert float(engine.calculate(expression)) == pytest.approx(float(expected))
+    assert engine.compile(" 2 + 2 ") is engine.compile("2 + 2")
+
+    xs = np.arange(5, dtype=np.float64)
+    results = engine.calculate_many(["x * 2", "x + y", "x * 2"], {"x": xs, "y": 1.0})
+    np.testing.assert_allclose(results[0], xs * 2)
+    np.testing.assert_allclose(results[1], xs + 1)
+    assert results[2] is results[0]
+
+    with pytest.raises(NameError):
+        engine.calculate("invalid")
+
+
+def test_traced_node_logs_fields(
+    student_submission: Any,
+    caplog: pytest.LogCaptureFixture,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that traced nodes log at DEBUG, including a ``message`` field."""
+    from src.utils.extraction import ExtractionService
+    from src.utils.mocking import FakeChatModel
+
+    fake_llm = FakeChatModel(responder=lambda system, query: query.split()[-1])
+    monkeypatch.setattr(
+        student_submission, "extraction_service", ExtractionService(fake_llm)
+    )
+    caplog.set_level(logging.DEBUG, logger=student_submission.__name__)
+
+    state = student_submission.tool_selector({})
+    state["messages"] = [HumanMessage(content="What's the weather in Oslo")]
+    result = student_submission.tool_selector(state)
+
+    assert result["extracted_location"] == "oslo"
+    assert "Extracting information message=what's the weather in oslo" in caplog.text
+    assert "Extracted information extracted=oslo" in caplog.text
@@ -104,4 +104,183 @@ async def test_state_consistency(student_submission: Any) -> None:
 
     # Verify state consistency
     assert len(result["results"]) + len(result["errors"]) == len(result["pending_tools"])
-    assert all(isinstance(msg.content, str) for msg in result["messages"])
\ No newline at end of file
+    assert all(isinstance(msg.content, str) for msg in result["messages"])
+
+@pytest.mark.asyncio
+@pytest.mark.enable_socket
+async def test_async_search_client_pools_connections() -> None:
+    """Test that concurrent searches share pooled keep-alive connections."""
+    import asyncio
+
+    from src.utils.mocking import StubSearchServer
+    from src.utils.search import AsyncTavilySearch
+
+    with StubSearchServer() as server:
+        client = AsyncTavilySearch(
+            api_key="test", base_url=server.base_url, max_concurrency=4
+        )
+        async with client:
+            results = await asyncio.gather(
+                *(client.ainvoke({"query": f"query {i}"}) for i in range(50))
+            )
+            with pytest.raises(ValueError):
+                await client.ainvoke({})
+
+    assert len(server.requests) == 50
+    assert results[7][0]["title"] == "Result for query 7"
+    # 50 searches went over at most max_concurrency connections
+    assert server.connections <= 4
+
+
+@pytest.mark.asyncio
+async def test_fan_out_scheduler() -> None:
+    """Test concurrency caps, priorities, timeouts and streaming order."""
+    import asyncio
+
+    from src.utils.scheduler import FanOutScheduler
+
+    started: list[str] = []
+    running = {"now": 0, "peak": 0, "search_peak": 0, "search": 0}
+
+    async def execute(call: dict) -> tuple[str, Any]:
+        started.append(call["id"])
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        if call["tool_name"] == "search":
+            running["search"] += 1
+            running["search_peak"] = max(running["search_peak"], running["search"])
+        try:
+            await asyncio.sleep(call["delay"])
+        finally:
+            running["now"] -= 1
+            if call["tool_name"] == "search":
+                running["search"] -= 1
+        return call["id"], "ok"
+
+    calls = [
+        {"id": f"s{i}", "tool_name": "search", "delay": 0.01} for i in range(6)
+    ] + [
+        {"id": "urgent", "tool_name": "calc", "delay": 0.01, "priority": 10},
+        {"id": "slow", "tool_name": "calc", "delay": 0.2},
+        {"id": "stuck", "tool_name": "calc", "delay": 10},
+    ]
+    scheduler = FanOutScheduler(
+        max_concurrency=3,
+        per_tool_limits={"search": 2},
+        call_timeout=0.1,
+        deadline=1.0,
+    )
+
+    finished = []
+    async for call, outcome in scheduler.stream(calls, execute):
+        finished.append((call["id"], outcome))
+
+    outcomes = dict(finished)
+    assert started[0] == "urgent"
+    assert running["peak"] <= 3
+    assert running["search_peak"] <= 2
+    assert all(outcomes[f"s{i}"] == (f"s{i}", "ok") for i in range(6))
+    assert isinstance(outcomes["slow"], TimeoutError)
+    assert isinstance(outcomes["stuck"], TimeoutError)
+    # Results are streamed as they finish: fast calls come before timeouts
+    assert finished[0][0] == "urgent"
+    assert {call_id for call_id, _ in finished[-2:]} == {"slow", "stuck"}
+
+
+@pytest.mark.enable_socket
+def test_search_session_closed_on_its_own_loop() -> None:
+    """Test that switching loops closes the old session on the old loop."""
+    import asyncio
+
+    from src.utils.mocking import StubSearchServer
+    from src.utils.search import AsyncTavilySearch
+
+    first, second = asyncio.new_event_loop(), asyncio.new_event_loop()
+    try:
+        with StubSearchServer() as server:
+            client = AsyncTavilySearch(api_key="test", base_url=server.base_url)
+            first.run_until_complete(client.search("one"))
+            old = client._session
+            second.run_until_complete(client.search("two"))
+            assert client._session is not old and not old.closed
+            # The old session is closed once its loop runs again
+            first.run_until_complete(asyncio.sleep(0.01))
+            assert old.closed
+            second.run_until_complete(client.aclose())
+            assert client._session is None
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.enable_socket
+async def test_state_validated_once_at_entry(
+    student_submission: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the full graph offline and that shared defaults stay untouched."""
+    from src.utils.mocking import StubSearchServer
+    from src.utils.validation import StateValidationError
+
+    with StubSearchServer() as server:
+        monkeypatch.setattr(
+            student_submission.search_client, "base_url", server.base_url
+        )
+        for _ in range(2):
+            result = await student_submission.graph.ainvoke({})
+            messages = [m.content for m in result["messages"]]
+            assert any("Result from search_1" in m for m in messages)
+            assert any("largest city in Japan" in m for m in messages)
+            assert result["errors"] == {}
+        await student_submission.aclose()
+
+    defaults = student_submission.create_default_state()
+    assert len(defaults["messages"]) == 1
+    assert len(defaults["pending_tools"]) == 2
+    assert defaults["results"] == {} and defaults["errors"] == {}
+
+    with pytest.raises(StateValidationError):
+        student_submission.init_state({"pending_tools": "not a list"})
+
+
+def test_tracing_is_lazy_and_summarized(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that disabled tracing does no formatting and states are summarized."""
+    from src.utils.tracing import Tracer, get_tracer
+
+    class Expensive:
+        renders = 0
+
+        def __repr__(self) -> str:
+            Expensive.renders += 1
+            return "expensive"
+
+    tracer = Tracer("tests.tracing")
+    with caplog.at_level(logging.INFO, logger="tests.tracing"):
+        tracer.debug("Disabled", value=Expensive())
+    assert Expensive.renders == 0
+    assert not caplog.records
+
+    state = {
+        "messages": [HumanMessage(content=f"message {i}") for i in range(500)],
+        "results": {"search_1": "x" * 10_000},
+    }
+    with caplog.at_level(logging.DEBUG, logger="tests.tracing"):
+        tracer.debug("Enabled", state=state)
+    line = caplog.records[-1].getMessage()
+    assert "messages=[500 items, last=human('message 499')]" in line
+    assert "results={1 keys}" in line
+    assert len(line) < 300
+
+    sampled = Tracer("tests.tracing", sample_rate=0.25)
+    caplog.clear()
+    with caplog.at_level(logging.DEBUG, logger="tests.tracing"):
+        for i in range(8):
+            sampled.debug("Sampled", i=i)
+    assert len(caplog.records) == 2
+
+    # A tracer keeps one sample rate; asking for another one is an error
+    shared = get_tracer("tests.tracing.shared", sample_rate=0.5)
+    assert get_tracer("tests.tracing.shared") is shared
+    assert get_tracer("tests.tracing.shared", sample_rate=0.5) is shared
+    with pytest.raises(ValueError):
+        get_tracer("tests.tracing.shared", sample_rate=1.0)
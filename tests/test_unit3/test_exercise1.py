@@ -1,10 +1,31 @@
 import logging
 
+import pytest
+
 # The logger is used to check that the nodes
 # are doing the right work
 logger = logging.getLogger(__name__)
 
 
+@pytest.fixture
+def reply_graph(student_submission):
+    """Compile a START -> reply -> END graph over the exercise's State."""
+    from langchain_core.messages import AIMessage
+    from langgraph.graph import END, START, StateGraph
+
+    def default_reply(state):
+        return {"messages": [AIMessage(content="ok")], "version": "v1"}
+
+    def build(checkpointer, reply=default_reply):
+        builder = StateGraph(student_submission.State)
+        builder.add_node("reply", reply)
+        builder.add_edge(START, "reply")
+        builder.add_edge("reply", END)
+        return builder.compile(checkpointer=checkpointer)
+
+    return build
+
+
 def test_exercise_3_1(student_submission):
     """Check that the student has implemented the checkpointing correctly."""
     try:
@@ -45,3 +66,253 @@ def test_exercise_3_1(student_submission):
     # (for this exercise, the format is unimportant)
     final_output = graph.invoke(inputs)
     assert final_output
+
+
+def test_persistence_started_on_demand(student_submission):
+    """Importing starts nothing; the checkpointed graph starts persistence."""
+    assert student_submission._persistence is None
+    # The plain graph runs without a thread_id
+    first = next(iter(student_submission.graph.stream({})))
+    assert "chat_completion" in first
+
+    graph = student_submission.compile_checkpointed()
+    try:
+        config = {"configurable": {"thread_id": "on-demand"}}
+        graph.invoke({}, config, interrupt_after=["cleanup"])
+        assert graph.get_state(config).next == ("chat_completion",)
+        assert student_submission.start_persistence()[0] is graph.checkpointer
+    finally:
+        student_submission.stop_persistence()
+    assert student_submission._persistence is None
+
+
+def test_sqlite_checkpointer(reply_graph, tmp_path):
+    """Checkpoints survive a restart and writes are committed in batches."""
+    from langchain_core.messages import HumanMessage
+
+    from src.utils.checkpointing import SQLiteSaver
+
+    path = str(tmp_path / "checkpoints.sqlite3")
+    config = {"configurable": {"thread_id": "thread-1"}}
+    with SQLiteSaver(path) as saver:
+        graph = reply_graph(saver)
+        for i in range(5):
+            graph.invoke({"messages": [HumanMessage(content=f"hi {i}")]}, config)
+        history = list(graph.get_state_history(config))
+        # Each turn writes several checkpoints and task writes in few commits
+        assert saver.commits < len(history)
+
+    with SQLiteSaver(path) as saver:
+        graph = reply_graph(saver)
+        state = graph.get_state(config)
+        assert [m.content for m in state.values["messages"]][-2:] == ["hi 4", "ok"]
+        assert len(state.values["messages"]) == 10
+        assert len(list(saver.list(config, limit=3))) == 3
+
+        saver.delete_thread("thread-1")
+        assert saver.get_tuple(config) is None
+
+
+def test_write_batch_keeps_statement_order(tmp_path):
+    """A delete queued between two inserts doesn't overtake the second one."""
+    from src.utils.checkpointing import _INSERT_WRITE, SQLiteSaver
+
+    def write(checkpoint_id):
+        return ("t", "", checkpoint_id, "task", 0, "channel", "null", b"", "")
+
+    with SQLiteSaver(str(tmp_path / "order.sqlite3")) as saver:
+        saver._commit(
+            [
+                (_INSERT_WRITE, write("c1")),
+                ("DELETE FROM writes WHERE thread_id = ?", ("t",)),
+                (_INSERT_WRITE, write("c2")),
+            ]
+        )
+        rows = saver._query("SELECT checkpoint_id FROM writes", ())
+    assert rows == [("c2",)]
+
+
+def test_delta_encoded_checkpoints(reply_graph, tmp_path, caplog):
+    """Message deltas shrink storage and decode to the same states."""
+    import sqlite3
+
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from src.utils.checkpointing import CheckpointCorruptedError, SQLiteSaver
+
+    def reply(state):
+        turn = len(state["messages"])
+        metadata = {**state.get("metadata", {}), "turn": turn, "model": "stub"}
+        return {"messages": [AIMessage(content="ok " * 20)], "metadata": metadata}
+
+    config = {"configurable": {"thread_id": "thread-1"}}
+
+    sizes, histories = {}, {}
+    for interval in (16, 0):
+        path = str(tmp_path / f"checkpoints-{interval}.sqlite3")
+        with SQLiteSaver(path, keyframe_interval=interval) as saver:
+            graph = reply_graph(saver, reply)
+            for i in range(40):
+                message = HumanMessage(content=f"question {i} " * 10)
+                graph.invoke({"messages": [message]}, config)
+        with sqlite3.connect(path) as db:
+            (sizes[interval],) = db.execute("SELECT SUM(LENGTH(blob)) FROM blobs")
+        # Decode from a fresh saver, with no cached delta bases
+        with SQLiteSaver(path) as saver:
+            graph = reply_graph(saver, reply)
+            histories[interval] = [
+                (
+                    [m.content for m in snapshot.values.get("messages", [])],
+                    snapshot.values.get("metadata"),
+                )
+                for snapshot in graph.get_state_history(config)
+            ]
+
+    assert histories[16] == histories[0]
+    assert len(histories[16][0][0]) == 80
+    assert sizes[16][0] * 4 < sizes[0][0]
+
+    # A delta whose base is gone is reported instead of dropping the channel
+    path = str(tmp_path / "checkpoints-16.sqlite3")
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "DELETE FROM blobs WHERE channel = 'messages' AND type NOT LIKE 'delta:%'"
+        )
+    with SQLiteSaver(path) as saver:
+        graph = reply_graph(saver, reply)
+        with pytest.raises(CheckpointCorruptedError):
+            graph.get_state(config)
+    assert "has no base version" in caplog.text
+
+
+def test_checkpoint_retention(reply_graph, tmp_path):
+    """Retention drops old checkpoints, keeps history readable, reports bytes."""
+    from langchain_core.messages import HumanMessage
+
+    from src.utils.checkpointing import SQLiteSaver
+    from src.utils.retention import CheckpointCompactor, RetentionPolicy
+
+    with SQLiteSaver(str(tmp_path / "checkpoints.sqlite3")) as saver:
+        graph = reply_graph(saver)
+        for thread_id in ("a", "b"):
+            config = {"configurable": {"thread_id": thread_id}}
+            for i in range(30):
+                graph.invoke({"messages": [HumanMessage(content=f"q{i}")]}, config)
+
+        compactor = CheckpointCompactor(saver, RetentionPolicy(keep_last=4))
+        compactor.schedule("a")
+        assert compactor.run_pending() == 1
+        assert compactor.stats.checkpoints_deleted > 0
+        assert compactor.stats.bytes_reclaimed > 0
+        # Deltas whose base was dropped were rewritten as keyframes
+        assert compactor.stats.keyframes_written > 0
+
+        config = {"configurable": {"thread_id": "a"}}
+        history = list(graph.get_state_history(config))
+        assert len(history) == 4
+        assert len(history[0].values["messages"]) == 60
+        assert history[-1].parent_config is None
+
+        # The thread keeps working after compaction; "b" was left alone
+        graph.invoke({"messages": [HumanMessage(content="again")]}, config)
+        assert len(graph.get_state(config).values["messages"]) == 62
+        other = {"configurable": {"thread_id": "b"}}
+        assert len(list(graph.get_state_history(other))) == 90
+
+
+def test_compaction_concurrent_with_writes(reply_graph, tmp_path):
+    """Checkpoints written while a thread is compacted are never dropped."""
+    import threading
+
+    from langchain_core.messages import HumanMessage
+
+    from src.utils.checkpointing import SQLiteSaver
+    from src.utils.retention import CheckpointCompactor, RetentionPolicy
+
+    turns = 60
+    config = {"configurable": {"thread_id": "busy"}}
+    with SQLiteSaver(str(tmp_path / "busy.sqlite3"), batch_window=0) as saver:
+        graph = reply_graph(saver)
+        compactor = CheckpointCompactor(saver, RetentionPolicy(keep_last=2))
+
+        def chat():
+            for i in range(turns):
+                graph.invoke({"messages": [HumanMessage(content=f"q{i}")]}, config)
+
+        writer = threading.Thread(target=chat)
+        writer.start()
+        while writer.is_alive():
+            compactor.compact_thread("busy")
+        writer.join()
+
+        assert compactor.stats.checkpoints_deleted > 0
+        messages = graph.get_state(config).values["messages"]
+        assert [m.content for m in messages[::2]] == [f"q{i}" for i in range(turns)]
+        history = list(graph.get_state_history(config))
+        assert history[-1].parent_config is None
+
+
+def test_compact_serializer(student_submission, tmp_path):
+    """Compact encoding round-trips state and is smaller than the default."""
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    from src.utils.checkpointing import SQLiteSaver
+    from src.utils.serde import CompactSerializer
+
+    messages = []
+    for i in range(20):
+        messages.append(HumanMessage(content="same question", id=f"h{i}"))
+        messages.append(
+            AIMessage(
+                content="",
+                id=f"a{i}",
+                tool_calls=[{"name": "search", "args": {"q": i}, "id": f"t{i}"}],
+                usage_metadata={
+                    "input_tokens": i,
+                    "output_tokens": 1,
+                    "total_tokens": i + 1,
+                },
+            )
+        )
+        messages.append(ToolMessage(content=f"result {i}", tool_call_id=f"t{i}"))
+    state = {"messages": messages, "version": "1.0", "metadata": {"turn": 20}}
+
+    default = JsonPlusSerializer().dumps_typed(state)
+    for compression in (None, "zlib"):
+        serde = CompactSerializer(compression=compression, min_compress_size=0)
+        dumped = serde.dumps_typed(state)
+        assert serde.loads_typed(dumped) == state
+        assert len(dumped[1]) < len(default[1])
+    # Values the compact encoding can't represent use the default serializer
+    serde = CompactSerializer()
+    assert serde.dumps_typed({"pair": {1: "a"}})[0] == default[0]
+    assert serde.loads_typed(serde.dumps_typed({"pair": {1: "a"}})) == {
+        "pair": {1: "a"}
+    }
+    # Payloads written by the default serializer stay readable
+    assert serde.loads_typed(default) == state
+
+    # Fields are stored by name, so their order in the schema doesn't matter
+    import ormsgpack
+
+    from src.utils.serde import TYPE
+
+    message = messages[1]
+    fields = [
+        "usage_metadata",
+        message.usage_metadata,
+        "tool_calls",
+        message.tool_calls,
+    ]
+    record = ormsgpack.packb([1, "", "a1", fields])
+    payload = ormsgpack.packb([ormsgpack.Ext(1, record)])
+    (decoded,) = serde.loads_typed((TYPE, payload))
+    assert decoded.tool_calls == message.tool_calls
+    assert decoded.usage_metadata == message.usage_metadata
+
+    with SQLiteSaver(str(tmp_path / "c.sqlite3"), serde=serde) as saver:
+        graph = student_submission.graph_builder.compile(checkpointer=saver)
+        config = {"configurable": {"thread_id": "compact"}}
+        graph.update_state(config, state)
+        assert graph.get_state(config).values["messages"] == messages
@@ -64,3 +64,169 @@ def test_exercise_3_2(student_submission):
     # (for this exercise, the format is unimportant)
     final_output = graph.invoke(inputs)
     assert final_output
+
+
+def test_copy_on_write_branches(student_submission):
+    """Forks share history and only store their own writes."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from src.utils.branching import MAIN, BranchStore
+
+    history = [HumanMessage(content=f"message {i}", id=str(i)) for i in range(2000)]
+    store = BranchStore(history, values={"branch_id": MAIN, "changes": []})
+    main = store.get(MAIN)
+
+    branches = [store.fork(MAIN) for _ in range(300)]
+    for i, branch in enumerate(branches):
+        store.append(branch.branch_id, [AIMessage(content=f"what if {i}")])
+    assert [b.branch_id for b in branches[:2]] == ["branch_1", "branch_2"]
+    assert len(main) == 2000
+    assert all(branch.base is main.head for branch in branches)
+    assert [m.content for m in branches[7].divergence] == ["what if 7"]
+    assert branches[7].messages[:2000] == history
+
+    # Writes to other channels copy the shared values on first write
+    store.update("branch_3", {"changes": [{"message": "edited"}]})
+    assert store.get("branch_3").values["changes"] == [{"message": "edited"}]
+    assert main.values["changes"] == [] == store.get("branch_4").values["changes"]
+
+    # Fork an earlier point, and fork a fork
+    early = store.fork(MAIN, "early", at=10)
+    assert early.messages == history[:10]
+    nested = store.fork("branch_1", "nested")
+    assert len(nested) == 2001 and nested.divergence == []
+
+    store.delete("branch_1")
+    assert "branch_1" not in store
+    assert nested.parent_id == MAIN
+    assert nested.messages[-1].content == "what if 0"
+
+    # The exercise forks its branches off main, in a store per conversation
+    stores = student_submission.branch_stores
+    for thread_id in ("cow-a", "cow-b"):
+        config = {"configurable": {"thread_id": thread_id}}
+        state = student_submission.create_branch({"messages": history[:3]}, config)
+        assert state["branch_id"] == "branch_1"
+    assert stores.get("cow-a") is not stores.get("cow-b")
+    # The branch shares main's messages and stores only its own write
+    store = stores.get("cow-a")
+    branch = store.get("branch_1")
+    assert len(store.get(MAIN)) == 3 and branch.base is store.get(MAIN).head
+    assert [m.content for m in branch.divergence] == ["This is a change from branch 1"]
+    # Without a thread_id, the state carries the conversation's id
+    state = student_submission.create_branch({"messages": history[:2]}, {})
+    assert len(stores.get(state["conversation_id"]).get("branch_1")) == 3
+
+
+def test_structural_diff(student_submission):
+    """Diffs list the minimal changes between states and branches."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from src.utils.branching import MAIN
+    from src.utils.diffing import diff_values
+    from src.utils.serde import CompactSerializer
+
+    history = [HumanMessage(content=f"message {i}", id=str(i)) for i in range(5000)]
+    edited = [*history, HumanMessage(content="new", id="new")]
+    edited[10] = AIMessage(content="edited", id="10")
+    del edited[20]
+    edited.insert(4000, edited.pop(29))
+    old = {"messages": history, "branch_id": "a", "metadata": {"x": 1, "y": 2}}
+    new = {"messages": edited, "branch_id": "b", "metadata": {"x": 1, "z": 3}}
+
+    expected = [
+        ("replace", "messages", 10, "10"),
+        ("remove", "messages", 20, "20"),
+        ("remove", "messages", 30, "30"),
+        ("add", "messages", 4000, "30"),
+        ("add", "messages", 4999, "new"),
+        ("set", "branch_id", None, None),
+        ("unset", "metadata", None, None),
+        ("set", "metadata", None, None),
+    ]
+    # Equal copies, as decoded from separate checkpoints, diff the same way
+    serde = CompactSerializer()
+    for before in (old, serde.loads_typed(serde.dumps_typed(old))):
+        changes = diff_values(before, new)
+        summary = [
+            (c["op"], c["channel"], c.get("index"), c.get("id")) for c in changes
+        ]
+        assert summary == expected
+    assert changes[0]["value"] is edited[10]
+    assert [c.get("key") for c in changes[-2:]] == ["y", "z"]
+    assert diff_values(old, dict(old)) == []
+
+    # Branch diffs through the exercise compare only the divergent messages
+    config = {"configurable": {"thread_id": "diff"}}
+    student_submission.create_branch({"messages": history[:3]}, config)
+    store = student_submission.branch_stores.get("diff")
+    store.append("branch_1", [AIMessage(content="what if", id="w")])
+    (what_if,) = store.get("branch_1").divergence[:1]
+    state = student_submission.diff_states({"branch_id": "branch_1"}, config)
+    assert [(c["op"], c["index"], c["id"]) for c in state["changes"]] == [
+        ("add", 3, what_if.id),
+        ("add", 4, "w"),
+    ]
+    main_state = {"branch_id": MAIN}
+    assert student_submission.diff_states(main_state, config) == main_state
+    # Another conversation has no branch_1 to diff
+    other = {"configurable": {"thread_id": "other"}}
+    assert student_submission.diff_states({"branch_id": "branch_1"}, other) == {
+        "branch_id": "branch_1"
+    }
+
+
+def test_three_way_merge(student_submission):
+    """Both sides' changes are merged against the ancestor, with conflicts."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from src.utils.branching import MAIN
+    from src.utils.merging import merge_states
+
+    history = [HumanMessage(content=f"message {i}", id=str(i)) for i in range(5)]
+    base = {"messages": history, "metadata": {"a": 1, "b": 1}, "branch_id": MAIN}
+    ours = {
+        "messages": [
+            *history[:1],
+            AIMessage(content="ours", id="1"),
+            *history[2:],
+            HumanMessage(content="added by ours", id="o"),
+        ],
+        "metadata": {"a": 2, "b": 1},
+        "branch_id": "branch_1",
+    }
+    theirs = {
+        "messages": [
+            *history[:3],
+            *history[4:],
+            HumanMessage(content="added by theirs", id="t"),
+        ],
+        "metadata": {"a": 3, "b": 1, "c": 1},
+        "branch_id": MAIN,
+    }
+    merges = student_submission.channel_merges
+    result = merge_states(base, ours, theirs, merges)
+    assert [m.id for m in result.values["messages"]] == ["0", "1", "2", "4", "o", "t"]
+    assert result.values["messages"][1].content == "ours"
+    assert result.values["metadata"] == {"a": 2, "b": 1, "c": 1}
+    assert result.values["branch_id"] == "branch_1"
+    assert [(c["channel"], c.get("key")) for c in result.conflicts] == [
+        ("metadata", "a")
+    ]
+    theirs_win = merge_states(base, ours, theirs, merges, prefer="theirs")
+    assert theirs_win.values["metadata"]["a"] == 3
+
+    # Merging a branch back into main through the exercise
+    config = {"configurable": {"thread_id": "merge"}}
+    student_submission.create_branch({"messages": history}, config)
+    store = student_submission.branch_stores.get("merge")
+    store.append("branch_1", [AIMessage(content="from branch", id="b1")])
+    store.update("branch_1", {"changes": [{"message": "from branch"}]})
+    store.append(MAIN, [HumanMessage(content="meanwhile", id="m")])
+    (what_if,) = store.get("branch_1").divergence[:1]
+    state = student_submission.merge_branches({"branch_id": "branch_1"}, config)
+    assert [m.id for m in state["messages"]] == [what_if.id, "b1"]
+    assert state["branch_id"] == MAIN and state["changes"] == []
+    main = store.get(MAIN)
+    assert [m.id for m in main.messages[-3:]] == ["m", what_if.id, "b1"]
+    assert main.values["changes"] == [{"message": "from branch"}]
@@ -1,5 +1,7 @@
 import logging
 
+import pytest
+
 # The logger is used to check that the nodes
 # are doing the right work
 logger = logging.getLogger(__name__)
@@ -55,3 +57,272 @@ def test_exercise_3_3(student_submission):
     # (for this exercise, the format is unimportant)
     final_output = graph.invoke(inputs)
     assert final_output
+
+
+def test_thread_pool_manager(student_submission):
+    """Turns run concurrently across threads, serialized within each."""
+    import threading
+    import time
+
+    from src.utils.thread_pool import ThreadPoolManager
+
+    assert student_submission.thread_pool.max_workers > 1
+    lock = threading.Lock()
+    active: dict[str, int] = {}
+    order: list[tuple[str, int]] = []
+
+    def turn(thread_id: str, i: int) -> int:
+        with lock:
+            active[thread_id] = active.get(thread_id, 0) + 1
+            assert active[thread_id] == 1, "turns of a thread overlapped"
+        time.sleep(0.002)
+        with lock:
+            active[thread_id] -= 1
+            order.append((thread_id, i))
+        return i
+
+    with ThreadPoolManager(max_workers=4, max_pending=200) as pool:
+        futures = [
+            pool.submit(f"thread_{t}", turn, f"thread_{t}", i)
+            for i in range(10)
+            for t in range(8)
+        ]
+        # A busy thread doesn't starve the others
+        busy = [pool.submit("busy", turn, "busy", i) for i in range(10, 40)]
+        assert [f.result(timeout=10) for f in futures[:8]] == [0] * 8
+        assert pool.queue_depth("busy") > 0
+    assert [f.result() for f in busy] == list(range(10, 40))
+    for t in range(8):
+        turns = [i for thread_id, i in order if thread_id == f"thread_{t}"]
+        assert turns == list(range(10))
+    first_busy = order.index(("busy", 10))
+    assert first_busy < order.index(("thread_0", 9))
+    assert pool.stats("busy").completed == 30
+    assert pool.stats("busy").max_depth >= 20
+    assert pool.pending == 0 and pool.queue_depths() == {}
+
+    # Backpressure: submissions beyond max_pending wait, then time out
+    release = threading.Event()
+    with ThreadPoolManager(max_workers=1, max_pending=2) as pool:
+        pool.submit("a", release.wait)
+        pool.submit("b", release.wait)
+        with pytest.raises(TimeoutError):
+            pool.submit("c", release.wait, timeout=0.05)
+        release.set()
+        failing = pool.submit("c", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        failing.result()
+    assert pool.stats("c").failed == 1
+
+    # Turns cancelled by shutdown never ran, so they aren't completed
+    running, release = threading.Event(), threading.Event()
+
+    def block() -> bool:
+        running.set()
+        return release.wait()
+
+    pool = ThreadPoolManager(max_workers=1)
+    started = pool.submit("d", block)
+    cancelled = [pool.submit("d", lambda: None) for _ in range(3)]
+    assert running.wait(5)
+    threading.Timer(0.05, release.set).start()
+    pool.shutdown(cancel_pending=True)
+    assert started.result() and all(f.cancelled() for f in cancelled)
+    stats = pool.stats("d")
+    assert (stats.completed, stats.cancelled) == (1, 3)
+
+
+def test_shared_data(student_submission):
+    """Concurrent updates to shared data are never lost."""
+    import threading
+
+    from src.utils.shared_data import PNCounter, SharedData
+
+    shared = SharedData(stripes=4)
+    counter = shared.counter("hits")
+
+    def work(i: int) -> None:
+        for _ in range(2000):
+            counter.add(1)
+            shared.update("total", lambda value: value + 1, 0)
+            shared.update(f"own_{i}", lambda value: value + 1, 0)
+            with shared.lock("a", "b"):
+                shared.set("a", shared.get("a", 0) + 1)
+                shared.set("b", shared.get("b", 0) - 1)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    snapshot = shared.snapshot()
+    assert snapshot["hits"] == snapshot["total"] == snapshot["a"] == 16000
+    assert snapshot["b"] == -16000
+    assert all(snapshot[f"own_{i}"] == 2000 for i in range(8))
+    assert shared.counter("hits") is counter
+
+    # Replicas converge whatever the merge order
+    left, right = PNCounter(), PNCounter()
+    left.add(5, replica="left")
+    right.add(3, replica="right")
+    right.add(-1, replica="right")
+    left.merge(right)
+    right.merge(left)
+    left.merge(right)
+    assert left.value == right.value == 7
+
+    state = {"thread_id": "thread_1", "shared_data": {"counter": 0}, "locks": []}
+    before = student_submission.shared_data.counter("counter").value
+    update = student_submission.synchronize_data(state)
+    assert update == {"shared_data": {"counter": 1}, "locks": ["counter"]}
+    assert state["shared_data"] == {"counter": 0}
+    assert student_submission.shared_data.counter("counter").value == before + 1
+
+
+@pytest.mark.enable_socket
+def test_thread_monitoring(student_submission, tmp_path):
+    """Turns are timed per thread and stuck threads are reported."""
+    import threading
+    import urllib.request
+
+    from src.utils.monitoring import ThreadMonitor
+    from src.utils.thread_pool import ThreadPoolManager
+
+    monitor = ThreadMonitor(stuck_after=0.05, buckets=(0.01, 0.1))
+    release = threading.Event()
+    with ThreadPoolManager(max_workers=2, monitor=monitor) as pool:
+        for _ in range(3):
+            pool.submit("fast", lambda: None).result()
+        pool.submit("slow", release.wait)
+        pool.submit("slow", lambda: None)
+        assert not release.wait(0.1)
+        assert monitor.stuck_threads() == ["slow"]
+        snapshot = monitor.render()
+        release.set()
+    assert 'graph_step_duration_seconds_bucket{thread_id="fast",le="0.01"} 3' in (
+        snapshot
+    )
+    assert 'graph_step_duration_seconds_count{thread_id="fast"} 3' in snapshot
+    assert 'graph_thread_queue_depth{thread_id="slow"} 1.0' in snapshot
+    assert 'graph_thread_stuck{thread_id="slow"} 1.0' in snapshot
+    assert "graph_threads_stuck 1" in snapshot
+    assert monitor.stuck_threads() == []
+    assert monitor.histogram("slow").count == 2
+
+    path = tmp_path / "threads.prom"
+    monitor.write(path)
+    assert "graph_threads_stuck 0" in path.read_text()
+    server = monitor.serve(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert b'thread_id="fast"' in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    state = {"thread_id": "thread_1", "shared_data": {"counter": 3}, "locks": []}
+    assert student_submission.monitor_threads(state) == {
+        "shared_data": {"counter": 3, "status": "healthy"}
+    }
+
+
+def test_thread_hibernation(student_submission):
+    """Idle threads are checkpointed and rehydrated on their next use."""
+    import time
+
+    from src.utils.checkpointing import SQLiteSaver
+    from src.utils.lifecycle import ThreadLifecycle
+
+    hibernated = []
+    lifecycle = ThreadLifecycle(
+        SQLiteSaver(), max_resident=100, idle_after=60.0, on_hibernate=hibernated.append
+    )
+    for i in range(1000):
+        lifecycle.put(f"t{i}", {"shared_data": {"counter": i}})
+    assert len(lifecycle) == 100
+    assert hibernated[:2] == ["t0", "t1"]
+    assert lifecycle.stats.written == 900
+
+    for i in range(1000):
+        assert lifecycle.get(f"t{i}") == {"shared_data": {"counter": i}}
+    assert len(lifecycle) == 100
+    assert lifecycle.stats.rehydrated == 1000
+    # Rehydrated threads are clean; only the 100 evicted dirty ones were written
+    assert lifecycle.stats.written == 1000
+    assert lifecycle.get("missing") is None
+
+    state = lifecycle.update("t5", {"locks": ["counter"]})
+    assert state == {"shared_data": {"counter": 5}, "locks": ["counter"]}
+    assert lifecycle.hibernate_idle() == 0
+    assert lifecycle.hibernate_idle(now=time.monotonic() + 61) == 100
+    assert len(lifecycle) == 0
+    assert lifecycle.get("t5") == state
+
+    # Changing a returned state changes nothing until it is put back
+    lifecycle.get("t5")["shared_data"]["counter"] = 50
+    assert lifecycle.get("t5")["shared_data"] == {"counter": 5}
+
+    # A thread whose write fails stays resident instead of being lost, and
+    # the other threads are still evicted
+    class FailingSaver(SQLiteSaver):
+        def put(self, config, *args, **kwargs):
+            if config["configurable"]["thread_id"] == "a":
+                raise OSError("disk full")
+            return super().put(config, *args, **kwargs)
+
+    failing = ThreadLifecycle(FailingSaver(), max_resident=3, idle_after=60.0)
+    for thread_id in "abcdefghijk":
+        failing.put(thread_id, {"shared_data": {"counter": ord(thread_id)}})
+    assert len(failing) == 3
+    assert failing.is_resident("a") and failing.stats.hibernated == 8
+    with pytest.raises(OSError):
+        failing.hibernate("a")
+    assert failing.get("a") == {"shared_data": {"counter": ord("a")}}
+    assert failing.hibernate_idle(now=time.monotonic() + 61) == 2
+    assert len(failing) == 1 and failing.is_resident("a")
+    assert failing.get("b") == {"shared_data": {"counter": ord("b")}}
+
+
+def test_demo_threads_use_services(student_submission, monkeypatch):
+    """Demo turns run on the pool, share the counter and persist their state."""
+    import threading
+
+    student_submission.stop_thread_states()
+    assert student_submission._thread_states is None
+
+    try:
+        shared = student_submission.shared_data.counter("counter")
+        first = student_submission.manage_thread_pool({"messages": []})
+        assert first["shared_data"] == {"counter": shared.value}
+        completed = student_submission.thread_pool.stats("thread_1").completed
+        update = student_submission.synchronize_data(first)
+        assert shared.value == first["shared_data"]["counter"] + 1
+        assert student_submission.thread_pool.stats("thread_1").completed == (
+            completed + 1
+        )
+        # The thread's state is stored once its turn is done, locks released
+        thread_states = student_submission.start_thread_states()
+        assert thread_states.get("thread_1") == {
+            "shared_data": update["shared_data"],
+            "locks": [],
+        }
+        second = student_submission.manage_thread_pool(first)
+        assert second["thread_id"] == "thread_2"
+        assert second["shared_data"] == {"counter": shared.value}
+
+        # A turn stuck on the pool degrades the reported health
+        monkeypatch.setattr(student_submission.thread_monitor, "stuck_after", 0.01)
+        release = threading.Event()
+        stuck = student_submission.thread_pool.submit("stuck", release.wait)
+        try:
+            assert not release.wait(0.05)
+            status = student_submission.monitor_threads(second)["shared_data"]
+            assert status["status"] == "degraded"
+        finally:
+            release.set()
+            stuck.result(timeout=5)
+        status = student_submission.monitor_threads(second)["shared_data"]
+        assert status["status"] == "healthy"
+    finally:
+        student_submission.stop_thread_states()
@@ -1,5 +1,7 @@
 import logging
 
+import pytest
+
 # The logger is used to check that the nodes
 # are doing the right work
 logger = logging.getLogger(__name__)
@@ -54,3 +56,191 @@ def test_exercise_4_1(student_submission):
     # (for this exercise, the format is unimportant)
     final_output = graph.invoke(inputs)
     assert final_output
+
+
+# The graph's notifier runs an event loop, which needs a socketpair
+@pytest.mark.enable_socket
+def test_approval_queue(student_submission):
+    """Threads suspend on review and resume in bulk once decided."""
+    from src.utils.approvals import ApprovalQueue
+    from src.utils.thread_pool import ThreadPoolManager
+
+    # Without a checkpointer to suspend on, the plain graph runs to the end
+    output = student_submission.graph.invoke({})
+    assert "__interrupt__" not in output
+    assert output["notifications"] == ["Email sent successfully!"]
+
+    graph = student_submission.approval_graph
+    approvals = ApprovalQueue()
+    for i in range(20):
+        output = approvals.run(graph, f"review-{i}", {})
+        assert output["notifications"] == []
+    assert approvals.count() == 20
+    pending = approvals.pending(action="send_email", limit=5)
+    assert [a.thread_id for a in pending] == [f"review-{i}" for i in range(5)]
+    assert pending[0].value == {"action": "send_email"}
+
+    ids = [a.id for a in approvals.pending()]
+    assert approvals.approve(ids[:15]) == 15
+    assert approvals.reject(ids[15:]) == 5
+    assert approvals.approve(ids[:1]) == 0
+    with ThreadPoolManager(max_workers=4) as pool:
+        outputs = approvals.resume(graph, pool=pool)
+    assert len(outputs) == 20
+    assert approvals.count() == approvals.count("decided") == 0
+    assert outputs["review-0"]["notifications"] == ["Email sent successfully!"]
+    assert outputs["review-0"]["pending_approvals"] == [
+        {"action": "send_email", "status": "approved"}
+    ]
+    assert outputs["review-19"]["approved_actions"] == []
+    assert outputs["review-19"]["notifications"] == []
+    assert approvals.resume(graph) == {}
+
+
+# The graph's notifier runs an event loop, which needs a socketpair
+@pytest.mark.enable_socket
+def test_approval_store(student_submission):
+    """Approvals are found by status, action, thread and age."""
+    from src.utils.approval_store import ApprovalStore
+
+    store = ApprovalStore()
+    for i in range(300):
+        store.add(f"a{i}", f"action_{i % 3}", f"t{i % 10}", created_at=float(i))
+    assert store.add("a0", "other").action == "action_0"
+    assert len(store) == store.count(status="pending") == 300
+    assert [a.id for a in store.find(status="pending", limit=3)] == ["a0", "a1", "a2"]
+    assert [a.id for a in store.find(thread_id="t3", older_than=35.0)] == [
+        "a3",
+        "a13",
+        "a23",
+        "a33",
+    ]
+    assert [a.id for a in store.find(action="action_1", newer_than=295.0)] == [
+        "a295",
+        "a298",
+    ]
+    assert store.count(status="pending", action="action_2", thread_id="t2") == 10
+    # Status with action or thread is answered by a composite index
+    assert store._bucket("pending", "action_1", None) == store._indexes[
+        ("status", "action")
+    ].get(("pending", "action_1"))
+    assert store.count(status="pending", thread_id="t4") == 30
+
+    # A few ids are moved in place, many rebuild the buckets
+    assert store.transition(["a1", "a2", "missing"], "approved") == 2
+    assert store.transition(["a1", "a3"], "rejected", from_status="pending") == 1
+    assert (
+        store.transition_where("expired", from_status="pending", older_than=200.0)
+        == 197
+    )
+    assert store.count(status="expired") == 197
+    assert store.find(status="pending", limit=1)[0].id == "a200"
+    assert store.find(status="approved", action="action_1")[0].id == "a1"
+    assert store.count(status="expired", action="action_0") == 66
+    assert [a.id for a in store.find(status="pending", thread_id="t0", limit=2)] == [
+        "a200",
+        "a210",
+    ]
+    assert store.remove([f"a{i}" for i in range(100)] + ["missing"]) == 100
+    assert store.count(status="approved") == store.count(status="rejected") == 0
+    assert store.count() == 200
+    assert [a.id for a in store.find(thread_id="t3")][:2] == ["a103", "a113"]
+
+    # The exercise's store follows its queue, by interrupt id
+    graph = student_submission.approval_graph
+    student_submission.approvals.run(graph, "tracked", {})
+    (approval,) = student_submission.approvals.pending(thread_id="tracked")
+    tracked = student_submission.approval_store.get(approval.id)
+    assert (tracked.action, tracked.thread_id) == ("send_email", "tracked")
+    assert tracked.status == "pending"
+    student_submission.approvals.approve([approval.id])
+    assert tracked.status == "decided"
+    student_submission.approvals.resume(graph)
+    assert approval.id not in student_submission.approval_store
+
+
+def test_approval_store_survives_restart(student_submission, tmp_path):
+    """A queue's store is rebuilt from the approvals it persisted."""
+    from langgraph.types import Interrupt
+
+    from src.utils.approval_store import ApprovalStore
+    from src.utils.approvals import ApprovalQueue
+
+    path = str(tmp_path / "approvals.sqlite3")
+    queue = ApprovalQueue(path, store=ApprovalStore())
+    queue.park("t1", [Interrupt({"action": "send_email"}, id="i1")])
+    queue.park("t2", [Interrupt({"action": "delete"}, id="i2")])
+    queue.approve(["i2"])
+    queue.close()
+
+    store = ApprovalStore()
+    ApprovalQueue(path, store=store).close()
+    assert [a.id for a in store.find(status="pending", action="send_email")] == ["i1"]
+    assert [a.id for a in store.find(status="decided", thread_id="t2")] == ["i2"]
+
+
+@pytest.mark.enable_socket
+def test_notification_dispatcher(student_submission, monkeypatch):
+    """Notifications are batched, coalesced and retried off the graph step."""
+    import asyncio
+    import time
+
+    from src.utils.notifications import LocalSink, NotificationDispatcher
+
+    sink = LocalSink(fail_times=2)
+    with NotificationDispatcher(
+        sink, batch_size=50, batch_window=10.0, backoff=0.001
+    ) as notifier:
+        for i in range(120):
+            notifier.notify(f"sent {i}", thread_id=f"t{i % 4}")
+        assert notifier.notify("sent 119", thread_id="t3").count == 2
+        assert notifier.flush(timeout=5)
+    # Batches are delivered concurrently, so a retried one may arrive last
+    delivered = {n.text: n.count for n in sink.notifications}
+    assert delivered == {f"sent {i}": 2 if i == 119 else 1 for i in range(120)}
+    assert sink.batches == 3
+    assert notifier.stats.retries == 2
+    assert (notifier.stats.sent, notifier.stats.coalesced) == (120, 1)
+
+    async def slow(batch):
+        await asyncio.sleep(0.2)
+        raise ConnectionError("Unreachable")
+
+    notifier = NotificationDispatcher(slow, batch_window=0.0, max_retries=1, backoff=0)
+    began = time.perf_counter()
+    notifier.notify("lost")
+    assert time.perf_counter() - began < 0.1
+    assert notifier.flush(timeout=5)
+    assert (notifier.stats.dropped, notifier.stats.retries) == (1, 1)
+    notifier.close()
+
+    async def cancelled(batch):
+        raise asyncio.CancelledError
+
+    with NotificationDispatcher(cancelled, batch_window=0.0) as notifier:
+        notifier.notify("cancelled")
+        assert notifier.flush(timeout=5)
+        assert notifier.stats.dropped == 1
+
+    def no_loop():
+        raise OSError("No socketpair")
+
+    monkeypatch.setattr(asyncio, "new_event_loop", no_loop)
+    notifier = NotificationDispatcher(LocalSink())
+    with pytest.raises(OSError, match="No socketpair"):
+        notifier.notify("never queued")
+    monkeypatch.undo()
+    notifier.notify("queued once the loop starts")
+    assert notifier.flush(timeout=5)
+    notifier.close()
+
+    graph = student_submission.approval_graph
+    student_submission.approvals.run(graph, "notified", {})
+    (approval,) = student_submission.approvals.pending(thread_id="notified")
+    student_submission.approvals.approve([approval.id])
+    student_submission.approvals.resume(graph)
+    assert student_submission.notifier.flush(timeout=5)
+    delivered = student_submission.notifier.sink.notifications
+    assert ("Email sent successfully!", "notified") in [
+        (n.text, n.thread_id) for n in delivered
+    ]